@@ -1,26 +1,16 @@
 import pandas as pd
 import numpy as np
 
+from previsioni_batch import matrice_serie, prevedi, backtest
+from panel_vendite import genera_panel, codici_gruppo, media_per_gruppo, rimuovi_duplicati_hash
+
 # =====================================================
 # CREAZIONE DATASET FITTIZIO VENDITE
 # =====================================================
 
-np.random.seed(42)
-
-date_range = pd.date_range("2025-01-01", "2025-03-31", freq="D")
-prodotti = ["A001", "A002", "B010"]
-
-rows = []
-for d in date_range:
-    for p in prodotti:
-        # introduciamo qualche NaN e valori strani apposta
-        vendite = np.random.poisson(lam=20)
-        if np.random.rand() < 0.05:
-            vendite = np.nan            # valore mancante
-        prezzo = np.random.choice([10.0, 10.5, 9.9, np.nan])
-        rows.append([d, p, vendite, prezzo])
-
-df = pd.DataFrame(rows, columns=["Data", "Prodotto", "Vendite", "Prezzo"])
+# Panel (data × prodotto) generato a colonne intere, senza cicli:
+# vendite Poisson(20) con il 5% di NaN e prezzi con qualche NaN apposta
+df = genera_panel("2025-01-01", "2025-03-31", prodotti=["A001", "A002", "B010"], num_duplicati=0)
 
 # aggiungo duplicati artificiali
 df = pd.concat([df, df.sample(5, random_state=1)], ignore_index=True)
@@ -47,11 +37,11 @@ print(df.describe(), "\n")  # solo colonne numeriche
 #   - per Prezzo: sostituisco con la media del prodotto
 df["Vendite"] = df["Vendite"].fillna(0)
 
-df["Prezzo"] = df.groupby("Prodotto")["Prezzo"] \
-                .transform(lambda s: s.fillna(s.mean()))
+codici_prodotto, num_prodotti = codici_gruppo(df["Prodotto"])
+df["Prezzo"] = media_per_gruppo(df["Prezzo"].to_numpy(dtype=np.float64), codici_prodotto, num_prodotti)
 
-# 4. Rimozione duplicati (stessa Data, Prodotto, Vendite, Prezzo)
-df = df.drop_duplicates()
+# 4. Rimozione duplicati (stessa Data, Prodotto, Vendite, Prezzo) con hash per riga
+df = rimuovi_duplicati_hash(df)
 
 # 5. Controllo / correzione tipi
 df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
@@ -85,3 +75,19 @@ print("Vendite giornaliere (tutti i prodotti):")
 print(vendite_giornaliere.head(), "\n")
 
 print(f"Vendite medie giornaliere: {vendite_medie_giornaliere:.2f}")
+
+# =====================================================
+# PARTE 4 - PREVISIONE
+# =====================================================
+
+# 9. Matrice (prodotto × giorno) e previsioni a 14 giorni per tutti i prodotti
+y, nomi_prodotti, giorni = matrice_serie(df, "Prodotto", "Data", "Vendite")
+
+previsioni = prevedi(y, orizzonte=14)
+date_future = pd.date_range(giorni[-1] + pd.Timedelta(days=1), periods=14, freq="D")
+
+print("\nPrevisione Holt-Winters prossimi 14 giorni:")
+print(pd.DataFrame(previsioni["holt_winters"].round(1), index=nomi_prodotti, columns=date_future.date).T.head(), "\n")
+
+# 10. Backtest rolling-origin per confrontare i modelli
+backtest(y, orizzonte=7, num_origini=4, n_workers=1)
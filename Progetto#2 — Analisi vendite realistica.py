@@ -1,6 +1,10 @@
 import pandas as pd
 import numpy as np
 
+from arricchimento_ordini import arricchisci
+from schema_ordini import carica_ordini, carica_prodotti, carica_clienti
+from archivio_ordini import salva_archivio, interroga, stampa_statistiche
+
 np.random.seed(42)
 
 # =====================================================
@@ -40,28 +44,24 @@ clienti.to_csv("clienti.csv", index=False)
 # PARTE 2 – CREARE UN DATAFRAME UNIFICATO
 # =====================================================
 
-# 4. Unisci ordini.  (leggo ordini.csv)
-ordini_df = pd.read_csv("ordini.csv", parse_dates=["DataOrdine"])
+# 4. Unisci ordini.  (leggo ordini.csv con i tipi compatti già in lettura)
+ordini_df = carica_ordini("ordini.csv")
 
-# 5. Unisci prodotti. (join con prodotti.json)
-prodotti_df = pd.read_json("prodotti.json")
-df = ordini_df.merge(prodotti_df, on="ProdottoID", how="left")
+# 5. Unisci prodotti. (lookup su array indicizzato da ProdottoID, merge se le chiavi sono sparse)
+prodotti_df = carica_prodotti("prodotti.json")
+df = arricchisci(ordini_df, prodotti_df, "ProdottoID")
 
-# 6. Unisci clienti. (join con clienti.csv)
-clienti_df = pd.read_csv("clienti.csv")
-df = df.merge(clienti_df, on="ClienteID", how="left")
+# 6. Unisci clienti. (lookup su array indicizzato da ClienteID, merge se le chiavi sono sparse)
+clienti_df = carica_clienti("clienti.csv")
+df = arricchisci(df, clienti_df, "ClienteID")
 
 # =====================================================
 # PARTE 3 – OTTIMIZZAZIONE
 # =====================================================
 
 # 7. Ottimizzare i tipi di dato.
-df["ClienteID"] = df["ClienteID"].astype("int32")
-df["ProdottoID"] = df["ProdottoID"].astype("int16")
-df["Quantita"] = df["Quantita"].astype("int8")
-df["Prezzo"] = df["Prezzo"].astype("float32")
-for col in ["Categoria", "Fornitore", "Regione", "Segmento"]:
-    df[col] = df[col].astype("category")
+#    I tipi (int32/int16/int8/float32/category) sono dichiarati negli schemi
+#    di schema_ordini e applicati durante la lettura: nessuna conversione qui.
 
 # 8. Ottimizzare l’uso della memoria. (stampo prima/dopo)
 print("Memoria dopo ottimizzazione:")
@@ -82,3 +82,18 @@ print(df.head())
 
 print("\nPrime righe ordini con ValoreTotale > 100:")
 print(df_filtrato.head())
+
+# =====================================================
+# PARTE 5 – ARCHIVIO COLONNARE
+# =====================================================
+
+# 11. Salvo la tabella unificata in Parquet, una partizione per mese.
+salva_archivio(df, "archivio_ordini", righe_per_gruppo=1_000)
+
+# 12. Lo stesso filtro letto dall'archivio: solo i row group e le colonne necessari.
+df_filtrato_archivio, statistiche = interroga(
+    "archivio_ordini",
+    colonne=["ClienteID", "ProdottoID", "DataOrdine", "ValoreTotale"],
+    filtri=[("ValoreTotale", ">", 100)],
+)
+stampa_statistiche(statistiche, f"Ordini con ValoreTotale > 100 dall'archivio: {len(df_filtrato_archivio)}")
@@ -1,8 +1,9 @@
 
 import os
+import re
 import pandas as pd
 
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Header, Response
 from fastapi.responses import FileResponse, JSONResponse
 
 app = FastAPI(
@@ -105,27 +106,108 @@ def train_model():
 # Generate
 # -------------------------------------------------
 
+# Generatore seekable creato alla prima richiesta paginata
+_seekable_generator = None
+
+# Numero massimo di righe restituite in una sola pagina
+MAX_PAGE_SIZE = 100_000
+
+
+def get_seekable_generator():
+    global _seekable_generator
+
+    if _seekable_generator is None:
+        from seekable_generator import carica_generatore
+        _seekable_generator = carica_generatore("vae_model.pth", "real_clean_data.csv")
+
+    return _seekable_generator
+
+
 @app.get("/generate")
-def generate_synthetic_data():
+def generate_synthetic_data(
+    page: int = None,
+    page_size: int = 10_000,
+    offset: int = None,
+    limit: int = None,
+    seed: int = 42,
+    range_header: str = Header(None, alias="Range")
+):
     """
     Endpoint per scaricare il dataset sintetico generato.
+
+    Senza parametri restituisce il file synthetic_data.csv dello Step 6.
+    Con page/page_size, offset/limit oppure con l'header "Range: rows=a-b"
+    le righe vengono generate direttamente dal modello VAE: la stessa
+    richiesta (versione del modello, seed, offset) restituisce sempre
+    gli stessi byte, senza generare le righe precedenti.
     """
 
-    synthetic_path = "synthetic_data.csv"
+    range_match = None
+    if range_header is not None:
+        range_match = re.fullmatch(r"rows=(\d+)-(\d+)", range_header.strip())
+
+    if page is None and offset is None and range_match is None:
+        synthetic_path = "synthetic_data.csv"
+
+        if not os.path.exists(synthetic_path):
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": "Dataset sintetico non trovato.",
+                    "suggestion": "Esegui prima lo Step 6 nel notebook Colab."
+                }
+            )
+
+        return FileResponse(
+            path=synthetic_path,
+            filename="synthetic_data.csv",
+            media_type="text/csv"
+        )
 
-    if not os.path.exists(synthetic_path):
+    if range_match is not None:
+        offset = int(range_match.group(1))
+        limit = int(range_match.group(2)) - offset + 1
+    elif page is not None:
+        offset = page * page_size
+        limit = page_size
+    elif limit is None:
+        limit = page_size
+
+    if offset < 0 or limit <= 0 or limit > MAX_PAGE_SIZE:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Intervallo non valido: servono offset >= 0 e 0 < limit <= {MAX_PAGE_SIZE}."}
+        )
+
+    if not os.path.exists("vae_model.pth") or not os.path.exists("real_clean_data.csv"):
         return JSONResponse(
             status_code=404,
             content={
-                "error": "Dataset sintetico non trovato.",
-                "suggestion": "Esegui prima lo Step 6 nel notebook Colab."
+                "error": "Modello VAE o dataset reale non trovati.",
+                "suggestion": "Esegui prima gli Step 3 e 5 nel notebook Colab."
             }
         )
 
-    return FileResponse(
-        path=synthetic_path,
-        filename="synthetic_data.csv",
-        media_type="text/csv"
+    generator = get_seekable_generator()
+    content = generator.page_csv(seed, offset, limit)
+
+    headers = {
+        "ETag": f'"{generator.etag(seed, offset, limit)}"',
+        "Accept-Ranges": "rows",
+        "X-Dataset-Version": generator.version,
+        "X-Seed": str(seed)
+    }
+
+    status_code = 200
+    if range_match is not None:
+        status_code = 206
+        headers["Content-Range"] = f"rows {offset}-{offset + limit - 1}/*"
+
+    return Response(
+        content=content,
+        status_code=status_code,
+        media_type="text/csv",
+        headers=headers
     )
 
 
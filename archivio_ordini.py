@@ -0,0 +1,257 @@
+# ============================================
+# Archivio colonnare degli ordini partizionato per mese
+#
+# Ogni esecuzione dell'analisi ordini rilegge ordini.csv come testo,
+# riconverte le date e poi filtra (es. ValoreTotale > 100) scorrendo
+# tutte le righe.
+#
+# Qui la tabella unificata e arricchita viene salvata una volta in Parquet:
+# - una cartella per mese di DataOrdine (archivio_ordini/Mese=2025-01/...)
+# - dentro ogni mese le righe sono ordinate per ValoreTotale e divise in
+#   row group, ognuno con le statistiche min/max di ogni colonna
+#
+# interroga legge solo ciò che serve:
+# - salta i mesi esclusi dai filtri su DataOrdine (senza leggerne i dati)
+# - salta i row group le cui statistiche escludono il filtro
+# - legge solo le colonne richieste
+# e riporta quanti mesi e row group sono stati letti.
+# ============================================
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+RIGHE_PER_GRUPPO = 10_000
+
+
+# =====================================================
+# SCRITTURA
+# =====================================================
+
+def salva_archivio(df, cartella="archivio_ordini", ordina_per="ValoreTotale", righe_per_gruppo=RIGHE_PER_GRUPPO):
+    """
+    Salva il DataFrame unificato partizionato per mese di DataOrdine.
+    Se manca, ValoreTotale viene calcolato (Prezzo * Quantita).
+    L'archivio viene scritto in una cartella temporanea e poi sostituito.
+    """
+    if "ValoreTotale" not in df.columns:
+        df = df.assign(ValoreTotale=df["Prezzo"] * df["Quantita"])
+
+    mesi = df["DataOrdine"].dt.strftime("%Y-%m")
+
+    tmp = cartella + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    for mese, righe in df.groupby(mesi, sort=True).groups.items():
+        parte = df.loc[righe]
+        if ordina_per is not None:
+            parte = parte.sort_values(ordina_per, kind="stable")
+
+        cartella_mese = os.path.join(tmp, f"Mese={mese}")
+        os.makedirs(cartella_mese)
+
+        tabella = pa.Table.from_pandas(parte, preserve_index=False)
+        pq.write_table(
+            tabella,
+            os.path.join(cartella_mese, "part-0.parquet"),
+            row_group_size=righe_per_gruppo,
+            write_statistics=True,
+        )
+
+    shutil.rmtree(cartella, ignore_errors=True)
+    os.replace(tmp, cartella)
+
+
+# =====================================================
+# FILTRI E PRUNING
+# =====================================================
+
+def _escluso(minimo, massimo, operatore, valore):
+    """
+    True se nessun valore in [minimo, massimo] può soddisfare il filtro.
+    """
+    if operatore == "==":
+        return valore < minimo or valore > massimo
+    if operatore == "!=":
+        return minimo == massimo == valore
+    if operatore == "<":
+        return minimo >= valore
+    if operatore == "<=":
+        return minimo > valore
+    if operatore == ">":
+        return massimo <= valore
+    if operatore == ">=":
+        return massimo < valore
+    if operatore == "in":
+        return all(v < minimo or v > massimo for v in valore)
+
+    raise ValueError(f"Operatore non supportato: {operatore}")
+
+
+def maschera_filtri(df, filtri):
+    """
+    Maschera booleana delle righe che soddisfano tutti i filtri (scansione completa).
+    """
+    maschera = np.ones(len(df), dtype=bool)
+
+    for colonna, operatore, valore in filtri:
+        serie = df[colonna]
+
+        if operatore == "==":
+            maschera &= (serie == valore).to_numpy()
+        elif operatore == "!=":
+            maschera &= (serie != valore).to_numpy()
+        elif operatore == "<":
+            maschera &= (serie < valore).to_numpy()
+        elif operatore == "<=":
+            maschera &= (serie <= valore).to_numpy()
+        elif operatore == ">":
+            maschera &= (serie > valore).to_numpy()
+        elif operatore == ">=":
+            maschera &= (serie >= valore).to_numpy()
+        elif operatore == "in":
+            maschera &= serie.isin(valore).to_numpy()
+        else:
+            raise ValueError(f"Operatore non supportato: {operatore}")
+
+    return maschera
+
+
+def _normalizza(colonna, valore):
+    # Le date si confrontano come Timestamp, anche se passate come stringhe
+    if colonna == "DataOrdine":
+        if isinstance(valore, (list, tuple, set)):
+            return [pd.Timestamp(v) for v in valore]
+        return pd.Timestamp(valore)
+    return valore
+
+
+def _mese_escluso(mese, filtri):
+    inizio = pd.Timestamp(mese + "-01")
+    fine = inizio + pd.offsets.MonthEnd(1) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+
+    return any(
+        _escluso(inizio, fine, operatore, valore)
+        for colonna, operatore, valore in filtri
+        if colonna == "DataOrdine"
+    )
+
+
+def _row_group_escluso(metadati_gruppo, indici_colonne, filtri):
+    for colonna, operatore, valore in filtri:
+        indice = indici_colonne.get(colonna)
+        if indice is None:
+            continue
+
+        statistiche = metadati_gruppo.column(indice).statistics
+        if statistiche is None or not statistiche.has_min_max:
+            continue
+
+        minimo, massimo = statistiche.min, statistiche.max
+        if colonna == "DataOrdine":
+            minimo, massimo = pd.Timestamp(minimo), pd.Timestamp(massimo)
+
+        if _escluso(minimo, massimo, operatore, valore):
+            return True
+
+    return False
+
+
+# =====================================================
+# INTERROGAZIONE
+# =====================================================
+
+def interroga(cartella="archivio_ordini", colonne=None, filtri=None):
+    """
+    Legge dall'archivio le righe che soddisfano tutti i filtri.
+    filtri è una lista di tuple (colonna, operatore, valore), ad esempio
+    [("ValoreTotale", ">", 100), ("DataOrdine", ">=", "2025-06-01")].
+    Operatori: ==, !=, <, <=, >, >=, in.
+    Restituisce (DataFrame, statistiche della lettura).
+    """
+    filtri = [(c, o, _normalizza(c, v)) for c, o, v in (filtri or [])]
+
+    # Le colonne dei filtri servono per il filtro esatto dopo la lettura
+    da_leggere = None
+    if colonne is not None:
+        da_leggere = list(dict.fromkeys(list(colonne) + [c for c, _, _ in filtri]))
+
+    statistiche = {"mesi_totali": 0, "mesi_letti": 0, "gruppi_totali": 0, "gruppi_letti": 0, "righe_lette": 0}
+    parti = []
+
+    for nome in sorted(os.listdir(cartella)):
+        mese = nome.split("=", 1)[1]
+        path = os.path.join(cartella, nome, "part-0.parquet")
+
+        statistiche["mesi_totali"] += 1
+        if _mese_escluso(mese, filtri):
+            statistiche["gruppi_totali"] += pq.ParquetFile(path).metadata.num_row_groups
+            continue
+
+        file = pq.ParquetFile(path)
+        metadati = file.metadata
+        indici_colonne = {metadati.schema.column(i).name: i for i in range(metadati.num_columns)}
+
+        gruppi = [
+            g for g in range(metadati.num_row_groups)
+            if not _row_group_escluso(metadati.row_group(g), indici_colonne, filtri)
+        ]
+        statistiche["gruppi_totali"] += metadati.num_row_groups
+
+        if not gruppi:
+            continue
+
+        statistiche["mesi_letti"] += 1
+        statistiche["gruppi_letti"] += len(gruppi)
+
+        parte = file.read_row_groups(gruppi, columns=da_leggere).to_pandas()
+        statistiche["righe_lette"] += len(parte)
+        parti.append(parte[maschera_filtri(parte, filtri)])
+
+    if parti:
+        risultato = pd.concat(parti, ignore_index=True)
+    else:
+        schema = pq.read_schema(os.path.join(cartella, sorted(os.listdir(cartella))[0], "part-0.parquet"))
+        risultato = schema.empty_table().to_pandas()
+        if da_leggere is not None:
+            risultato = risultato[da_leggere]
+
+    if colonne is not None:
+        risultato = risultato[list(colonne)]
+
+    return risultato, statistiche
+
+
+def stampa_statistiche(statistiche, titolo):
+    print(f"\n[Archivio] {titolo}")
+    print(
+        f"[Archivio] Mesi letti: {statistiche['mesi_letti']}/{statistiche['mesi_totali']} | "
+        f"Row group letti: {statistiche['gruppi_letti']}/{statistiche['gruppi_totali']} | "
+        f"Righe lette: {statistiche['righe_lette']}"
+    )
+
+
+if __name__ == "__main__":
+    from schema_ordini import carica_unificato
+
+    # Con 100.000 ordini ogni mese ha circa 8.000 righe:
+    # row group piccoli per vedere il pruning anche su questo dataset
+    salva_archivio(carica_unificato(), righe_per_gruppo=1_000)
+
+    risultato, stat = interroga(
+        colonne=["ClienteID", "ValoreTotale"],
+        filtri=[("ValoreTotale", ">", 500)],
+    )
+    stampa_statistiche(stat, f"ValoreTotale > 500: {len(risultato)} ordini")
+
+    risultato, stat = interroga(
+        colonne=["DataOrdine", "Categoria", "ValoreTotale"],
+        filtri=[("DataOrdine", ">=", "2025-12-01"), ("ValoreTotale", ">", 100)],
+    )
+    stampa_statistiche(stat, f"Dicembre con ValoreTotale > 100: {len(risultato)} ordini")
+    print(risultato.head())
@@ -0,0 +1,228 @@
+# ============================================
+# Arricchimento degli ordini senza join (lookup su array)
+#
+# In Progetto#2 — Analisi vendite realistica.py gli ordini vengono
+# arricchiti con due merge (prodotti.json e clienti.csv), anche se
+# ProdottoID (1–20) e ClienteID (1–5000) sono chiavi intere dense.
+#
+# Qui ogni dimensione diventa una tabella di lookup:
+# - un array per colonna, indicizzato direttamente dall'ID
+# - le colonne di testo diventano codici di una categoria (int8/int16)
+# - l'arricchimento è un semplice indice: Prezzo[ProdottoID], Regione[ClienteID]
+# - se le chiavi non sono dense (ID molto sparsi o negativi) si torna
+#   al merge classico (hash join)
+#
+# benchmark_arricchimento confronta tempo e picco di memoria con il
+# percorso merge + conversione dei tipi.
+# ============================================
+
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+
+# Una tabella densa viene usata se almeno questa frazione
+# delle posizioni 0..max(ID) corrisponde a un ID reale
+DENSITA_MINIMA = 0.25
+
+
+# =====================================================
+# TABELLE DI LOOKUP
+# =====================================================
+
+class TabellaLookup:
+    """
+    Dimensione (prodotti, clienti, ...) convertita in array indicizzati per ID.
+    Per gli ID che non esistono i valori sono NaN (numeri) o codice -1 (testo),
+    come nel merge con how="left".
+    """
+
+    def __init__(self, dimensione, chiave):
+        ids = dimensione[chiave].to_numpy(dtype=np.int64)
+
+        self.chiave = chiave
+        self.dimensione_massima = int(ids.max()) + 1
+        self.presente = np.zeros(self.dimensione_massima, dtype=bool)
+        self.presente[ids] = True
+
+        self.valori = {}
+        self.categorie = {}
+
+        for colonna in dimensione.columns.drop(chiave):
+            serie = dimensione[colonna]
+
+            if pd.api.types.is_numeric_dtype(serie):
+                array = np.full(self.dimensione_massima, np.nan, dtype=np.float32)
+                array[ids] = serie.to_numpy(dtype=np.float32)
+            else:
+                codici, categorie = pd.factorize(serie, sort=True)
+                tipo = np.int8 if len(categorie) < 127 else np.int32
+                array = np.full(self.dimensione_massima, -1, dtype=tipo)
+                array[ids] = codici
+                self.categorie[colonna] = categorie
+
+            self.valori[colonna] = array
+
+    @staticmethod
+    def densa(dimensione, chiave, densita_minima=DENSITA_MINIMA):
+        """
+        True se le chiavi sono intere, non negative, uniche e abbastanza dense.
+        """
+        serie = dimensione[chiave]
+        if not pd.api.types.is_integer_dtype(serie) or serie.empty:
+            return False
+        if serie.min() < 0 or not serie.is_unique:
+            return False
+        return len(serie) / (int(serie.max()) + 1) >= densita_minima
+
+    def colonne(self, ids):
+        """
+        Colonne della dimensione allineate agli ID richiesti.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+
+        # ID fuori dalla tabella: puntano a una posizione "mancante"
+        fuori = (ids < 0) | (ids >= self.dimensione_massima)
+        if fuori.any():
+            ids = np.where(fuori, 0, ids)
+
+        risultato = {}
+        for colonna, array in self.valori.items():
+            valori = array[ids]
+
+            if colonna in self.categorie:
+                if fuori.any():
+                    valori[fuori] = -1
+                risultato[colonna] = pd.Categorical.from_codes(valori, categories=self.categorie[colonna])
+            else:
+                if fuori.any():
+                    valori[fuori] = np.nan
+                risultato[colonna] = valori
+
+        return risultato
+
+
+def arricchisci(ordini, dimensione, chiave, tabella=None):
+    """
+    Aggiunge agli ordini le colonne della dimensione.
+    Con chiavi dense usa la tabella di lookup, altrimenti il merge.
+    """
+    if tabella is None and TabellaLookup.densa(dimensione, chiave):
+        tabella = TabellaLookup(dimensione, chiave)
+
+    if tabella is None:
+        # Hash join classico per chiavi sparse o non intere
+        return ordini.merge(dimensione, on=chiave, how="left")
+
+    colonne = tabella.colonne(ordini[chiave].to_numpy())
+    return ordini.assign(**colonne)
+
+
+def arricchisci_ordini(ordini, prodotti, clienti):
+    """
+    Stesso risultato dei due merge del progetto (ordini + prodotti + clienti),
+    con tipi già ottimizzati (float32 e category).
+    """
+    df = arricchisci(ordini, prodotti, "ProdottoID")
+    return arricchisci(df, clienti, "ClienteID")
+
+
+# =====================================================
+# BENCHMARK
+# =====================================================
+
+def genera_ordini(n_ordini, seed=42):
+    """
+    Ordini casuali come in Progetto#2 (ClienteID 1–5000, ProdottoID 1–20).
+    """
+    rng = np.random.default_rng(seed)
+    date_range = pd.date_range("2025-01-01", "2025-12-31", freq="D").values
+
+    return pd.DataFrame({
+        "ClienteID": rng.integers(1, 5001, size=n_ordini, dtype=np.int32),
+        "ProdottoID": rng.integers(1, 21, size=n_ordini, dtype=np.int16),
+        "Quantita": rng.integers(1, 6, size=n_ordini, dtype=np.int8),
+        "DataOrdine": date_range[rng.integers(0, len(date_range), size=n_ordini)],
+    })
+
+
+def _percorso_merge(ordini, prodotti, clienti):
+    # Percorso originale: due merge e poi conversione dei tipi
+    df = ordini.merge(prodotti, on="ProdottoID", how="left")
+    df = df.merge(clienti, on="ClienteID", how="left")
+
+    df["Prezzo"] = df["Prezzo"].astype("float32")
+    for col in ["Categoria", "Fornitore", "Regione", "Segmento"]:
+        df[col] = df[col].astype("category")
+    return df
+
+
+def _misura(funzione, *args):
+    tracemalloc.start()
+    inizio = time.perf_counter()
+
+    risultato = funzione(*args)
+
+    durata = time.perf_counter() - inizio
+    _, picco = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return risultato, durata, picco / 1024 ** 2
+
+
+def benchmark_arricchimento(n_ordini, prodotti, clienti, righe_per_blocco=10_000_000, esegui_merge=True):
+    """
+    Tempo e picco di memoria (MB) dei due percorsi.
+    Oltre righe_per_blocco gli ordini vengono generati ed elaborati a blocchi:
+    il tempo è la somma dei blocchi, il picco è quello del blocco peggiore.
+    """
+    risultati = {"lookup": [0.0, 0.0]}
+    if esegui_merge:
+        risultati["merge"] = [0.0, 0.0]
+
+    for numero, inizio in enumerate(range(0, n_ordini, righe_per_blocco)):
+        ordini = genera_ordini(min(righe_per_blocco, n_ordini - inizio), seed=numero)
+
+        percorsi = {"lookup": arricchisci_ordini}
+        if esegui_merge:
+            percorsi["merge"] = _percorso_merge
+
+        for nome, funzione in percorsi.items():
+            _, durata, picco = _misura(funzione, ordini, prodotti, clienti)
+            risultati[nome][0] += durata
+            risultati[nome][1] = max(risultati[nome][1], picco)
+
+        del ordini
+
+    tabella = pd.DataFrame(risultati, index=["tempo_s", "picco_MB"]).T
+    tabella["righe_al_s"] = n_ordini / tabella["tempo_s"]
+
+    print(f"\n[Arricchimento] {n_ordini:,} ordini")
+    print(tabella.round(2))
+
+    return tabella
+
+
+if __name__ == "__main__":
+    prodotti_df = pd.read_json("prodotti.json")
+    clienti_df = pd.read_csv("clienti.csv")
+    ordini_df = pd.read_csv("ordini.csv", parse_dates=["DataOrdine"])
+
+    # Controllo: stesso risultato del merge
+    atteso = _percorso_merge(ordini_df, prodotti_df, clienti_df)
+    ottenuto = arricchisci_ordini(ordini_df, prodotti_df, clienti_df)
+    pd.testing.assert_frame_equal(atteso, ottenuto[atteso.columns])
+    print("Risultato identico al merge: OK")
+
+    # Chiavi sparse: si usa il merge
+    clienti_sparsi = clienti_df.assign(ClienteID=clienti_df["ClienteID"] * 1_000_003)
+    print("Clienti con ID sparsi, tabella densa:", TabellaLookup.densa(clienti_sparsi, "ClienteID"))
+
+    benchmark_arricchimento(100_000, prodotti_df, clienti_df)
+    benchmark_arricchimento(10_000_000, prodotti_df, clienti_df)
+
+    # 100 milioni di ordini: solo lookup a blocchi da 10 milioni
+    # (il merge dell'intero dataset non entra in pochi GB di RAM)
+    benchmark_arricchimento(100_000_000, prodotti_df, clienti_df, esegui_merge=False)
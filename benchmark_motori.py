@@ -0,0 +1,217 @@
+# ============================================
+# Benchmark Pandas / Dask / Spark su data_local generati
+#
+# Per ogni motore (una funzione di progetto_finale_modulo2) il benchmark:
+# - avvia un processo Python nuovo nella cartella che contiene data_local
+#   (così il picco di memoria non dipende dai motori eseguiti prima)
+# - campiona ogni 50 ms memoria (RSS) e tempo CPU del processo e dei suoi
+#   figli (la JVM di Spark, i worker dei pool) leggendo /proc
+# - misura tempo reale, picco di memoria della somma dei processi, tempo
+#   CPU totale e utilizzo della CPU (core medi usati / core disponibili)
+#
+# Senza /proc (non Linux) si usano solo i dati di os.wait4, che contano il
+# processo e i figli che ha atteso.
+#
+# benchmark_scala genera data_local a più dimensioni (generatore_data_local)
+# ed esegue il confronto a ogni scala.
+# ============================================
+
+import os
+import sys
+import time
+import subprocess
+
+import pandas as pd
+
+from generatore_data_local import genera_data_local
+
+
+MOTORI = {
+    "pandas": "esercizio1_pandas",
+    "dask": "esercizio1_dask",
+    "spark_etl": "esercizio2_etl",
+    "parallelo": "esercizio1_parallelo",
+    "etl_locale": "esercizio2_etl_locale",
+}
+
+CARTELLA_REPO = os.path.dirname(os.path.abspath(__file__))
+TICK_AL_SECONDO = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+BYTE_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# =====================================================
+# CAMPIONAMENTO DA /proc
+# =====================================================
+
+def _leggi_stat(pid):
+    """
+    (pid padre, secondi CPU, byte RSS) di un processo, None se è già terminato.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            testo = f.read()
+    except OSError:
+        return None
+
+    # Il nome del comando è tra parentesi e può contenere spazi
+    campi = testo[testo.rindex(")") + 2:].split()
+    ppid = int(campi[1])
+    cpu = (int(campi[11]) + int(campi[12])) / TICK_AL_SECONDO
+    rss = int(campi[21]) * BYTE_PAGINA
+    return ppid, cpu, rss
+
+
+def campiona_albero(pid_radice):
+    """
+    {pid: (secondi CPU, byte RSS)} per il processo e tutti i suoi discendenti.
+    """
+    if not os.path.isdir("/proc"):
+        return {}
+
+    stat = {}
+    for nome in os.listdir("/proc"):
+        if nome.isdigit():
+            valori = _leggi_stat(int(nome))
+            if valori is not None:
+                stat[int(nome)] = valori
+
+    albero = {}
+    da_visitare = [pid_radice]
+    figli = {}
+    for pid, (ppid, _, _) in stat.items():
+        figli.setdefault(ppid, []).append(pid)
+
+    while da_visitare:
+        pid = da_visitare.pop()
+        if pid in stat:
+            albero[pid] = stat[pid][1:]
+            da_visitare.extend(figli.get(pid, []))
+
+    return albero
+
+
+# =====================================================
+# ESECUZIONE DI UN MOTORE
+# =====================================================
+
+def esegui_comando(codice, cartella_lavoro=".", path_log=None, intervallo=0.05):
+    """
+    Esegue codice Python in un processo nuovo e ne misura le risorse.
+    Restituisce un dizionario con secondi, picco_mb, cpu_s, core_medi,
+    utilizzo_cpu_% ed esito (ok oppure l'ultima riga dell'errore).
+    """
+    ambiente = dict(os.environ)
+    ambiente["PYTHONPATH"] = os.pathsep.join(filter(None, [CARTELLA_REPO, ambiente.get("PYTHONPATH")]))
+
+    log = open(path_log, "w", encoding="utf-8") if path_log else subprocess.DEVNULL
+    inizio = time.perf_counter()
+
+    try:
+        processo = subprocess.Popen(
+            [sys.executable, "-c", codice], cwd=cartella_lavoro, env=ambiente,
+            stdout=log, stderr=subprocess.STDOUT,
+        )
+
+        cpu_per_pid = {}
+        picco_campionato = 0
+
+        while True:
+            pid, stato, rusage = os.wait4(processo.pid, os.WNOHANG)
+            if pid:
+                break
+
+            albero = campiona_albero(processo.pid)
+            for figlio, (cpu, _) in albero.items():
+                cpu_per_pid[figlio] = cpu
+            picco_campionato = max(picco_campionato, sum(rss for _, rss in albero.values()))
+
+            time.sleep(intervallo)
+    finally:
+        if path_log:
+            log.close()
+
+    secondi = time.perf_counter() - inizio
+    processo.returncode = os.waitstatus_to_exitcode(stato)
+
+    # wait4 è esatto per il processo (e i figli che ha atteso), il campionamento
+    # vede anche i figli non attesi: si tiene il valore più alto
+    cpu = max(rusage.ru_utime + rusage.ru_stime, sum(cpu_per_pid.values()))
+    picco_mb = max(picco_campionato / 1024 ** 2, rusage.ru_maxrss / 1024)
+
+    esito = "ok"
+    if processo.returncode != 0:
+        esito = f"errore (codice {processo.returncode})"
+        if path_log:
+            with open(path_log, "r", encoding="utf-8", errors="replace") as f:
+                righe = [r.strip() for r in f if r.strip()]
+            if righe:
+                esito = righe[-1]
+
+    core = cpu / secondi if secondi else 0.0
+    return {
+        "secondi": secondi,
+        "picco_mb": picco_mb,
+        "cpu_s": cpu,
+        "core_medi": core,
+        "utilizzo_cpu_%": core / (os.cpu_count() or 1) * 100,
+        "esito": esito,
+    }
+
+
+def esegui_motore(nome, cartella_lavoro=".", cartella_log=None):
+    """
+    Esegue una funzione di progetto_finale_modulo2 (vedi MOTORI) nella cartella
+    che contiene data_local.
+    """
+    codice = f"import progetto_finale_modulo2 as p; p.{MOTORI[nome]}()"
+    path_log = os.path.join(cartella_log, f"{nome}.log") if cartella_log else None
+    return esegui_comando(codice, cartella_lavoro, path_log)
+
+
+# =====================================================
+# CONFRONTO
+# =====================================================
+
+def benchmark_motori(cartella_lavoro=".", motori=tuple(MOTORI), ripetizioni=1):
+    """
+    Confronto dei motori sui dati in cartella_lavoro/data_local.
+    I log di ogni esecuzione vanno in cartella_lavoro/benchmark_log,
+    la tabella in cartella_lavoro/benchmark_motori.csv.
+    """
+    cartella_log = os.path.join(cartella_lavoro, "benchmark_log")
+    os.makedirs(cartella_log, exist_ok=True)
+
+    righe = []
+    for ripetizione in range(ripetizioni):
+        for nome in motori:
+            print(f"[Benchmark] {nome} ({MOTORI[nome]}) - ripetizione {ripetizione + 1}/{ripetizioni}")
+            misure = esegui_motore(nome, cartella_lavoro, cartella_log)
+            righe.append({"motore": nome, "ripetizione": ripetizione, **misure})
+
+    tabella = pd.DataFrame(righe)
+    tabella.to_csv(os.path.join(cartella_lavoro, "benchmark_motori.csv"), index=False)
+
+    print("\n[Benchmark] Risultati:")
+    print(tabella.drop(columns="ripetizione").round(2).to_string(index=False))
+
+    return tabella
+
+
+def benchmark_scala(cartella_lavoro=".", dimensioni_gb=(1, 10), motori=tuple(MOTORI), **opzioni_generatore):
+    """
+    Per ogni dimensione: genera data_local e confronta i motori.
+    """
+    risultati = []
+
+    for gb in dimensioni_gb:
+        genera_data_local(os.path.join(cartella_lavoro, "data_local"), dimensione_gb=gb, **opzioni_generatore)
+        tabella = benchmark_motori(cartella_lavoro, motori)
+        risultati.append(tabella.assign(dimensione_gb=gb))
+
+    tabella = pd.concat(risultati, ignore_index=True)
+    tabella.to_csv(os.path.join(cartella_lavoro, "benchmark_scala.csv"), index=False)
+    return tabella
+
+
+if __name__ == "__main__":
+    benchmark_scala(".", dimensioni_gb=(0.05, 0.2), num_file_json=16, num_file_parquet=4)
@@ -0,0 +1,238 @@
+# ============================================
+# Cache dei risultati di esercizio3_report per partizione year=
+#
+# esercizio3_report (progetto_finale_modulo2.py) rilegge tutto
+# processed_sales, rifà groupBy("category") + toPandas() e ridisegna il
+# grafico a ogni chiamata, anche se i dati non sono cambiati.
+#
+# Qui il fatturato per categoria è la somma di aggregati parziali, uno per
+# partizione year=:
+# - ogni partizione ha una chiave: hash dei suoi file (nome, dimensione,
+#   data di modifica) e della versione della partizione nel manifest ETL
+# - l'aggregato parziale (category, total_revenue, transazioni) viene
+#   salvato in report_cache/parziali/year=....parquet con la sua chiave
+# - a ogni report vengono ricalcolate solo le partizioni con chiave nuova
+#   (quelle riscritte o aggiunte dall'ETL incrementale); le partizioni
+#   sparite vengono tolte
+# - la chiave del report è l'hash di tutte le chiavi: se non cambia,
+#   tabelle e grafico in cache vengono restituiti senza ricalcolo
+#
+# Il calcolo di un parziale è una funzione passata dal chiamante (Spark
+# in esercizio3_report, Arrow di default), così la cache non dipende
+# dal motore usato.
+# ============================================
+
+import os
+import json
+import time
+import shutil
+import hashlib
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from etl_locale import PROCESSED_DIR
+from manifest_etl import carica_manifest
+
+
+CACHE_DIR = "report_cache"
+
+
+# =====================================================
+# PARTIZIONI E CHIAVI
+# =====================================================
+
+def partizioni_output(output_dir=PROCESSED_DIR):
+    """
+    {anno: percorso della cartella year=anno} per l'output dell'ETL.
+    """
+    partizioni = {}
+    if not os.path.isdir(output_dir):
+        return partizioni
+
+    for nome in sorted(os.listdir(output_dir)):
+        path = os.path.join(output_dir, nome)
+        if nome.startswith("year=") and os.path.isdir(path):
+            partizioni[nome[len("year="):]] = path
+
+    return partizioni
+
+
+def chiave_partizione(path, versione_manifest=None):
+    """
+    Hash di nome, dimensione e data di modifica dei file della partizione
+    (i file nascosti o temporanei, es. _SUCCESS o .crc, sono ignorati).
+    """
+    stampe = []
+    for nome in sorted(os.listdir(path)):
+        if nome.startswith((".", "_")):
+            continue
+        info = os.stat(os.path.join(path, nome))
+        stampe.append([nome, info.st_size, info.st_mtime_ns])
+
+    testo = json.dumps([stampe, versione_manifest])
+    return hashlib.sha256(testo.encode("utf-8")).hexdigest()
+
+
+# =====================================================
+# AGGREGATI PARZIALI
+# =====================================================
+
+def fatturato_arrow(path_partizione):
+    """
+    Fatturato e numero di transazioni per categoria di una partizione, con Arrow.
+    """
+    tabella = ds.dataset(path_partizione, format="parquet").to_table(columns=["category", "amount"])
+    aggregato = tabella.group_by("category").aggregate([("amount", "sum"), ("amount", "count")])
+
+    return pd.DataFrame({
+        "category": aggregato.column("category").to_pandas(),
+        "total_revenue": aggregato.column("amount_sum").to_pandas(),
+        "transazioni": aggregato.column("amount_count").to_pandas(),
+    })
+
+
+def _unisci_parziali(parziali):
+    """
+    (fatturato per categoria, fatturato per anno e categoria) dai parziali.
+    """
+    if not parziali:
+        vuoto = pd.DataFrame({"category": [], "total_revenue": [], "transazioni": []})
+        return vuoto, vuoto.assign(year=[])
+
+    per_anno = pd.concat(
+        [parziale.assign(year=anno) for anno, parziale in sorted(parziali.items())],
+        ignore_index=True,
+    )
+    # dropna=False: le transazioni senza categoria (left join) restano come in Spark
+    per_categoria = (
+        per_anno
+        .groupby("category", dropna=False, as_index=False)[["total_revenue", "transazioni"]]
+        .sum()
+        .sort_values("total_revenue", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+
+    return per_categoria, per_anno[["year", "category", "total_revenue", "transazioni"]]
+
+
+# =====================================================
+# CACHE SU DISCO
+# =====================================================
+
+def _carica_indice(cache_dir):
+    path = os.path.join(cache_dir, "indice.json")
+    if not os.path.exists(path):
+        return {"partizioni": {}, "report": None}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _salva_indice(indice, cache_dir):
+    # Scrittura su file temporaneo e poi rename, per non lasciare file a metà
+    path = os.path.join(cache_dir, "indice.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(indice, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _path_parziale(cache_dir, anno):
+    return os.path.join(cache_dir, "parziali", f"year={anno}.parquet")
+
+
+def aggiorna_parziali(output_dir=PROCESSED_DIR, cache_dir=CACHE_DIR, calcola_parziale=fatturato_arrow):
+    """
+    Ricalcola solo i parziali delle partizioni con chiave cambiata.
+    Restituisce (parziali per anno, indice, anni ricalcolati).
+    """
+    os.makedirs(os.path.join(cache_dir, "parziali"), exist_ok=True)
+    indice = _carica_indice(cache_dir)
+    versioni_manifest = carica_manifest()["partizioni"]
+
+    partizioni = partizioni_output(output_dir)
+    parziali = {}
+    ricalcolati = []
+
+    for anno, path in partizioni.items():
+        chiave = chiave_partizione(path, versioni_manifest.get(anno, {}).get("versione"))
+        path_parziale = _path_parziale(cache_dir, anno)
+        salvato = indice["partizioni"].get(anno)
+
+        if salvato and salvato["chiave"] == chiave and os.path.exists(path_parziale):
+            parziali[anno] = pd.read_parquet(path_parziale)
+            continue
+
+        parziale = calcola_parziale(path)
+        tmp = path_parziale + ".tmp"
+        parziale.to_parquet(tmp, index=False)
+        os.replace(tmp, path_parziale)
+
+        parziali[anno] = parziale
+        indice["partizioni"][anno] = {"chiave": chiave}
+        ricalcolati.append(anno)
+
+    # Partizioni non più presenti nell'output
+    for anno in sorted(set(indice["partizioni"]) - set(partizioni)):
+        del indice["partizioni"][anno]
+        if os.path.exists(_path_parziale(cache_dir, anno)):
+            os.remove(_path_parziale(cache_dir, anno))
+
+    return parziali, indice, ricalcolati
+
+
+def report_fatturato(output_dir=PROCESSED_DIR, cache_dir=CACHE_DIR, calcola_parziale=fatturato_arrow, disegna=None, forza=False):
+    """
+    Fatturato per categoria (e per anno e categoria) con cache.
+    disegna(tabella, path) salva il grafico: viene chiamata solo se
+    i dati sono cambiati, il PNG resta nella cartella della cache.
+    Restituisce (per_categoria, per_anno, path del grafico o None).
+    """
+    inizio = time.perf_counter()
+
+    if forza:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    parziali, indice, ricalcolati = aggiorna_parziali(output_dir, cache_dir, calcola_parziale)
+
+    testo = json.dumps(sorted((anno, v["chiave"]) for anno, v in indice["partizioni"].items()))
+    chiave_report = hashlib.sha256(testo.encode("utf-8")).hexdigest()
+
+    path_categoria = os.path.join(cache_dir, "fatturato_per_categoria.parquet")
+    path_anno = os.path.join(cache_dir, "fatturato_per_anno_categoria.parquet")
+    path_grafico = os.path.join(cache_dir, "fatturato_per_categoria.png") if disegna else None
+
+    report = indice["report"]
+    valido = (
+        report is not None
+        and report["chiave"] == chiave_report
+        and os.path.exists(path_categoria)
+        and (path_grafico is None or os.path.exists(path_grafico))
+    )
+
+    if valido:
+        per_categoria = pd.read_parquet(path_categoria)
+        per_anno = pd.read_parquet(path_anno)
+    else:
+        per_categoria, per_anno = _unisci_parziali(parziali)
+        per_categoria.to_parquet(path_categoria, index=False)
+        per_anno.to_parquet(path_anno, index=False)
+        if disegna:
+            disegna(per_categoria, path_grafico)
+        indice["report"] = {"chiave": chiave_report}
+
+    _salva_indice(indice, cache_dir)
+
+    print(
+        f"[Reporting] Partizioni: {len(parziali)} | Ricalcolate: {ricalcolati or 'nessuna'} | "
+        f"Report {'in cache' if valido else 'aggiornato'} | {time.perf_counter() - inizio:.2f} s"
+    )
+
+    return per_categoria, per_anno, path_grafico
+
+
+if __name__ == "__main__":
+    # Prima chiamata: tutte le partizioni; seconda: tutto dalla cache
+    for _ in range(2):
+        tabella, _, _ = report_fatturato()
+    print(tabella)
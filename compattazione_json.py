@@ -0,0 +1,375 @@
+# ============================================
+# Compattazione dei file JSONL di arrivo in Parquet per year
+#
+# La cartella data_local/json riceve molti piccoli file JSONL (dal
+# generatore o da chi scrive mentre esercizio4_streaming la sorveglia).
+# esercizio1_dask (dd.read_json) e esercizio1_pandas rileggono ogni volta
+# tutto il testo, con un task o una lettura per ogni file piccolo.
+#
+# Qui:
+# - i file JSONL fermi da almeno eta_minima_s secondi vengono letti con il
+#   parser JSON di Arrow e convertiti nello schema SCHEMA_COMPATTATO
+# - le righe vengono accumulate fino a circa dimensione_obiettivo_mb e poi
+#   scritte in json_compattati/year=AAAA/lotto-NNNNN-K.parquet
+# - il registro (compattazione.json) elenca per ogni lotto i file sorgente
+#   (nome, byte, data di modifica, righe) e i file Parquet prodotti; solo
+#   dopo il registro i sorgenti vengono spostati in json/_compattati/lotto-NNNNN
+# - un file è identificato da (nome, byte, data di modifica): se nella
+#   cartella arriva un nuovo file con il nome di uno già compattato (nomi
+#   a rotazione di chi scrive), è un nuovo sorgente da leggere e compattare
+# - un file che non si può convertire (campi diversi, tipi misti) resta
+#   JSONL e viene segnato come rifiutato con il motivo
+#
+# I lettori (file_da_leggere, leggi_transazioni, leggi_transazioni_dask)
+# usano il registro: Parquet compattati più i JSONL non ancora compattati,
+# senza mai contare due volte lo stesso file anche se la compattazione
+# si è fermata a metà.
+# ============================================
+
+import os
+import json
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pj
+import pyarrow.parquet as pq
+
+from etl_locale import BASE_DIR
+
+
+JSON_DIR = os.path.join(BASE_DIR, "json")
+COMPATTATI_DIR = os.path.join(BASE_DIR, "json_compattati")
+REGISTRO_PATH = os.path.join(BASE_DIR, "compattazione.json")
+ARCHIVIO = "_compattati"
+
+SCHEMA_COMPATTATO = pa.schema([
+    ("transaction_id", pa.int64()),
+    ("timestamp", pa.int64()),
+    ("product_id", pa.int64()),
+    ("region_id", pa.int64()),
+    ("amount", pa.float64()),
+    ("year", pa.int64()),
+    ("payment_type", pa.string()),
+])
+
+# Campi senza i quali un file non viene compattato
+CAMPI_OBBLIGATORI = ["amount", "year"]
+
+
+# =====================================================
+# REGISTRO
+# =====================================================
+
+def chiave_sorgente(nome, byte, mtime):
+    # Lo stesso nome con byte o data di modifica diversi è un altro file
+    return f"{nome}:{byte}:{mtime!r}"
+
+
+def carica_registro(path=REGISTRO_PATH):
+    if not os.path.exists(path):
+        return {"lotti": [], "compattati": {}, "rifiutati": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        registro = json.load(f)
+
+    # Ricostruito dai lotti: vale anche per i registri con chiave solo il nome
+    registro["compattati"] = {
+        chiave_sorgente(s["file"], s["byte"], s["mtime"]): lotto["lotto"]
+        for lotto in registro["lotti"]
+        for s in lotto["sorgenti"]
+    }
+    return registro
+
+
+def salva_registro(registro, path=REGISTRO_PATH):
+    # Scrittura su file temporaneo e poi rename, per non lasciare file a metà
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registro, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _file_output(registro):
+    return [file for lotto in registro["lotti"] for file in lotto["output"]]
+
+
+def lotto_compattato(registro, json_dir, nome):
+    """
+    Numero del lotto che contiene json_dir/nome, None se il file
+    (con questi byte e questa data di modifica) non è ancora compattato.
+    """
+    info = os.stat(os.path.join(json_dir, nome))
+    return registro["compattati"].get(chiave_sorgente(nome, info.st_size, info.st_mtime))
+
+
+# =====================================================
+# CONVERSIONE DI UN FILE
+# =====================================================
+
+def converti_file(path):
+    """
+    Tabella Arrow con SCHEMA_COMPATTATO (campi mancanti a null).
+    Solleva ValueError se il file ha campi fuori schema o tipi non convertibili.
+    """
+    try:
+        tabella = pj.read_json(path)
+    except pa.ArrowInvalid as errore:
+        raise ValueError(str(errore)) from errore
+
+    extra = set(tabella.column_names) - set(SCHEMA_COMPATTATO.names)
+    if extra:
+        raise ValueError(f"campi fuori schema: {sorted(extra)}")
+
+    mancanti = [c for c in CAMPI_OBBLIGATORI if c not in tabella.column_names]
+    if mancanti:
+        raise ValueError(f"campi obbligatori mancanti: {mancanti}")
+
+    colonne = []
+    for campo in SCHEMA_COMPATTATO:
+        if campo.name in tabella.column_names:
+            try:
+                colonne.append(tabella[campo.name].cast(campo.type))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as errore:
+                raise ValueError(f"{campo.name}: {errore}") from errore
+        else:
+            colonne.append(pa.nulls(tabella.num_rows, campo.type))
+
+    return pa.Table.from_arrays(colonne, schema=SCHEMA_COMPATTATO)
+
+
+def _scrivi_lotto(tabelle, compattati_dir, numero_lotto, righe_per_gruppo):
+    """
+    Scrive le tabelle accumulate, un file per anno.
+    Restituisce i percorsi relativi a compattati_dir.
+    """
+    tabella = pa.concat_tables(tabelle).sort_by("year")
+    anni = tabella["year"].to_numpy()
+    confini = [0] + [i for i in range(1, len(anni)) if anni[i] != anni[i - 1]] + [len(anni)]
+    scritti = []
+
+    for k, (inizio, fine) in enumerate(zip(confini[:-1], confini[1:])):
+        cartella = f"year={anni[inizio]}"
+        os.makedirs(os.path.join(compattati_dir, cartella), exist_ok=True)
+        relativo = os.path.join(cartella, f"lotto-{numero_lotto:05d}-{k}.parquet")
+
+        # La colonna year è nel nome della cartella (partizionamento hive)
+        parte = tabella.slice(inizio, fine - inizio).drop_columns(["year"])
+        tmp = os.path.join(compattati_dir, relativo + ".tmp")
+        pq.write_table(parte, tmp, row_group_size=righe_per_gruppo)
+        os.replace(tmp, os.path.join(compattati_dir, relativo))
+        scritti.append(relativo)
+
+    return scritti
+
+
+# =====================================================
+# COMPATTAZIONE
+# =====================================================
+
+def _pulisci(json_dir, compattati_dir, registro):
+    """
+    Completa un'esecuzione interrotta: sposta i sorgenti già registrati e
+    cancella i Parquet scritti ma mai entrati nel registro.
+    """
+    for nome in sorted(os.listdir(json_dir)):
+        if not nome.endswith(".jsonl"):
+            continue
+        lotto = lotto_compattato(registro, json_dir, nome)
+        if lotto is not None:
+            # Una cartella per lotto: file con lo stesso nome non si sovrascrivono
+            archivio = os.path.join(json_dir, ARCHIVIO, f"lotto-{lotto:05d}")
+            os.makedirs(archivio, exist_ok=True)
+            os.replace(os.path.join(json_dir, nome), os.path.join(archivio, nome))
+
+    validi = set(_file_output(registro))
+    for radice, _, nomi in os.walk(compattati_dir):
+        for nome in nomi:
+            relativo = os.path.relpath(os.path.join(radice, nome), compattati_dir)
+            if relativo not in validi:
+                os.remove(os.path.join(radice, nome))
+
+
+def compatta(
+    json_dir=JSON_DIR,
+    compattati_dir=COMPATTATI_DIR,
+    path_registro=REGISTRO_PATH,
+    dimensione_obiettivo_mb=128,
+    eta_minima_s=60,
+    righe_per_gruppo=1_000_000,
+):
+    """
+    Compatta i JSONL fermi da almeno eta_minima_s secondi.
+    Restituisce il riepilogo dell'esecuzione (file, righe, Parquet scritti).
+    """
+    inizio = time.perf_counter()
+    os.makedirs(compattati_dir, exist_ok=True)
+    registro = carica_registro(path_registro)
+    _pulisci(json_dir, compattati_dir, registro)
+
+    adesso = time.time()
+    candidati = []
+    nomi_compattati = {s["file"] for lotto in registro["lotti"] for s in lotto["sorgenti"]}
+    for nome in sorted(os.listdir(json_dir)):
+        path = os.path.join(json_dir, nome)
+        if not nome.endswith(".jsonl"):
+            continue
+
+        info = os.stat(path)
+        rifiutato = registro["rifiutati"].get(nome)
+        if rifiutato and rifiutato["byte"] == info.st_size and rifiutato["mtime"] == info.st_mtime:
+            continue
+        # File modificati di recente: potrebbero essere ancora in scrittura
+        if adesso - info.st_mtime >= eta_minima_s:
+            if nome in nomi_compattati:
+                print(f"[Compattazione] {nome}: stesso nome di un file già compattato, nuovo contenuto")
+            candidati.append((nome, info))
+
+    obiettivo = dimensione_obiettivo_mb * 1024 ** 2
+    riepilogo = {"file": 0, "rifiutati": 0, "righe": 0, "output": []}
+    tabelle, sorgenti, accumulato = [], [], 0
+
+    def chiudi_lotto():
+        nonlocal tabelle, sorgenti, accumulato
+        numero = len(registro["lotti"])
+        scritti = _scrivi_lotto(tabelle, compattati_dir, numero, righe_per_gruppo)
+
+        registro["lotti"].append({
+            "lotto": numero,
+            "creato": datetime.now().isoformat(timespec="seconds"),
+            "sorgenti": sorgenti,
+            "output": scritti,
+            "righe": sum(s["righe"] for s in sorgenti),
+        })
+        for sorgente in sorgenti:
+            registro["compattati"][chiave_sorgente(sorgente["file"], sorgente["byte"], sorgente["mtime"])] = numero
+            registro["rifiutati"].pop(sorgente["file"], None)
+        salva_registro(registro, path_registro)
+
+        # Sorgenti spostati solo dopo il registro: ora i lettori usano il Parquet
+        _pulisci(json_dir, compattati_dir, registro)
+
+        riepilogo["output"].extend(scritti)
+        tabelle, sorgenti, accumulato = [], [], 0
+
+    for nome, info in candidati:
+        try:
+            tabella = converti_file(os.path.join(json_dir, nome))
+        except ValueError as errore:
+            registro["rifiutati"][nome] = {"byte": info.st_size, "mtime": info.st_mtime, "motivo": str(errore)}
+            riepilogo["rifiutati"] += 1
+            continue
+
+        tabelle.append(tabella)
+        sorgenti.append({"file": nome, "byte": info.st_size, "mtime": info.st_mtime, "righe": tabella.num_rows})
+        accumulato += tabella.nbytes
+        riepilogo["file"] += 1
+        riepilogo["righe"] += tabella.num_rows
+
+        if accumulato >= obiettivo:
+            chiudi_lotto()
+
+    if tabelle:
+        chiudi_lotto()
+    salva_registro(registro, path_registro)
+
+    print(
+        f"[Compattazione] File compattati: {riepilogo['file']} | Rifiutati: {riepilogo['rifiutati']} | "
+        f"Righe: {riepilogo['righe']:,} | Parquet scritti: {len(riepilogo['output'])} | "
+        f"{time.perf_counter() - inizio:.2f} s"
+    )
+    return riepilogo
+
+
+def servizio_compattazione(intervallo_s=300, **opzioni):
+    """
+    Compattazione periodica. Ctrl+C per interrompere.
+    """
+    try:
+        while True:
+            compatta(**opzioni)
+            time.sleep(intervallo_s)
+    except KeyboardInterrupt:
+        print("[Compattazione] Servizio fermato")
+
+
+# =====================================================
+# LETTURA COMBINATA
+# =====================================================
+
+def file_da_leggere(json_dir=JSON_DIR, compattati_dir=COMPATTATI_DIR, path_registro=REGISTRO_PATH):
+    """
+    (Parquet compattati, JSONL non ancora compattati).
+    Un JSONL già nel registro non viene restituito anche se è ancora
+    nella cartella (compattazione interrotta prima dello spostamento);
+    un file nuovo con il nome di uno già compattato invece sì.
+    """
+    registro = carica_registro(path_registro)
+
+    parquet = [os.path.join(compattati_dir, relativo) for relativo in _file_output(registro)]
+    jsonl = [
+        os.path.join(json_dir, nome)
+        for nome in sorted(os.listdir(json_dir))
+        if nome.endswith(".jsonl") and lotto_compattato(registro, json_dir, nome) is None
+    ]
+    return parquet, jsonl
+
+
+def _anno_da_percorso(path):
+    return int(os.path.basename(os.path.dirname(path))[len("year="):])
+
+
+def leggi_transazioni(colonne=None, json_dir=JSON_DIR, compattati_dir=COMPATTATI_DIR, path_registro=REGISTRO_PATH):
+    """
+    Tutte le transazioni (compattate e non) in un DataFrame pandas.
+    """
+    parquet, jsonl = file_da_leggere(json_dir, compattati_dir, path_registro)
+    parti = []
+
+    for path in parquet:
+        lette = None if colonne is None else [c for c in colonne if c != "year"]
+        df = pd.read_parquet(path, columns=lette)
+        if colonne is None or "year" in colonne:
+            df["year"] = _anno_da_percorso(path)
+        parti.append(df)
+
+    for path in jsonl:
+        df = pd.read_json(path, lines=True)
+        parti.append(df if colonne is None else df[colonne])
+
+    if not parti:
+        return pd.DataFrame(columns=colonne or SCHEMA_COMPATTATO.names)
+    return pd.concat(parti, ignore_index=True)
+
+
+def leggi_transazioni_dask(colonne=None, json_dir=JSON_DIR, compattati_dir=COMPATTATI_DIR, path_registro=REGISTRO_PATH):
+    """
+    Come leggi_transazioni, ma come Dask DataFrame: un task per file
+    Parquet compattato più uno per ogni JSONL non ancora compattato.
+    """
+    import dask.dataframe as dd
+
+    parquet, jsonl = file_da_leggere(json_dir, compattati_dir, path_registro)
+    parti = []
+
+    if parquet:
+        # year viene ricostruita dal nome della cartella (year=AAAA)
+        parti.append(dd.read_parquet(parquet, columns=colonne, dataset={"partitioning": "hive"}))
+    if jsonl:
+        ddf = dd.read_json(jsonl, lines=True)
+        parti.append(ddf if colonne is None else ddf[colonne])
+
+    if not parti:
+        return dd.from_pandas(pd.DataFrame(columns=colonne or SCHEMA_COMPATTATO.names), npartitions=1)
+    return dd.concat(parti) if len(parti) > 1 else parti[0]
+
+
+if __name__ == "__main__":
+    compatta(eta_minima_s=0)
+
+    parquet_compattati, jsonl_rimasti = file_da_leggere()
+    print(f"Parquet compattati: {len(parquet_compattati)} | JSONL ancora da compattare: {len(jsonl_rimasti)}")
+
+    transazioni = leggi_transazioni(["amount", "year"])
+    print(f"Totale generale amount: {transazioni['amount'].sum():.2f}")
+    print(transazioni.groupby("year")["amount"].mean())
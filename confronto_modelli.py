@@ -0,0 +1,179 @@
+# ============================================
+# Confronto parallelo dei modelli con K-Fold (progettofinalemodulo3)
+#
+# Nel progetto ogni modello viene valutato con cross_val_score uno dopo
+# l'altro: 6 modelli x 5 fold = 30 fit in sequenza.
+#
+# Qui ogni coppia (modello, fold) è un task indipendente:
+# - X e y vengono salvati una volta in file .npy e ogni worker li apre in
+#   memory-mapping (np.load con mmap_mode="r"): ai task passano solo i
+#   percorsi, non gli array
+# - i fold sono calcolati una volta sola come vettore "fold di ogni riga"
+#   (stessi split di KFold), salvato accanto ai dati
+# - i task girano su un pool di processi (joblib/loky, lo stesso usato da
+#   GridSearchCV con n_jobs=-1, che funziona anche negli script senza
+#   if __name__ == "__main__")
+# - per ogni task vengono registrati tempo di fit, tempo di score e processo
+#
+# I punteggi sono gli stessi di cross_val_score con lo stesso KFold.
+# ============================================
+
+import os
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+
+
+# =====================================================
+# DATI CONDIVISI
+# =====================================================
+
+def condividi_dati(X, y, kfold, cartella):
+    """
+    Salva X, y e il fold di ogni riga in cartella come .npy.
+    Restituisce i percorsi (X, y, fold) e il numero di fold.
+    """
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+    y = np.asarray(y, dtype=np.float64)
+
+    fold_di = np.full(len(X), -1, dtype=np.int16)
+    num_fold = 0
+    for numero, (_, test) in enumerate(kfold.split(X, y)):
+        fold_di[test] = numero
+        num_fold += 1
+
+    percorsi = tuple(os.path.join(cartella, nome) for nome in ("X.npy", "y.npy", "fold.npy"))
+    for path, array in zip(percorsi, (X, y, fold_di)):
+        np.save(path, array)
+
+    return percorsi, num_fold
+
+
+def _valuta(percorsi, nome, modello, fold, scoring):
+    """
+    Fit e score di un modello su un fold. Gira nel worker.
+    """
+    X, y, fold_di = (np.load(path, mmap_mode="r") for path in percorsi)
+    test = fold_di == fold
+
+    # Le righe selezionate vengono copiate dal file solo qui, nel worker
+    X_train, y_train = X[~test], y[~test]
+    X_test, y_test = X[test], y[test]
+
+    stimatore = clone(modello)
+
+    inizio = time.perf_counter()
+    stimatore.fit(X_train, y_train)
+    tempo_fit = time.perf_counter() - inizio
+
+    inizio = time.perf_counter()
+    punteggio = get_scorer(scoring)(stimatore, X_test, y_test)
+    tempo_score = time.perf_counter() - inizio
+
+    return {
+        "Model": nome,
+        "fold": fold,
+        "score": punteggio,
+        "fit_s": tempo_fit,
+        "score_s": tempo_score,
+        "pid": os.getpid(),
+    }
+
+
+# =====================================================
+# CONFRONTO
+# =====================================================
+
+def confronta_modelli(models, X, y, kfold, scoring="neg_mean_squared_error", n_jobs=-1):
+    """
+    Valuta tutte le coppie (modello, fold) in parallelo.
+    Restituisce (cv_df con Model, NMSE_mean, NMSE_std come nel progetto,
+    tempi per task).
+    """
+    inizio = time.perf_counter()
+    cartella = tempfile.mkdtemp(prefix="confronto_modelli_")
+
+    try:
+        percorsi, num_fold = condividi_dati(X, y, kfold, cartella)
+
+        # max_nbytes=None: nessuna copia automatica degli argomenti, i dati
+        # arrivano ai worker solo tramite i file in memory-mapping
+        risultati = Parallel(n_jobs=n_jobs, max_nbytes=None)(
+            delayed(_valuta)(percorsi, nome, modello, fold, scoring)
+            for nome, modello in models.items()
+            for fold in range(num_fold)
+        )
+    finally:
+        shutil.rmtree(cartella, ignore_errors=True)
+
+    tempi = pd.DataFrame(risultati)
+
+    punteggi = tempi.groupby("Model", sort=False)["score"]
+    cv_df = pd.DataFrame({
+        "Model": list(models),
+        # std con ddof=0, come scores.std() di NumPy
+        "NMSE_mean": punteggi.mean().reindex(list(models)).to_numpy(),
+        "NMSE_std": punteggi.std(ddof=0).reindex(list(models)).to_numpy(),
+    })
+
+    durata = time.perf_counter() - inizio
+    somma_task = (tempi["fit_s"] + tempi["score_s"]).sum()
+    print(
+        f"[Confronto] {len(tempi)} task ({len(models)} modelli x {num_fold} fold) su "
+        f"{tempi['pid'].nunique()} processi | {durata:.2f} s (somma dei task {somma_task:.2f} s)"
+    )
+
+    return cv_df, tempi
+
+
+def riepilogo_tempi(tempi):
+    """
+    Tempo medio e totale di fit e score per modello.
+    """
+    return tempi.groupby("Model", sort=False)[["fit_s", "score_s"]].agg(["mean", "sum"])
+
+
+if __name__ == "__main__":
+    from sklearn.datasets import load_diabetes
+    from sklearn.model_selection import KFold, cross_val_score
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.linear_model import LinearRegression, Ridge, Lasso
+    from sklearn.tree import DecisionTreeRegressor
+    from sklearn.neighbors import KNeighborsRegressor
+    from sklearn.svm import SVR
+
+    X_demo, y_demo = load_diabetes(return_X_y=True)
+    X_demo = StandardScaler().fit_transform(X_demo)
+    kfold_demo = KFold(n_splits=5, shuffle=True, random_state=42)
+
+    modelli = {
+        "LinearRegression": LinearRegression(),
+        "DecisionTree": DecisionTreeRegressor(random_state=42),
+        "Ridge": Ridge(alpha=1.0),
+        "Lasso": Lasso(alpha=0.1, max_iter=10000),
+        "KNN": KNeighborsRegressor(n_neighbors=5),
+        "SVR": SVR(kernel="rbf"),
+    }
+
+    inizio_sequenziale = time.perf_counter()
+    attesi = {
+        nome: cross_val_score(m, X_demo, y_demo, cv=kfold_demo, scoring="neg_mean_squared_error")
+        for nome, m in modelli.items()
+    }
+    print(f"[Confronto] cross_val_score in sequenza: {time.perf_counter() - inizio_sequenziale:.2f} s")
+
+    risultati_cv, tempi_task = confronta_modelli(modelli, X_demo, y_demo, kfold_demo)
+    print(risultati_cv)
+    print(riepilogo_tempi(tempi_task))
+
+    uguali = all(
+        np.isclose(risultati_cv.set_index("Model").loc[nome, "NMSE_mean"], s.mean())
+        for nome, s in attesi.items()
+    )
+    print("Stessi punteggi di cross_val_score:", uguali)
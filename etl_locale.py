@@ -0,0 +1,224 @@
+# ============================================
+# Motore ETL locale (senza JVM) per esercizio2_etl
+#
+# esercizio2_etl (progetto_finale_modulo2.py) avvia una SparkSession solo
+# per unire transactions_batch_*.parquet con products.parquet e
+# regions.parquet (poche righe) e scrivere il risultato partizionato per
+# year. Su una sola macchina l'avvio della JVM e gli shuffle dominano.
+#
+# Stesso contratto, con Arrow:
+# - le transazioni vengono lette a batch da un dataset Arrow
+# - le due dimensioni sono piccole e vengono "inviate" a ogni batch:
+#   join hash con pc.index_in (tabella hash sulle chiavi della dimensione)
+#   e pc.take per le colonne aggiunte (left join: null se manca la chiave)
+# - la scrittura è ds.write_dataset partizionato year=..., multi-thread
+#
+# L'output ha le stesse colonne di quello Spark
+# (transaction_id, region_name, category, amount + partizione year);
+# confronta_output verifica che le righe coincidano.
+# ============================================
+
+import os
+import glob
+import time
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+# Stessi percorsi di progetto_finale_modulo2 (che non si importa qui:
+# richiede pyspark, dask e watchdog)
+BASE_DIR = "./data_local"
+PARQUET_DIR = os.path.join(BASE_DIR, "parquet")
+PROCESSED_DIR = os.path.join(BASE_DIR, "processed_sales")
+
+COLONNE_OUTPUT = ["transaction_id", "region_name", "category", "amount", "year"]
+
+
+# =====================================================
+# JOIN BROADCAST
+# =====================================================
+
+class DimensioneBroadcast:
+    """
+    Tabella dimensione piccola, tenuta in memoria e usata da ogni batch.
+    """
+
+    def __init__(self, tabella, chiave, colonne):
+        self.chiavi = tabella[chiave].combine_chunks()
+        self.colonne = {c: tabella[c].combine_chunks() for c in colonne}
+        self.chiave = chiave
+
+    def unisci(self, batch):
+        """
+        Left join di un batch: per ogni riga la posizione della chiave
+        nella dimensione (null se assente), poi take delle colonne.
+        """
+        posizioni = pc.index_in(batch[self.chiave], value_set=self.chiavi)
+        return {c: pc.take(valori, posizioni) for c, valori in self.colonne.items()}
+
+
+def _trasforma(batch, prodotti, regioni):
+    colonne = {
+        "transaction_id": batch["transaction_id"],
+        "amount": batch["amount"],
+        "year": batch["year"],
+    }
+    colonne.update(prodotti.unisci(batch))
+    colonne.update(regioni.unisci(batch))
+
+    return pa.RecordBatch.from_arrays(
+        [colonne[c] for c in COLONNE_OUTPUT],
+        names=COLONNE_OUTPUT,
+    )
+
+
+# =====================================================
+# ETL
+# =====================================================
+
+def carica_dimensioni(parquet_dir=PARQUET_DIR):
+    """
+    Prodotti e regioni come tabelle broadcast.
+    """
+    prodotti = DimensioneBroadcast(pq.read_table(os.path.join(parquet_dir, "products.parquet")), "product_id", ["category"])
+    regioni = DimensioneBroadcast(pq.read_table(os.path.join(parquet_dir, "regions.parquet")), "region_id", ["region_name"])
+    return prodotti, regioni
+
+
+def schema_output(schema_transazioni, prodotti, regioni):
+    tipi = {
+        "transaction_id": schema_transazioni.field("transaction_id").type,
+        "region_name": regioni.colonne["region_name"].type,
+        "category": prodotti.colonne["category"].type,
+        "amount": schema_transazioni.field("amount").type,
+        "year": schema_transazioni.field("year").type,
+    }
+    return pa.schema([(c, tipi[c]) for c in COLONNE_OUTPUT])
+
+
+def scrivi_transazioni(file_transazioni, output_dir, prodotti, regioni, righe_per_batch=256_000, nome_file="part-{i}.parquet"):
+    """
+    Legge i file di transazioni a batch, li unisce alle dimensioni e
+    scrive in output_dir/year=.../ senza cancellare i file già presenti.
+    Restituisce (righe scritte, percorsi dei file scritti).
+    """
+    transazioni = ds.dataset(file_transazioni, format="parquet")
+    colonne_lette = ["transaction_id", "product_id", "region_id", "amount", "year"]
+    righe = 0
+    scritti = []
+
+    def batch_trasformati():
+        nonlocal righe
+        scanner = transazioni.scanner(columns=colonne_lette, batch_size=righe_per_batch, use_threads=True)
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                righe += batch.num_rows
+                yield _trasforma(batch, prodotti, regioni)
+
+    schema = schema_output(transazioni.schema, prodotti, regioni)
+
+    ds.write_dataset(
+        batch_trasformati(),
+        output_dir,
+        schema=schema,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([schema.field("year")]), flavor="hive"),
+        basename_template=nome_file,
+        existing_data_behavior="overwrite_or_ignore",
+        file_visitor=lambda file: scritti.append(file.path),
+        use_threads=True,
+    )
+
+    return righe, scritti
+
+
+def etl_locale(parquet_dir=PARQUET_DIR, output_dir=PROCESSED_DIR, righe_per_batch=256_000):
+    """
+    Extract-Transform-Load con Arrow, stesso risultato di esercizio2_etl.
+    Restituisce il numero di righe scritte.
+    """
+    file_transazioni = sorted(glob.glob(os.path.join(parquet_dir, "transactions_batch_*.parquet")))
+    prodotti, regioni = carica_dimensioni(parquet_dir)
+
+    # Come mode("overwrite") di Spark: l'output precedente viene sostituito
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    righe, _ = scrivi_transazioni(file_transazioni, output_dir, prodotti, regioni, righe_per_batch)
+
+    print(f"[ETL locale] Righe scritte: {righe} in {output_dir}")
+    return righe
+
+
+# =====================================================
+# CONFRONTO CON SPARK
+# =====================================================
+
+def leggi_output(output_dir):
+    """
+    Output partizionato come tabella unica ordinata per transaction_id.
+    """
+    tabella = ds.dataset(output_dir, format="parquet", partitioning="hive").to_table()
+    tabella = tabella.select(COLONNE_OUTPUT)
+    return tabella.sort_by("transaction_id")
+
+
+def confronta_output(dir_a, dir_b):
+    """
+    True se i due output contengono le stesse righe (valori e null),
+    indipendentemente dall'ordine e dai tipi interi/stringa usati.
+    """
+    a = leggi_output(dir_a).to_pandas()
+    b = leggi_output(dir_b).to_pandas()
+
+    if len(a) != len(b):
+        return False
+
+    for colonna in COLONNE_OUTPUT:
+        sa = a[colonna].reset_index(drop=True)
+        sb = b[colonna].reset_index(drop=True)
+
+        if sa.dtype.kind in "iuf" and sb.dtype.kind in "iuf":
+            uguali = ((sa - sb).abs() < 1e-9) | (sa.isna() & sb.isna())
+        else:
+            uguali = (sa.astype(str) == sb.astype(str)) | (sa.isna() & sb.isna())
+
+        if not uguali.all():
+            return False
+
+    return True
+
+
+def benchmark_etl(parquet_dir=PARQUET_DIR):
+    """
+    Tempo del motore locale e, se pyspark è installato, di esercizio2_etl.
+    """
+    output_locale = PROCESSED_DIR + "_locale"
+
+    inizio = time.perf_counter()
+    etl_locale(parquet_dir, output_locale)
+    tempo_locale = time.perf_counter() - inizio
+    print(f"[ETL locale] Tempo: {tempo_locale:.2f} s")
+
+    try:
+        from progetto_finale_modulo2 import esercizio2_etl
+    except ImportError as errore:
+        print(f"[ETL Spark] Non eseguito ({errore}): solo il motore locale è stato misurato")
+        return {"locale": tempo_locale}
+
+    inizio = time.perf_counter()
+    esercizio2_etl()
+    tempo_spark = time.perf_counter() - inizio
+
+    print(f"[ETL Spark] Tempo (compreso avvio della JVM): {tempo_spark:.2f} s")
+    print(f"[ETL] Speedup locale: {tempo_spark / tempo_locale:.1f}x")
+    print(f"[ETL] Output identici: {confronta_output(PROCESSED_DIR, output_locale)}")
+
+    return {"locale": tempo_locale, "spark": tempo_spark}
+
+
+if __name__ == "__main__":
+    benchmark_etl()
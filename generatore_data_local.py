@@ -0,0 +1,216 @@
+# ============================================
+# Generatore di data_local per progetto_finale_modulo2
+#
+# progetto_finale_modulo2.py legge ./data_local/json/*.jsonl e
+# ./data_local/parquet/*.parquet, ma nessun file del repository li crea:
+# senza dati non si può misurare il confronto Pandas / Dask / Spark
+# dell'Esercizio 1.
+#
+# Qui i dati vengono generati a scala configurabile:
+# - dimensione totale in GB (divisa tra JSONL e Parquet), numero di file
+# - skew: prodotti e regioni estratti con pesi 1 / rango^skew
+#   (0 = uniforme, 1 circa = pochi prodotti fanno gran parte delle vendite)
+# - products.parquet e regions.parquet con le dimensioni per il join
+#
+# Ogni file è generato a blocchi (memoria costante) da un suo seed,
+# su un pool di processi: a parità di parametri i file sono identici,
+# in qualsiasi ordine vengano creati. Le righe per file sono stimate
+# dai byte per riga misurati su un campione.
+# ============================================
+
+import os
+import time
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+CATEGORIE = ["Casa", "Tech", "Sport", "Moda", "Libri", "Giochi", "Alimentari", "Salute"]
+REGIONI = ["Nord", "Sud", "Centro", "Isole", "Estero"]
+PAGAMENTI = np.array(["carta", "contanti", "paypal", "bonifico"])
+
+ANNI = (2020, 2024)
+RIGHE_PER_BLOCCO = 500_000
+
+
+# =====================================================
+# DIMENSIONI
+# =====================================================
+
+def tabella_prodotti(num_prodotti):
+    return pd.DataFrame({
+        "product_id": np.arange(1, num_prodotti + 1, dtype=np.int64),
+        "category": [CATEGORIE[i % len(CATEGORIE)] for i in range(num_prodotti)],
+    })
+
+
+def tabella_regioni():
+    return pd.DataFrame({
+        "region_id": np.arange(1, len(REGIONI) + 1, dtype=np.int64),
+        "region_name": REGIONI,
+    })
+
+
+def pesi_zipf(n, skew):
+    """
+    Probabilità della chiave di rango r proporzionale a 1 / r^skew.
+    """
+    pesi = 1.0 / np.arange(1, n + 1) ** skew
+    return pesi / pesi.sum()
+
+
+# =====================================================
+# TRANSAZIONI
+# =====================================================
+
+def blocco_transazioni(rng, primo_id, righe, num_prodotti, skew):
+    """
+    Un blocco di transazioni con le colonne attese da esercizio1 ed esercizio2.
+    """
+    inizio = pd.Timestamp(f"{ANNI[0]}-01-01").value // 10 ** 9
+    fine = pd.Timestamp(f"{ANNI[1] + 1}-01-01").value // 10 ** 9
+    timestamp = rng.integers(inizio, fine, righe)
+
+    return pd.DataFrame({
+        "transaction_id": np.arange(primo_id, primo_id + righe, dtype=np.int64),
+        "timestamp": timestamp,
+        "product_id": rng.choice(np.arange(1, num_prodotti + 1), righe, p=pesi_zipf(num_prodotti, skew)),
+        "region_id": rng.choice(np.arange(1, len(REGIONI) + 1), righe, p=pesi_zipf(len(REGIONI), skew)),
+        "amount": rng.lognormal(3.5, 1.0, righe).round(2),
+        "year": pd.to_datetime(timestamp, unit="s").year.to_numpy(dtype=np.int64),
+        "payment_type": rng.choice(PAGAMENTI, righe),
+    })
+
+
+def _scrivi_file(path, formato, seed, indice, primo_id, righe, num_prodotti, skew):
+    """
+    Scrive un file a blocchi. Restituisce (righe, byte).
+    """
+    rng = np.random.default_rng([seed, indice])
+    tmp = path + ".tmp"
+    scrittore = None
+
+    with open(tmp, "wb") as f:
+        for inizio in range(0, righe, RIGHE_PER_BLOCCO):
+            n = min(RIGHE_PER_BLOCCO, righe - inizio)
+            df = blocco_transazioni(rng, primo_id + inizio, n, num_prodotti, skew)
+
+            if formato == "json":
+                f.write(df.to_json(orient="records", lines=True).encode("utf-8"))
+            else:
+                # Nei batch Parquet solo le colonne lette da esercizio2_etl
+                tabella = pa.Table.from_pandas(
+                    df[["transaction_id", "product_id", "region_id", "amount", "year"]], preserve_index=False
+                )
+                if scrittore is None:
+                    scrittore = pq.ParquetWriter(f, tabella.schema)
+                scrittore.write_table(tabella)
+
+        if scrittore is not None:
+            scrittore.close()
+
+    os.replace(tmp, path)
+    return righe, os.path.getsize(path)
+
+
+def byte_per_riga(formato, num_prodotti, skew, seed=0, campione=200_000):
+    """
+    Byte per riga su disco misurati su un campione.
+    """
+    df = blocco_transazioni(np.random.default_rng(seed), 0, campione, num_prodotti, skew)
+
+    if formato == "json":
+        return len(df.to_json(orient="records", lines=True).encode("utf-8")) / campione
+
+    tabella = pa.Table.from_pandas(df[["transaction_id", "product_id", "region_id", "amount", "year"]], preserve_index=False)
+    buffer = pa.BufferOutputStream()
+    pq.write_table(tabella, buffer)
+    return buffer.getvalue().size / campione
+
+
+# =====================================================
+# GENERAZIONE DI data_local
+# =====================================================
+
+def genera_data_local(
+    base_dir="./data_local",
+    dimensione_gb=1.0,
+    quota_json=0.5,
+    num_file_json=64,
+    num_file_parquet=16,
+    skew=0.0,
+    num_prodotti=50,
+    seed=42,
+    n_workers=None,
+):
+    """
+    Crea base_dir/json/transactions_NNNNN.jsonl e base_dir/parquet/
+    (transactions_batch_N.parquet, products.parquet, regions.parquet)
+    per circa dimensione_gb GB, di cui quota_json in JSONL.
+    Le cartelle json e parquet esistenti vengono sostituite; i Parquet
+    compattati e il registro della compattazione (compattazione_json)
+    vengono cancellati, perché descrivono i file JSONL precedenti.
+    Restituisce un DataFrame con righe e byte per file.
+    """
+    inizio = time.perf_counter()
+    json_dir = os.path.join(base_dir, "json")
+    parquet_dir = os.path.join(base_dir, "parquet")
+
+    for cartella in (json_dir, parquet_dir):
+        shutil.rmtree(cartella, ignore_errors=True)
+        os.makedirs(cartella)
+
+    shutil.rmtree(os.path.join(base_dir, "json_compattati"), ignore_errors=True)
+    if os.path.exists(os.path.join(base_dir, "compattazione.json")):
+        os.remove(os.path.join(base_dir, "compattazione.json"))
+
+    tabella_prodotti(num_prodotti).to_parquet(os.path.join(parquet_dir, "products.parquet"), index=False)
+    tabella_regioni().to_parquet(os.path.join(parquet_dir, "regions.parquet"), index=False)
+
+    byte_totali = dimensione_gb * 1024 ** 3
+    lavori = []
+    primo_id = 0
+
+    for formato, quota, num_file, cartella, nome in [
+        ("json", quota_json, num_file_json, json_dir, "transactions_{:05d}.jsonl"),
+        ("parquet", 1 - quota_json, num_file_parquet, parquet_dir, "transactions_batch_{}.parquet"),
+    ]:
+        if quota <= 0 or num_file <= 0:
+            continue
+
+        righe_totali = int(byte_totali * quota / byte_per_riga(formato, num_prodotti, skew, seed))
+        righe_per_file = np.diff(np.linspace(0, righe_totali, num_file + 1).astype(np.int64))
+
+        for i, righe in enumerate(righe_per_file):
+            path = os.path.join(cartella, nome.format(i))
+            # Seed diverso per file e per formato, id di transazione consecutivi
+            lavori.append((path, formato, seed, len(lavori), primo_id, int(righe), num_prodotti, skew))
+            primo_id += int(righe)
+
+    if n_workers == 1:
+        risultati = [_scrivi_file(*lavoro) for lavoro in lavori]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            risultati = list(executor.map(_scrivi_file, *zip(*lavori)))
+
+    riepilogo = pd.DataFrame(
+        [(os.path.relpath(l[0], base_dir), l[1], r, b) for l, (r, b) in zip(lavori, risultati)],
+        columns=["file", "formato", "righe", "byte"],
+    )
+
+    secondi = time.perf_counter() - inizio
+    per_formato = riepilogo.groupby("formato")[["righe", "byte"]].sum()
+    print(f"[Generatore] {len(riepilogo)} file in {base_dir} | skew {skew} | {secondi:.1f} s")
+    for formato, (righe, byte) in per_formato.iterrows():
+        print(f"[Generatore]   {formato}: {righe:,} righe | {byte / 1024 ** 3:.2f} GB")
+
+    return riepilogo
+
+
+if __name__ == "__main__":
+    # Piccola scala per una prova veloce (per il confronto usare 1-100 GB)
+    genera_data_local(dimensione_gb=0.05, num_file_json=8, num_file_parquet=4, skew=1.0)
@@ -0,0 +1,192 @@
+# ============================================
+# Top-N in streaming (heavy hitters) per prodotti e clienti
+#
+# top_n_prodotti, top_n_clienti_per_prenotazioni (Progetto_3_AgenziaViaggi)
+# e la top 3 di elaborazioni_pandas fanno un groupby e un ordinamento di
+# tutte le chiavi: servono tutti i dati e non funzionano su un flusso
+# continuo di righe.
+#
+# SketchTopN è un riassunto di tipo Space-Saving a memoria limitata:
+# - tiene al massimo `capacita` chiavi con una stima per eccesso del totale
+#   (conteggio o somma di un peso, es. Quantità o Incasso) e un errore
+# - il totale vero di una chiave è tra stima - errore e stima
+# - una chiave non presente ha totale vero <= soglia_assenti
+# - due sketch (blocchi diversi o worker diversi) si possono unire
+# ============================================
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+class SketchTopN:
+    """
+    Riassunto Space-Saving unibile con al massimo `capacita` chiavi.
+    """
+
+    def __init__(self, capacita=1000):
+        self.capacita = capacita
+        self.stime = pd.Series(dtype=np.float64)
+        self.errori = pd.Series(dtype=np.float64)
+        self.soglia_assenti = 0.0
+        self.totale = 0.0
+
+    def aggiorna(self, chiavi, pesi=None):
+        """
+        Aggiunge un blocco di righe. Il blocco viene prima aggregato
+        per chiave, quindi il costo dipende dalle chiavi distinte.
+        """
+        chiavi = pd.Series(np.asarray(chiavi))
+
+        if pesi is None:
+            somme = chiavi.value_counts(sort=False).astype(np.float64)
+        else:
+            somme = pd.Series(np.asarray(pesi, dtype=np.float64)).groupby(chiavi.to_numpy()).sum()
+
+        blocco = SketchTopN(self.capacita)
+        blocco.stime = somme
+        blocco.errori = pd.Series(0.0, index=somme.index)
+        blocco.totale = float(somme.sum())
+        blocco._tronca()
+
+        self.unisci(blocco)
+
+    def unisci(self, altro):
+        """
+        Unione di due riassunti: una chiave assente da uno dei due
+        riceve la sua soglia_assenti sia nella stima sia nell'errore.
+        """
+        chiavi = self.stime.index.union(altro.stime.index)
+
+        self.stime = (
+            self.stime.reindex(chiavi, fill_value=self.soglia_assenti)
+            + altro.stime.reindex(chiavi, fill_value=altro.soglia_assenti)
+        )
+        self.errori = (
+            self.errori.reindex(chiavi, fill_value=self.soglia_assenti)
+            + altro.errori.reindex(chiavi, fill_value=altro.soglia_assenti)
+        )
+        self.soglia_assenti = self.soglia_assenti + altro.soglia_assenti
+        self.totale += altro.totale
+
+        self._tronca()
+
+    def _tronca(self):
+        # Teniamo le `capacita` chiavi con stima più alta; la prima esclusa
+        # diventa il limite superiore per tutte le chiavi non tenute
+        if len(self.stime) <= self.capacita:
+            return
+
+        ordinate = self.stime.sort_values(ascending=False, kind="stable")
+        self.soglia_assenti = max(self.soglia_assenti, float(ordinate.iloc[self.capacita]))
+
+        tenute = ordinate.index[:self.capacita]
+        self.stime = self.stime.loc[tenute]
+        self.errori = self.errori.loc[tenute]
+
+    def top(self, n=3):
+        """
+        Le n chiavi con stima più alta, con l'intervallo del totale vero.
+        La colonna "garantita" indica se la chiave è sicuramente nella top n.
+        """
+        ordinate = self.stime.sort_values(ascending=False, kind="stable")
+        chiavi = ordinate.index[:n]
+
+        risultato = pd.DataFrame({
+            "stima": ordinate.loc[chiavi],
+            "errore": self.errori.loc[chiavi],
+        })
+        risultato["minimo_garantito"] = risultato["stima"] - risultato["errore"]
+
+        # Una chiave è sicuramente nella top n se il suo minimo supera
+        # la stima della (n+1)-esima chiave e la soglia delle chiavi assenti
+        successiva = float(ordinate.iloc[n]) if len(ordinate) > n else 0.0
+        risultato["garantita"] = risultato["minimo_garantito"] >= max(successiva, self.soglia_assenti)
+
+        return risultato
+
+    def errore_massimo(self):
+        """
+        Errore massimo su qualsiasi stima (anche per le chiavi assenti).
+        """
+        massimo = float(self.errori.max()) if len(self.errori) else 0.0
+        return max(massimo, self.soglia_assenti)
+
+
+# =====================================================
+# USO SU FILE CSV A BLOCCHI
+# =====================================================
+
+def sketch_da_csv(nome_file, colonna_chiave, colonna_peso=None, capacita=1000, righe_per_blocco=1_000_000, calcola_peso=None):
+    """
+    Costruisce uno SketchTopN leggendo un CSV a blocchi.
+    calcola_peso (opzionale) riceve il blocco e restituisce i pesi,
+    ad esempio Quantità * Prezzo_unitario per l'incasso.
+    """
+    sketch = SketchTopN(capacita)
+
+    for chunk in pd.read_csv(nome_file, chunksize=righe_per_blocco):
+        if calcola_peso is not None:
+            pesi = calcola_peso(chunk)
+        elif colonna_peso is not None:
+            pesi = chunk[colonna_peso]
+        else:
+            pesi = None
+
+        sketch.aggiorna(chunk[colonna_chiave], pesi)
+
+    return sketch
+
+
+def sketch_da_csv_parallelo(nomi_file, colonna_chiave, colonna_peso=None, capacita=1000, n_workers=None):
+    """
+    Uno sketch per file su un pool di processi, poi unione dei risultati.
+    """
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = [
+            executor.submit(sketch_da_csv, nome, colonna_chiave, colonna_peso, capacita)
+            for nome in nomi_file
+        ]
+        parziali = [f.result() for f in futures]
+
+    risultato = parziali[0]
+    for parziale in parziali[1:]:
+        risultato.unisci(parziale)
+
+    return risultato
+
+
+def stampa_top(sketch, n, titolo):
+    print(f"\n{titolo}")
+    print(sketch.top(n))
+    print(
+        f"Errore massimo sulle stime: {sketch.errore_massimo():.2f} "
+        f"({sketch.errore_massimo() / sketch.totale * 100:.3f}% del totale)"
+    )
+
+
+def _incasso(chunk):
+    return chunk["Quantità"] * chunk["Prezzo_unitario"]
+
+
+if __name__ == "__main__":
+    # Top prodotti per quantità e per incasso (vendite.csv)
+    stampa_top(
+        sketch_da_csv("vendite.csv", "Prodotto", "Quantità", capacita=4),
+        3, "Top 3 prodotti per quantità (sketch con 4 chiavi):"
+    )
+    stampa_top(
+        sketch_da_csv("vendite.csv", "Prodotto", capacita=4, calcola_peso=_incasso),
+        3, "Top 3 prodotti per incasso (sketch con 4 chiavi):"
+    )
+
+    # Top clienti per numero di ordini e per quantità (ordini.csv, 5.000 clienti)
+    stampa_top(
+        sketch_da_csv("ordini.csv", "ClienteID", capacita=1000, righe_per_blocco=50_000),
+        5, "Top 5 clienti per numero di ordini (sketch con 1000 chiavi):"
+    )
+    stampa_top(
+        sketch_da_csv("ordini.csv", "ClienteID", "Quantita", capacita=1000, righe_per_blocco=50_000),
+        5, "Top 5 clienti per quantità ordinata (sketch con 1000 chiavi):"
+    )
@@ -0,0 +1,371 @@
+# ============================================
+# Indici secondari in memoria per i filtri sugli ordini
+#
+# Sul DataFrame unificato di Progetto#2 — Analisi vendite realistica.py
+# gli analisti ripetono molti filtri (Regione, Segmento, Categoria,
+# Fornitore, intervalli di ValoreTotale e DataOrdine) e ognuno è una
+# scansione completa con maschere booleane.
+#
+# IndiceOrdini costruisce una volta:
+# - indici bitmap per le colonne categoriche: per ogni valore un array di
+#   bit compresso (1 bit per riga); i filtri in AND diventano AND tra bitmap
+# - una permutazione ordinata per le colonne numeriche/date: un intervallo
+#   si trova con due ricerche binarie. Le righe con NaN/NaT restano fuori
+#   dalla permutazione, come nella scansione nessun confronto le seleziona
+#
+# Un piccolo pianificatore stima quante righe candidate lascia l'indice
+# (i filtri in AND sono stimati come indipendenti):
+# - troppe candidate (o nessun indice utile) -> scansione classica
+# - intervallo più selettivo delle bitmap -> posizioni dall'indice ordinato,
+#   poi controllo degli altri filtri solo su quelle righe
+# - altrimenti -> AND delle bitmap, poi controllo degli altri filtri
+# ============================================
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from archivio_ordini import maschera_filtri
+
+
+COLONNE_BITMAP = ["Regione", "Segmento", "Categoria", "Fornitore"]
+COLONNE_ORDINATE = ["ValoreTotale", "DataOrdine"]
+
+# Se l'indice lascia più di questa frazione di righe candidate, ricavarne
+# le posizioni costa più di una scansione (misurato con 5 milioni di righe)
+SOGLIA_SCANSIONE = 0.05
+
+OPERATORI_BITMAP = {"==", "!=", "in"}
+OPERATORI_INTERVALLO = {"==", "<", "<=", ">", ">="}
+
+
+class IndiceOrdini:
+    """
+    Indici bitmap e ordinati costruiti su un DataFrame che non cambia.
+    """
+
+    def __init__(self, df, colonne_bitmap=COLONNE_BITMAP, colonne_ordinate=COLONNE_ORDINATE):
+        self.df = df
+        self.num_righe = len(df)
+
+        # Bitmap: {colonna: {valore: (bit compressi, numero di righe)}}
+        self.bitmap = {}
+        for colonna in colonne_bitmap:
+            codici, valori = pd.factorize(df[colonna])
+            self.bitmap[colonna] = {}
+
+            for codice, valore in enumerate(valori):
+                maschera = codici == codice
+                self.bitmap[colonna][valore] = (np.packbits(maschera), int(maschera.sum()))
+
+        # Indici ordinati: {colonna: (permutazione, valori ordinati)},
+        # solo per le righe con un valore (senza NaN/NaT)
+        self.ordinati = {}
+        self.valori = {}
+        self.tipi = {}
+        for colonna in colonne_ordinate:
+            valori = df[colonna].to_numpy()
+            self.tipi[colonna] = valori.dtype
+            if np.issubdtype(valori.dtype, np.floating):
+                # In float64 la ricerca binaria con un valore Python
+                # non deve convertire tutto l'array a ogni filtro
+                valori = valori.astype(np.float64)
+
+            # argsort mette NaN e NaT in fondo: basta tagliare la permutazione
+            non_nulli = self.num_righe - int(pd.isna(valori).sum())
+            permutazione = np.argsort(valori, kind="stable")[:non_nulli]
+            self.ordinati[colonna] = (permutazione, valori[permutazione])
+            self.valori[colonna] = valori
+
+    # -------------------------------------------------
+    # Singoli filtri
+    # -------------------------------------------------
+
+    def _bit_zero(self):
+        return np.zeros((self.num_righe + 7) // 8, dtype=np.uint8)
+
+    def _bitmap_filtro(self, colonna, operatore, valore):
+        """
+        (bit compressi, righe stimate) per un filtro su colonna con bitmap.
+        """
+        indice = self.bitmap[colonna]
+
+        if operatore == "in":
+            bit = self._bit_zero()
+            conteggio = 0
+            for v in valore:
+                if v in indice:
+                    bit |= indice[v][0]
+                    conteggio += indice[v][1]
+            return bit, conteggio
+
+        bit, conteggio = indice.get(valore, (self._bit_zero(), 0))
+        if operatore == "!=":
+            return ~bit, self.num_righe - conteggio
+        return bit, conteggio
+
+    def _intervallo(self, colonna, filtri):
+        """
+        Limiti [inizio, fine) nella permutazione ordinata per tutti
+        i filtri su una stessa colonna (es. > 100 e <= 300).
+        """
+        _, ordinati = self.ordinati[colonna]
+        inizio, fine = 0, len(ordinati)
+
+        for _, operatore, valore in filtri:
+            valore = _valore_confrontabile(self.tipi[colonna], valore)
+
+            if operatore in (">", "<="):
+                taglio = int(np.searchsorted(ordinati, valore, side="right"))
+            else:
+                taglio = int(np.searchsorted(ordinati, valore, side="left"))
+
+            if operatore in (">", ">="):
+                inizio = max(inizio, taglio)
+            elif operatore in ("<", "<="):
+                fine = min(fine, taglio)
+            else:
+                inizio = max(inizio, taglio)
+                fine = min(fine, int(np.searchsorted(ordinati, valore, side="right")))
+
+        return inizio, max(inizio, fine)
+
+    # -------------------------------------------------
+    # Pianificazione ed esecuzione
+    # -------------------------------------------------
+
+    def pianifica(self, filtri):
+        """
+        Sceglie tra indice e scansione. Restituisce un dizionario con
+        il metodo, le righe stimate e i filtri divisi per tipo.
+        """
+        bitmap = [f for f in filtri if f[0] in self.bitmap and f[1] in OPERATORI_BITMAP]
+        intervalli = {}
+        for f in filtri:
+            if f[0] in self.ordinati and f[1] in OPERATORI_INTERVALLO and f not in bitmap:
+                intervalli.setdefault(f[0], []).append(f)
+        # Tutto il resto, compresi != e "in" sulle colonne con intervallo
+        residui = [f for f in filtri if f not in bitmap and f not in intervalli.get(f[0], [])]
+
+        # Frazione di righe che passa ogni filtro; le bitmap in AND
+        # si stimano come indipendenti (prodotto delle frazioni)
+        frazioni_bitmap = [self._bitmap_filtro(*f)[1] / self.num_righe for f in bitmap]
+        limiti = {colonna: self._intervallo(colonna, f) for colonna, f in intervalli.items()}
+        frazioni_intervallo = [(fine - inizio) / self.num_righe for inizio, fine in limiti.values()]
+
+        stima_bitmap = self.num_righe * np.prod(frazioni_bitmap) if bitmap else self.num_righe
+        colonna_intervallo = min(limiti, key=lambda c: limiti[c][1] - limiti[c][0], default=None)
+        stima_intervallo = (
+            self.num_righe if colonna_intervallo is None
+            else limiti[colonna_intervallo][1] - limiti[colonna_intervallo][0]
+        )
+        stima = self.num_righe * np.prod(frazioni_bitmap + frazioni_intervallo)
+
+        candidati = min(stima_bitmap, stima_intervallo)
+
+        if (not bitmap and not intervalli) or candidati > SOGLIA_SCANSIONE * self.num_righe:
+            metodo = "scansione"
+        elif stima_intervallo <= stima_bitmap:
+            metodo = f"intervallo su {colonna_intervallo}"
+        else:
+            metodo = "bitmap"
+
+        return {
+            "metodo": metodo,
+            "righe_stimate": int(stima),
+            "bitmap": bitmap,
+            "intervalli": intervalli,
+            "limiti": limiti,
+            "colonna_intervallo": colonna_intervallo,
+            "residui": residui,
+        }
+
+    def seleziona(self, filtri):
+        """
+        Posizioni (ordinate) delle righe che soddisfano tutti i filtri.
+        """
+        piano = self.pianifica(filtri)
+
+        if piano["metodo"] == "scansione":
+            return np.flatnonzero(maschera_filtri(self.df, filtri))
+
+        da_controllare = list(piano["residui"])
+
+        if piano["metodo"] == "bitmap":
+            bit = None
+            for colonna, operatore, valore in piano["bitmap"]:
+                b = self._bitmap_filtro(colonna, operatore, valore)[0]
+                bit = b.copy() if bit is None else bit & b
+            posizioni = self._posizioni(bit)
+
+            for filtri_colonna in piano["intervalli"].values():
+                da_controllare.extend(filtri_colonna)
+        else:
+            colonna = piano["colonna_intervallo"]
+            inizio, fine = piano["limiti"][colonna]
+            posizioni = self._posizioni_intervallo(colonna, inizio, fine)
+
+            # Bitmap: controllo del bit di ogni candidato
+            for f in piano["bitmap"]:
+                bit = self._bitmap_filtro(*f)[0]
+                posizioni = posizioni[(bit[posizioni >> 3] >> (7 - (posizioni & 7))) & 1 == 1]
+
+            for altra, filtri_colonna in piano["intervalli"].items():
+                if altra != colonna:
+                    da_controllare.extend(filtri_colonna)
+
+        # Filtri rimanenti valutati solo sulle righe candidate
+        if da_controllare and len(posizioni):
+            posizioni = posizioni[self._controlla(posizioni, da_controllare)]
+
+        return posizioni
+
+    def _posizioni(self, bit):
+        # Solo i byte non nulli vengono espansi in bit
+        byte_pieni = np.flatnonzero(bit)
+        bit_pieni = np.flatnonzero(np.unpackbits(bit[byte_pieni]))
+        posizioni = byte_pieni[bit_pieni >> 3] * 8 + (bit_pieni & 7)
+        return posizioni[posizioni < self.num_righe]
+
+    def _posizioni_intervallo(self, colonna, inizio, fine):
+        permutazione = self.ordinati[colonna][0][inizio:fine]
+
+        # Molti candidati: una maschera costa meno di un ordinamento
+        if len(permutazione) > self.num_righe // 32:
+            maschera = np.zeros(self.num_righe, dtype=bool)
+            maschera[permutazione] = True
+            return np.flatnonzero(maschera)
+
+        return np.sort(permutazione)
+
+    def _controlla(self, posizioni, filtri):
+        """
+        Maschera dei candidati: le colonne indicizzate si confrontano
+        sugli array, le altre con maschera_filtri sulle sole righe candidate.
+        """
+        maschera = np.ones(len(posizioni), dtype=bool)
+        altri = []
+
+        for colonna, operatore, valore in filtri:
+            if colonna in self.valori and operatore in OPERATORI_INTERVALLO:
+                valori = self.valori[colonna][posizioni]
+                valore = _valore_confrontabile(self.tipi[colonna], valore)
+                confronto = {
+                    "==": np.equal, "<": np.less, "<=": np.less_equal,
+                    ">": np.greater, ">=": np.greater_equal,
+                }[operatore]
+                maschera &= confronto(valori, valore)
+            else:
+                altri.append((colonna, operatore, valore))
+
+        if altri:
+            colonne = list(dict.fromkeys(c for c, _, _ in altri))
+            maschera &= maschera_filtri(self.df[colonne].iloc[posizioni], altri)
+
+        return maschera
+
+    def filtra(self, filtri):
+        return self.df.iloc[self.seleziona(filtri)]
+
+
+def _valore_confrontabile(tipo, valore):
+    # Le date possono arrivare come stringhe o Timestamp
+    if np.issubdtype(tipo, np.datetime64):
+        return np.datetime64(pd.Timestamp(valore)).astype(tipo)
+
+    # Come nella scansione: il valore viene prima portato al tipo della
+    # colonna (es. 102.73 in float32), poi confrontato in float64
+    if np.issubdtype(tipo, np.floating):
+        return np.float64(np.asarray(valore, dtype=tipo))
+    return valore
+
+
+# =====================================================
+# BENCHMARK
+# =====================================================
+
+def benchmark_indici(df, interrogazioni, ripetizioni=10):
+    """
+    Tempo medio (ms) di indice e scansione per ogni interrogazione,
+    con il metodo scelto dal pianificatore. Controlla anche che i
+    risultati coincidano.
+    """
+    inizio = time.perf_counter()
+    indice = IndiceOrdini(df)
+    costruzione = time.perf_counter() - inizio
+
+    righe = []
+    for nome, filtri in interrogazioni.items():
+        attese = np.flatnonzero(maschera_filtri(df, filtri))
+        if not np.array_equal(indice.seleziona(filtri), attese):
+            raise AssertionError(f"Risultato diverso dalla scansione: {nome}")
+
+        inizio = time.perf_counter()
+        for _ in range(ripetizioni):
+            indice.seleziona(filtri)
+        tempo_indice = (time.perf_counter() - inizio) / ripetizioni * 1000
+
+        inizio = time.perf_counter()
+        for _ in range(ripetizioni):
+            np.flatnonzero(maschera_filtri(df, filtri))
+        tempo_scansione = (time.perf_counter() - inizio) / ripetizioni * 1000
+
+        righe.append({
+            "interrogazione": nome,
+            "piano": indice.pianifica(filtri)["metodo"],
+            "righe": len(attese),
+            "indice_ms": tempo_indice,
+            "scansione_ms": tempo_scansione,
+            "speedup": tempo_scansione / tempo_indice,
+        })
+
+    risultato = pd.DataFrame(righe).set_index("interrogazione")
+
+    print(f"\n[Indici] {len(df):,} righe | costruzione indici: {costruzione:.2f} s")
+    print(risultato.round(2))
+
+    return risultato
+
+
+INTERROGAZIONI_ESEMPIO = {
+    "Regione == Nord": [("Regione", "==", "Nord")],
+    "Nord & VIP & Tech": [("Regione", "==", "Nord"), ("Segmento", "==", "VIP"), ("Categoria", "==", "Tech")],
+    "Isole & Amazon & Valore > 500": [("Regione", "==", "Isole"), ("Fornitore", "==", "Amazon"), ("ValoreTotale", ">", 500)],
+    "Valore tra 900 e 950": [("ValoreTotale", ">=", 900), ("ValoreTotale", "<", 950)],
+    "Settimana di Natale & Sud": [("DataOrdine", ">=", "2025-12-20"), ("DataOrdine", "<=", "2025-12-26"), ("Regione", "==", "Sud")],
+    "Valore > 100": [("ValoreTotale", ">", 100)],
+}
+
+
+if __name__ == "__main__":
+    from arricchimento_ordini import arricchisci_ordini, genera_ordini
+    from schema_ordini import carica_unificato, carica_prodotti, carica_clienti
+
+    df_ordini = carica_unificato()
+    df_ordini["ValoreTotale"] = df_ordini["Prezzo"] * df_ordini["Quantita"]
+    benchmark_indici(df_ordini, INTERROGAZIONI_ESEMPIO)
+
+    # Con valori mancanti (es. ProdottoID sconosciuto dopo la join a sinistra)
+    # indice e scansione devono restituire le stesse righe
+    df_nulli = df_ordini.copy()
+    df_nulli.loc[df_nulli.index[::20], "ValoreTotale"] = np.nan
+    df_nulli.loc[df_nulli.index[::30], "DataOrdine"] = pd.NaT
+    benchmark_indici(df_nulli, {
+        **INTERROGAZIONI_ESEMPIO,
+        "Valore > 950": [("ValoreTotale", ">", 950)],
+        "Non Nord & Valore > 990": [("Regione", "!=", "Nord"), ("ValoreTotale", ">", 990)],
+        "Data dopo il 20/12/2025": [("DataOrdine", ">", "2025-12-20")],
+        # Intervallo e != / in sulla stessa colonna ordinata
+        "Valore > 900 e != 950": [("ValoreTotale", ">", 900), ("ValoreTotale", "!=", 950)],
+        "Dal 20/12/2025 tranne la vigilia": [("DataOrdine", ">=", "2025-12-20"), ("DataOrdine", "!=", "2025-12-24")],
+        "Dal 20/12/2025, solo 25 e 26": [
+            ("DataOrdine", ">=", "2025-12-20"),
+            ("DataOrdine", "in", [pd.Timestamp("2025-12-25"), pd.Timestamp("2025-12-26")]),
+        ],
+    })
+
+    # Stesso confronto su 5 milioni di ordini
+    df_grande = arricchisci_ordini(genera_ordini(5_000_000), carica_prodotti(), carica_clienti())
+    df_grande["ValoreTotale"] = df_grande["Prezzo"] * df_grande["Quantita"]
+    benchmark_indici(df_grande, INTERROGAZIONI_ESEMPIO, ripetizioni=5)
@@ -0,0 +1,342 @@
+# ============================================
+# Ingestione JSONL parallela con estrazione dei soli campi richiesti
+#
+# esercizio1_pandas (progetto_finale_modulo2.py) legge i file di
+# ./data_local/json uno dopo l'altro e costruisce un DataFrame completo
+# per ognuno con pd.read_json(lines=True), solo per sommare "amount".
+#
+# Qui:
+# - ogni file viene letto da un processo del pool come bytes
+# - i campi richiesti vengono estratti con una espressione regolare sui
+#   bytes (niente json.loads per riga, niente DataFrame)
+# - somme e aggregati per gruppo (conteggio e somma per chiave) vengono
+#   calcolati con NumPy e uniti tra file come piccoli dizionari
+# - si possono passare anche file .parquet (es. i Parquet compattati da
+#   compattazione_json): vengono lette solo le colonne richieste e i campi
+#   di gruppo assenti dal file si prendono dalle cartelle campo=valore
+#
+# L'estrazione veloce richiede record JSON "piatti" con ogni campo una
+# volta per riga (come quelli del generatore). Se in un file un campo
+# manca, compare più volte o ha un valore non numerico (es. null), quel
+# file viene letto con json.loads.
+# ============================================
+
+import os
+import re
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+
+def _regex_campo(campo):
+    # Valore: stringa JSON tra virgolette oppure numero/letterale fino a , o }
+    return re.compile(rb'"' + re.escape(campo.encode()) + rb'"\s*:\s*("(?:[^"\\]|\\.)*"|[^,}\s]+)')
+
+
+def _decodifica_chiave(valore):
+    # Chiave di gruppo: numero intero, stringa o letterale JSON
+    testo = valore.decode("utf-8")
+    try:
+        return json.loads(testo)
+    except ValueError:
+        return testo
+
+
+def _codici_gruppo(grezze):
+    """
+    (chiavi distinte, codice per record). Le chiavi intere (es. year,
+    region_id) usano un bincount sull'intervallo dei valori, le altre np.unique.
+    """
+    try:
+        interi = grezze.astype(np.int64)
+    except ValueError:
+        distinte, codici = np.unique(grezze, return_inverse=True)
+        return [_decodifica_chiave(k) for k in distinte], codici
+
+    minimo = int(interi.min()) if len(interi) else 0
+    massimo = int(interi.max()) if len(interi) else -1
+
+    if massimo - minimo > 4 * len(interi) + 1024:
+        distinte, codici = np.unique(interi, return_inverse=True)
+        return distinte.tolist(), codici
+
+    return list(range(minimo, massimo + 1)), interi - minimo
+
+
+# =====================================================
+# LETTURA DI UN FILE
+# =====================================================
+
+def _estrai_veloce(dati, campo_valore, campi_gruppo):
+    """
+    Estrae i campi con le espressioni regolari.
+    Restituisce None se i record non sono tutti allineati
+    o se un valore non è un numero (es. "amount": null).
+    """
+    # Record = righe che iniziano con "{" (conteggio sui bytes, senza regex)
+    num_record = dati.count(b"\n{") + dati.startswith(b"{")
+    valori = _regex_campo(campo_valore).findall(dati)
+
+    if len(valori) != num_record:
+        return None
+
+    chiavi = {}
+    for campo in campi_gruppo:
+        trovate = _regex_campo(campo).findall(dati)
+        if len(trovate) != num_record:
+            return None
+        chiavi[campo] = trovate
+
+    try:
+        valori = np.array(valori, dtype="S").astype(np.float64)
+    except ValueError:
+        return None
+
+    return valori, chiavi
+
+
+def _estrai_con_json(dati, campo_valore, campi_gruppo):
+    """
+    Lettura riga per riga con json.loads, usata se l'estrazione veloce
+    non è possibile. Le righe senza il campo valore vengono saltate.
+    """
+    valori = []
+    chiavi = {campo: [] for campo in campi_gruppo}
+
+    for riga in dati.splitlines():
+        if not riga.strip():
+            continue
+        record = json.loads(riga)
+        if record.get(campo_valore) is None:
+            continue
+
+        valori.append(float(record[campo_valore]))
+        for campo in campi_gruppo:
+            chiavi[campo].append(json.dumps(record.get(campo)).encode("utf-8"))
+
+    return np.array(valori, dtype=np.float64), chiavi
+
+
+def _estrai_parquet(path, campo_valore, campi_gruppo):
+    """
+    Stesso risultato di _estrai_veloce per un file Parquet. Le chiavi
+    diventano testo come nel JSONL (null per i valori mancanti); i campi
+    assenti dal file vengono dalle cartelle campo=valore del percorso.
+    """
+    partizioni = dict(
+        parte.split("=", 1) for parte in os.path.dirname(os.path.abspath(path)).split(os.sep) if "=" in parte
+    )
+    colonne = set(pq.read_schema(path).names)
+    tabella = pq.read_table(path, columns=[campo_valore] + [c for c in campi_gruppo if c in colonne])
+
+    valori = tabella[campo_valore].to_numpy(zero_copy_only=False).astype(np.float64)
+    presenti = ~np.isnan(valori)
+
+    chiavi = {}
+    for campo in campi_gruppo:
+        if campo in colonne:
+            testo = tabella[campo].to_pandas().astype(object)
+            grezze = np.array([b"null" if pd.isna(v) else str(v).encode("utf-8") for v in testo], dtype="S")
+        else:
+            grezze = np.full(len(valori), partizioni.get(campo, "null").encode("utf-8"))
+        chiavi[campo] = grezze[presenti]
+
+    return valori[presenti], chiavi
+
+
+def leggi_file(path, campo_valore="amount", campi_gruppo=()):
+    """
+    Aggregati di un file JSONL (o Parquet):
+    {"file", "byte", "righe", "somma", "gruppi": {campo: {chiave: [conteggio, somma]}}}
+    """
+    if path.endswith(".parquet"):
+        byte = os.path.getsize(path)
+        valori, chiavi = _estrai_parquet(path, campo_valore, campi_gruppo)
+    else:
+        with open(path, "rb") as f:
+            dati = f.read()
+        byte = len(dati)
+
+        estratti = _estrai_veloce(dati, campo_valore, campi_gruppo)
+        if estratti is None:
+            estratti = _estrai_con_json(dati, campo_valore, campi_gruppo)
+
+        valori, chiavi = estratti
+
+    gruppi = {}
+    for campo, grezze in chiavi.items():
+        distinte, codici = _codici_gruppo(np.array(grezze, dtype="S"))
+        conteggi = np.bincount(codici, minlength=len(distinte))
+        somme = np.bincount(codici, weights=valori, minlength=len(distinte))
+
+        gruppi[campo] = {
+            k: [int(c), float(s)]
+            for k, c, s in zip(distinte, conteggi, somme)
+            if c > 0
+        }
+
+    return {
+        "file": 1,
+        "byte": byte,
+        "righe": len(valori),
+        "somma": float(valori.sum()),
+        "gruppi": gruppi,
+    }
+
+
+def unisci_risultati(a, b):
+    """
+    Somma di due risultati parziali (anche di più file).
+    """
+    gruppi = {campo: {k: list(v) for k, v in g.items()} for campo, g in a["gruppi"].items()}
+
+    for campo, g in b["gruppi"].items():
+        destinazione = gruppi.setdefault(campo, {})
+        for chiave, (conteggio, somma) in g.items():
+            attuale = destinazione.setdefault(chiave, [0, 0.0])
+            attuale[0] += conteggio
+            attuale[1] += somma
+
+    return {
+        "file": a["file"] + b["file"],
+        "byte": a["byte"] + b["byte"],
+        "righe": a["righe"] + b["righe"],
+        "somma": a["somma"] + b["somma"],
+        "gruppi": gruppi,
+    }
+
+
+# =====================================================
+# INGESTIONE PARALLELA
+# =====================================================
+
+def ingestione_parallela(cartella, campo_valore="amount", campi_gruppo=(), n_workers=None):
+    """
+    Legge tutti i .jsonl della cartella su un pool di processi.
+    Al posto della cartella si può passare una lista di file .jsonl e
+    .parquet (es. quella di compattazione_json.file_da_leggere).
+    I parziali vengono uniti nell'ordine dei nomi dei file (o della lista),
+    così il risultato è lo stesso a ogni esecuzione.
+    """
+    inizio = time.perf_counter()
+    if isinstance(cartella, (list, tuple)):
+        paths = list(cartella)
+    else:
+        paths = [
+            os.path.join(cartella, nome)
+            for nome in sorted(os.listdir(cartella))
+            if nome.endswith(".jsonl")
+        ]
+
+    vuoto = {"file": 0, "byte": 0, "righe": 0, "somma": 0.0, "gruppi": {}}
+    if not paths:
+        return vuoto
+
+    argomenti = ([campo_valore] * len(paths), [tuple(campi_gruppo)] * len(paths))
+
+    if n_workers == 1 or len(paths) == 1:
+        parziali = list(map(leggi_file, paths, *argomenti))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            parziali = list(executor.map(leggi_file, paths, *argomenti, chunksize=max(1, len(paths) // 64)))
+
+    risultato = vuoto
+    for parziale in parziali:
+        risultato = unisci_risultati(risultato, parziale)
+
+    risultato["secondi"] = time.perf_counter() - inizio
+    return risultato
+
+
+def medie_per_gruppo(risultato, campo):
+    """
+    Media del valore per chiave di gruppo (es. media di amount per year).
+    """
+    gruppi = risultato["gruppi"][campo]
+    return pd.Series(
+        {chiave: somma / conteggio for chiave, (conteggio, somma) in sorted(gruppi.items())},
+        name="media",
+    ).rename_axis(campo)
+
+
+# =====================================================
+# CONFRONTO CON esercizio1_pandas
+# =====================================================
+
+def _somma_pandas(cartella, campo_valore="amount"):
+    # Stessa logica di esercizio1_pandas, senza stampe: qui non si importa
+    # progetto_finale_modulo2 perché richiede dask, pyspark e watchdog
+    totale = 0.0
+    for nome in os.listdir(cartella):
+        if nome.endswith(".jsonl"):
+            totale += pd.read_json(os.path.join(cartella, nome), lines=True)[campo_valore].sum()
+    return totale
+
+
+def benchmark_ingestione(cartella, campo_valore="amount", campi_gruppo=("year",), n_workers=None):
+    """
+    File/s e MB/s di esercizio1_pandas e dell'ingestione parallela.
+    """
+    inizio = time.perf_counter()
+    totale_pandas = _somma_pandas(cartella, campo_valore)
+    secondi_pandas = time.perf_counter() - inizio
+
+    risultato = ingestione_parallela(cartella, campo_valore, campi_gruppo, n_workers)
+
+    mb = risultato["byte"] / 1024 ** 2
+    tabella = pd.DataFrame({
+        "secondi": [secondi_pandas, risultato["secondi"]],
+        "file_al_s": [risultato["file"] / secondi_pandas, risultato["file"] / risultato["secondi"]],
+        "MB_al_s": [mb / secondi_pandas, mb / risultato["secondi"]],
+    }, index=["esercizio1_pandas", "ingestione_parallela"])
+
+    print(f"\n[Ingestione] {risultato['file']} file | {mb:.1f} MB | {risultato['righe']:,} righe")
+    print(tabella.round(2))
+    print(f"[Ingestione] Totale {campo_valore}: pandas {totale_pandas:.2f} | parallela {risultato['somma']:.2f}")
+
+    return tabella
+
+
+def verifica_valori_mancanti():
+    """
+    Controllo su file con "amount": null e senza "amount": l'ingestione
+    deve saltare quei record come pd.read_json e dare la stessa somma.
+    """
+    import tempfile
+
+    righe = [
+        {"transaction_id": 1, "amount": 10.5, "year": 2023},
+        {"transaction_id": 2, "amount": None, "year": 2023},
+        {"transaction_id": 3, "year": 2024},
+        {"transaction_id": 4, "amount": 4.25, "year": 2024},
+    ]
+
+    with tempfile.TemporaryDirectory() as cartella:
+        for nome, record in [("nulli.jsonl", righe[:2] + righe[3:]), ("mancanti.jsonl", righe)]:
+            with open(os.path.join(cartella, nome), "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(r) + "\n" for r in record)
+
+        risultato = ingestione_parallela(cartella, "amount", ("year",), n_workers=1)
+        atteso = _somma_pandas(cartella)
+
+    assert risultato["righe"] == 4, risultato["righe"]
+    assert np.isclose(risultato["somma"], atteso), (risultato["somma"], atteso)
+    assert risultato["gruppi"]["year"] == {2023: [2, 21.0], 2024: [2, 8.5]}, risultato["gruppi"]
+    print(f"[Ingestione] Valori mancanti saltati come in pd.read_json: somma {risultato['somma']:.2f}")
+
+
+if __name__ == "__main__":
+    verifica_valori_mancanti()
+
+    cartella_json = os.path.join("./data_local", "json")
+
+    risultato_ingestione = ingestione_parallela(cartella_json, "amount", ("year", "region_id"))
+    print(f"Totale generale amount: {risultato_ingestione['somma']:.2f}")
+    print("Media amount per year:")
+    print(medie_per_gruppo(risultato_ingestione, "year"))
+
+    benchmark_ingestione(cartella_json)
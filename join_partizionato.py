@@ -0,0 +1,219 @@
+# ============================================
+# Join partizionato su disco per ordini più grandi della memoria
+#
+# Il merge di Progetto#2 — Analisi vendite realistica.py presuppone che
+# ordini.csv e il risultato arricchito stiano in RAM.
+#
+# Qui il join avviene in due fasi, con memoria limitata:
+# 1. partizionamento: ordini.csv viene letto a blocchi e ogni riga va nella
+#    partizione hash(ClienteID) % num_partizioni, scritta su disco in Parquet
+# 2. join: ogni partizione viene letta da sola e arricchita con le tabelle
+#    dimensione (prodotti, clienti) inviate a tutti i worker; il risultato
+#    è un file Parquet per partizione
+#
+# Le dimensioni con chiavi dense usano il lookup su array; per quelle con
+# chiavi sparse ogni worker tiene solo le righe della propria partizione
+# (stesso hash), così anche il merge lavora su una parte della tabella.
+#
+# memoria_mb stabilisce le righe per blocco nella prima fase e il numero
+# di partizioni (ogni partizione deve stare nella memoria di un worker).
+# ============================================
+
+import os
+import math
+import time
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from schema_ordini import SCHEMA_ORDINI, DATE_ORDINI, carica_prodotti, carica_clienti
+from arricchimento_ordini import TabellaLookup, arricchisci
+
+
+# Stime prudenti per passare da memoria a righe:
+# - lettura CSV: testo, oggetti temporanei e date da convertire
+# - join: ordini tipizzati più le colonne aggiunte dalle dimensioni
+BYTE_PER_RIGA_LETTURA = 400
+BYTE_PER_RIGA_JOIN = 100
+BYTE_PER_RIGA_CSV = 25
+
+
+def numero_partizione(chiavi, num_partizioni):
+    """
+    Partizione di ogni chiave: hash a 64 bit modulo num_partizioni.
+    Le chiavi sono portate a int64, così ordini e dimensioni
+    (anche con tipi interi diversi) finiscono nella stessa partizione.
+    """
+    chiavi = np.asarray(chiavi, dtype=np.int64)
+    return (pd.util.hash_array(chiavi) % np.uint64(num_partizioni)).astype(np.int64)
+
+
+def pianifica_memoria(path_ordini, memoria_mb, n_workers=1):
+    """
+    Righe per blocco e numero di partizioni per stare in memoria_mb per worker.
+    """
+    memoria = memoria_mb * 1024 ** 2
+    righe_stimate = os.path.getsize(path_ordini) / BYTE_PER_RIGA_CSV
+
+    righe_per_blocco = max(1_000, int(memoria / BYTE_PER_RIGA_LETTURA))
+    righe_per_partizione = max(1_000, int(memoria / BYTE_PER_RIGA_JOIN))
+    num_partizioni = max(n_workers or 1, math.ceil(righe_stimate / righe_per_partizione))
+
+    return righe_per_blocco, num_partizioni
+
+
+# =====================================================
+# FASE 1 - PARTIZIONAMENTO SU DISCO
+# =====================================================
+
+def partiziona_ordini(path_ordini, cartella, num_partizioni, chiave="ClienteID", righe_per_blocco=1_000_000):
+    """
+    Scrive gli ordini in cartella/part=NNNN/blocco-XXXXX.parquet.
+    In memoria c'è un solo blocco alla volta.
+    Restituisce il numero di righe per partizione.
+    """
+    shutil.rmtree(cartella, ignore_errors=True)
+    righe = np.zeros(num_partizioni, dtype=np.int64)
+
+    blocchi = pd.read_csv(path_ordini, dtype=SCHEMA_ORDINI, parse_dates=DATE_ORDINI, chunksize=righe_per_blocco)
+
+    for numero, chunk in enumerate(blocchi):
+        partizioni = numero_partizione(chunk[chiave].to_numpy(), num_partizioni)
+
+        # Ordinando per partizione ogni pezzo è una fetta contigua
+        ordine = np.argsort(partizioni, kind="stable")
+        partizioni = partizioni[ordine]
+        chunk = chunk.iloc[ordine]
+        confini = np.flatnonzero(np.r_[True, partizioni[1:] != partizioni[:-1], True])
+
+        for inizio, fine in zip(confini[:-1], confini[1:]):
+            p = int(partizioni[inizio])
+            cartella_partizione = os.path.join(cartella, f"part={p:04d}")
+            os.makedirs(cartella_partizione, exist_ok=True)
+
+            tabella = pa.Table.from_pandas(chunk.iloc[inizio:fine], preserve_index=False)
+            pq.write_table(tabella, os.path.join(cartella_partizione, f"blocco-{numero:05d}.parquet"))
+            righe[p] += fine - inizio
+
+    return righe
+
+
+# =====================================================
+# FASE 2 - JOIN PER PARTIZIONE
+# =====================================================
+
+def _dimensione_partizione(dimensione, chiave, partizione, num_partizioni):
+    # Con chiavi dense il lookup usa la tabella intera (un array per colonna)
+    if TabellaLookup.densa(dimensione, chiave):
+        return dimensione
+    return dimensione[numero_partizione(dimensione[chiave].to_numpy(), num_partizioni) == partizione]
+
+
+def _unisci_partizione(cartella_partizione, path_output, partizione, num_partizioni, prodotti, clienti):
+    """
+    Legge una partizione, la arricchisce e scrive il risultato.
+    Restituisce (righe, secondi).
+    """
+    inizio = time.perf_counter()
+
+    ordini = pq.read_table(cartella_partizione).to_pandas()
+
+    df = arricchisci(ordini, prodotti, "ProdottoID")
+    df = arricchisci(df, _dimensione_partizione(clienti, "ClienteID", partizione, num_partizioni), "ClienteID")
+
+    tmp = path_output + ".tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+    os.replace(tmp, path_output)
+
+    return len(df), time.perf_counter() - inizio
+
+
+def join_partizionato(
+    path_ordini="ordini.csv",
+    path_prodotti="prodotti.json",
+    path_clienti="clienti.csv",
+    cartella_output="ordini_arricchiti",
+    memoria_mb=256,
+    n_workers=None,
+    num_partizioni=None,
+):
+    """
+    Join ordini + prodotti + clienti con memoria limitata a circa memoria_mb
+    per worker. Il risultato è cartella_output/part-NNNN.parquet.
+    Restituisce un dizionario con partizioni, righe e tempi.
+    """
+    inizio = time.perf_counter()
+
+    righe_per_blocco, partizioni_stimate = pianifica_memoria(path_ordini, memoria_mb, n_workers)
+    num_partizioni = num_partizioni or partizioni_stimate
+
+    cartella_spill = cartella_output + ".spill"
+    righe_partizioni = partiziona_ordini(path_ordini, cartella_spill, num_partizioni, righe_per_blocco=righe_per_blocco)
+    durata_partizionamento = time.perf_counter() - inizio
+
+    prodotti = carica_prodotti(path_prodotti)
+    clienti = carica_clienti(path_clienti)
+
+    shutil.rmtree(cartella_output, ignore_errors=True)
+    os.makedirs(cartella_output)
+
+    lavori = [
+        (os.path.join(cartella_spill, f"part={p:04d}"), os.path.join(cartella_output, f"part-{p:04d}.parquet"), p)
+        for p in range(num_partizioni)
+        if righe_partizioni[p] > 0
+    ]
+
+    if n_workers == 1 or len(lavori) == 1:
+        risultati = [_unisci_partizione(c, o, p, num_partizioni, prodotti, clienti) for c, o, p in lavori]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(_unisci_partizione, c, o, p, num_partizioni, prodotti, clienti)
+                for c, o, p in lavori
+            ]
+            risultati = [f.result() for f in futures]
+
+    shutil.rmtree(cartella_spill, ignore_errors=True)
+    durata_totale = time.perf_counter() - inizio
+
+    righe_output = sum(r for r, _ in risultati)
+
+    print(f"\n[Join] Memoria per worker: {memoria_mb} MB | Righe per blocco: {righe_per_blocco:,} | Partizioni: {num_partizioni}")
+    print(f"[Join] Righe per partizione: min {righe_partizioni.min():,} | max {righe_partizioni.max():,}")
+    print(f"[Join] Partizionamento: {durata_partizionamento:.2f} s | Totale: {durata_totale:.2f} s | Righe scritte: {righe_output:,}")
+
+    return {
+        "num_partizioni": num_partizioni,
+        "righe_per_blocco": righe_per_blocco,
+        "righe_partizioni": righe_partizioni,
+        "righe": righe_output,
+        "tempo_partizionamento": durata_partizionamento,
+        "tempo_totale": durata_totale,
+    }
+
+
+if __name__ == "__main__":
+    # Memoria volutamente piccola per avere più partizioni anche con 100.000 ordini
+    join_partizionato("ordini.csv", memoria_mb=2)
+
+    risultato = pd.read_parquet("ordini_arricchiti")
+    print(risultato.head())
+
+    # Controllo con il merge in memoria
+    atteso = (
+        pd.read_csv("ordini.csv", parse_dates=["DataOrdine"])
+        .merge(pd.read_json("prodotti.json"), on="ProdottoID", how="left")
+        .merge(pd.read_csv("clienti.csv"), on="ClienteID", how="left")
+    )
+    chiavi = ["ClienteID", "ProdottoID", "DataOrdine", "Quantita"]
+    ordinato = risultato.sort_values(chiavi, kind="stable").reset_index(drop=True)
+    atteso = atteso.sort_values(chiavi, kind="stable").reset_index(drop=True)
+
+    print("\nStesse righe del merge in memoria:", len(ordinato) == len(atteso) and bool(
+        (ordinato["Regione"].astype(str) == atteso["Regione"]).all()
+        and np.allclose(ordinato["Prezzo"].to_numpy(dtype=np.float64), atteso["Prezzo"], atol=1e-4)
+    ))
@@ -0,0 +1,381 @@
+# ============================================
+# Motore di aggregazione KPI per l'analisi vendite
+#
+# In progetto_finale_analisi_di_vendite.py ogni funzione di report faceva
+# il proprio groupby sull'intero DataFrame (6+ passaggi sugli stessi dati).
+# Qui tutti i KPI vengono calcolati con un'unica scansione:
+# - Negozio, Prodotto e Data vengono trasformati in codici interi
+# - con np.bincount si costruisce il "cubo" (negozio, prodotto, giorno)
+#   con somma degli incassi, somma delle quantità e numero di righe
+# - ogni KPI si ottiene sommando il cubo lungo alcuni assi
+#
+# Il risultato (KPIVendite) è riutilizzabile da tutte le funzioni di
+# report e si può unire con quello di un altro blocco di dati.
+# ============================================
+
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# Famiglie di prodotti (vedi aggiungi_categoria)
+MAPPA_CATEGORIA = {
+    "Smartphone": "Informatica",
+    "Laptop": "Informatica",
+    "Tablet": "Informatica",
+    "TV": "Elettrodomestici",
+    "Cuffie": "Accessori",
+    "Console": "Gaming",
+}
+
+
+# =====================================================
+# RISULTATO DELLE AGGREGAZIONI
+# =====================================================
+
+class KPIVendite:
+    """
+    Cubo (negozio, prodotto, giorno) con somma incassi, somma quantità
+    e numero di righe. Tutti i KPI dei report si leggono da qui.
+
+    istogramma_quantita[q] è il numero di righe con Quantità == q:
+    serve per le statistiche NumPy sulla quantità senza tenere le righe.
+    Le righe senza quantità o con quantità negativa (resi) restano fuori
+    dall'istogramma, ma non dal cubo.
+    """
+
+    def __init__(self, negozi, prodotti, giorni, incasso, quantita, conteggi, istogramma_quantita=None):
+        self.negozi = pd.Index(negozi, name="Negozio")
+        self.prodotti = pd.Index(prodotti, name="Prodotto")
+        self.giorni = pd.DatetimeIndex(giorni, name="Data")
+        self.incasso = incasso
+        self.quantita = quantita
+        self.conteggi = conteggi
+
+        if istogramma_quantita is None:
+            istogramma_quantita = np.zeros(0, dtype=np.int64)
+        self.istogramma_quantita = istogramma_quantita
+
+    @classmethod
+    def vuoto(cls):
+        """
+        Risultato senza righe (file vuoto o con sola intestazione).
+        """
+        forma = (0, 0, 0)
+        return cls([], [], [], np.zeros(forma), np.zeros(forma, dtype=np.int64), np.zeros(forma, dtype=np.int64))
+
+    # -------------------------------------------------
+    # Unione di due risultati (blocchi o worker diversi)
+    # -------------------------------------------------
+
+    def unisci(self, altro):
+        """
+        Restituisce un nuovo KPIVendite con i dati di entrambi.
+        Le etichette vengono unite e ordinate come farebbe groupby.
+        """
+        negozi = self.negozi.union(altro.negozi)
+        prodotti = self.prodotti.union(altro.prodotti)
+        giorni = self.giorni.union(altro.giorni)
+
+        forma = (len(negozi), len(prodotti), len(giorni))
+        risultato = KPIVendite(
+            negozi, prodotti, giorni,
+            np.zeros(forma), np.zeros(forma, dtype=np.int64), np.zeros(forma, dtype=np.int64)
+        )
+
+        for parte in (self, altro):
+            posizioni = np.ix_(
+                negozi.get_indexer(parte.negozi),
+                prodotti.get_indexer(parte.prodotti),
+                giorni.get_indexer(parte.giorni)
+            )
+            risultato.incasso[posizioni] += parte.incasso
+            risultato.quantita[posizioni] += parte.quantita
+            risultato.conteggi[posizioni] += parte.conteggi
+
+        lunghezza = max(len(self.istogramma_quantita), len(altro.istogramma_quantita))
+        risultato.istogramma_quantita = np.zeros(lunghezza, dtype=np.int64)
+        for parte in (self, altro):
+            risultato.istogramma_quantita[:len(parte.istogramma_quantita)] += parte.istogramma_quantita
+
+        return risultato
+
+    # -------------------------------------------------
+    # KPI
+    # -------------------------------------------------
+
+    def incasso_totale(self):
+        return float(self.incasso.sum())
+
+    def numero_righe(self):
+        return int(self.conteggi.sum())
+
+    def incasso_per_negozio(self):
+        return self._serie(self.incasso.sum(axis=(1, 2)), self.conteggi.sum(axis=(1, 2)), self.negozi, "Incasso")
+
+    def incasso_medio_per_negozio(self):
+        return self._media(self.incasso.sum(axis=(1, 2)), self.conteggi.sum(axis=(1, 2)), self.negozi, "Incasso")
+
+    def incasso_per_prodotto(self):
+        return self._serie(self.incasso.sum(axis=(0, 2)), self.conteggi.sum(axis=(0, 2)), self.prodotti, "Incasso")
+
+    def quantita_per_prodotto(self):
+        return self._serie(self.quantita.sum(axis=(0, 2)), self.conteggi.sum(axis=(0, 2)), self.prodotti, "Quantità")
+
+    def top_prodotti(self, n=3, per="Incasso"):
+        serie = self.incasso_per_prodotto() if per == "Incasso" else self.quantita_per_prodotto()
+        return serie.sort_values(ascending=False).head(n)
+
+    def incasso_medio_negozio_prodotto(self):
+        somme = self.incasso.sum(axis=2)
+        conteggi = self.conteggi.sum(axis=2)
+        negozio, prodotto = np.nonzero(conteggi)
+
+        indice = pd.MultiIndex.from_arrays(
+            [self.negozi[negozio], self.prodotti[prodotto]],
+            names=["Negozio", "Prodotto"]
+        )
+        return pd.Series(somme[negozio, prodotto] / conteggi[negozio, prodotto], index=indice, name="Incasso")
+
+    def incasso_giornaliero(self):
+        return self._serie(self.incasso.sum(axis=(0, 1)), self.conteggi.sum(axis=(0, 1)), self.giorni, "Incasso")
+
+    def _per_categoria(self, valori):
+        categorie = self.prodotti.map(lambda p: MAPPA_CATEGORIA.get(p, "Altro"))
+        codici, etichette = pd.factorize(np.asarray(categorie), sort=True)
+
+        somme = np.bincount(codici, weights=valori.sum(axis=(0, 2)), minlength=len(etichette))
+        conteggi = np.bincount(codici, weights=self.conteggi.sum(axis=(0, 2)), minlength=len(etichette))
+        return somme, conteggi, pd.Index(etichette, name="Categoria")
+
+    def incasso_per_categoria(self):
+        somme, conteggi, indice = self._per_categoria(self.incasso)
+        return self._serie(somme, conteggi, indice, "Incasso")
+
+    def incasso_medio_per_categoria(self):
+        somme, conteggi, indice = self._per_categoria(self.incasso)
+        return self._media(somme, conteggi, indice, "Incasso")
+
+    def quantita_media_per_categoria(self):
+        somme, conteggi, indice = self._per_categoria(self.quantita)
+        return self._media(somme, conteggi, indice, "Quantità")
+
+    def statistiche_quantita(self):
+        """
+        Media, minimo, massimo, deviazione standard (come np.std)
+        e percentuale di righe sopra la media della colonna Quantità.
+        Senza righe: NaN per le statistiche, None per minimo e massimo.
+        """
+        valori = np.arange(len(self.istogramma_quantita))
+        righe = self.istogramma_quantita
+        totale = righe.sum()
+        presenti = np.flatnonzero(righe)
+
+        if totale == 0:
+            return {
+                "media": np.nan,
+                "minimo": None,
+                "massimo": None,
+                "dev_std": np.nan,
+                "percentuale_sopra_media": np.nan,
+            }
+
+        media = (valori * righe).sum() / totale
+        varianza = (righe * (valori - media) ** 2).sum() / totale
+
+        return {
+            "media": media,
+            "minimo": int(presenti[0]),
+            "massimo": int(presenti[-1]),
+            "dev_std": np.sqrt(varianza),
+            "percentuale_sopra_media": righe[valori > media].sum() / totale * 100,
+        }
+
+    @staticmethod
+    def _serie(somme, conteggi, indice, nome):
+        # Come groupby: solo le chiavi che compaiono nei dati
+        presenti = conteggi > 0
+        return pd.Series(somme[presenti], index=indice[presenti], name=nome)
+
+    @staticmethod
+    def _media(somme, conteggi, indice, nome):
+        presenti = conteggi > 0
+        return pd.Series(somme[presenti] / conteggi[presenti], index=indice[presenti], name=nome)
+
+
+# =====================================================
+# CALCOLO IN UNA SOLA SCANSIONE
+# =====================================================
+
+def _codifica(colonna):
+    """
+    Codici interi ed etichette nello stesso ordine delle chiavi di groupby:
+    alfabetico per le colonne normali, ordine delle categorie per le
+    colonne categoriche (di cui si riusano i codici già presenti).
+    I valori mancanti hanno codice -1.
+    """
+    if isinstance(colonna.dtype, pd.CategoricalDtype):
+        return colonna.cat.codes.to_numpy().astype(np.int64), colonna.cat.categories
+
+    return pd.factorize(colonna, sort=True)
+
+
+def calcola_kpi(df):
+    """
+    Calcola tutti i KPI con una sola scansione su chiavi intere.
+    Non serve che df contenga già le colonne Incasso o Categoria.
+    Le righe senza Negozio, Prodotto o Data vengono escluse, come fa
+    groupby con dropna=True.
+    """
+    codici_negozio, negozi = _codifica(df["Negozio"])
+    codici_prodotto, prodotti = _codifica(df["Prodotto"])
+    date = pd.to_datetime(df["Data"])
+
+    valide = (codici_negozio >= 0) & (codici_prodotto >= 0) & date.notna().to_numpy()
+    if not valide.all():
+        print(f"[KPI] {int((~valide).sum())} righe senza Negozio, Prodotto o Data escluse")
+        df = df[valide]
+        codici_negozio = codici_negozio[valide]
+        codici_prodotto = codici_prodotto[valide]
+        date = date[valide]
+
+    if len(date) == 0:
+        return KPIVendite.vuoto()
+
+    # Giorno come numero intero a partire dal primo giorno presente
+    date = date.to_numpy(dtype="datetime64[D]")
+    giorno_min = date.min()
+    codici_giorno = (date - giorno_min).astype(np.int64)
+    num_giorni = int(codici_giorno.max()) + 1
+
+    quantita = df["Quantità"].to_numpy(dtype=np.float64)
+    incasso = quantita * df["Prezzo_unitario"].to_numpy(dtype=np.float64)
+
+    # Chiave combinata del cubo (negozio, prodotto, giorno)
+    forma = (len(negozi), len(prodotti), num_giorni)
+    chiave = np.ravel_multi_index((codici_negozio, codici_prodotto, codici_giorno), forma)
+    celle = int(np.prod(forma))
+
+    # Come le somme di pandas: i valori mancanti non contano
+    cubo_incasso = np.bincount(chiave, weights=np.nan_to_num(incasso), minlength=celle).reshape(forma)
+    cubo_quantita = (
+        np.bincount(chiave, weights=np.nan_to_num(quantita), minlength=celle).reshape(forma).astype(np.int64)
+    )
+    cubo_conteggi = np.bincount(chiave, minlength=celle).reshape(forma)
+
+    giorni = pd.date_range(pd.Timestamp(giorno_min), periods=num_giorni, freq="D")
+
+    # Le quantità sono numeri interi di pezzi venduti; bincount accetta
+    # solo interi non negativi
+    nell_istogramma = np.isfinite(quantita) & (quantita >= 0)
+    istogramma_quantita = np.bincount(quantita[nell_istogramma].astype(np.int64))
+
+    return KPIVendite(
+        negozi, prodotti, giorni,
+        cubo_incasso, cubo_quantita, cubo_conteggi,
+        istogramma_quantita
+    )
+
+
+# =====================================================
+# BENCHMARK
+# =====================================================
+
+def _kpi_con_groupby(df):
+    """
+    Gli stessi KPI calcolati come facevano le funzioni di report:
+    un groupby separato per ogni risultato.
+    """
+    df = df.copy()
+    df["Incasso"] = df["Quantità"] * df["Prezzo_unitario"]
+    df["Data"] = pd.to_datetime(df["Data"])
+    df["Categoria"] = df["Prodotto"].map(MAPPA_CATEGORIA).fillna("Altro")
+
+    return {
+        "incasso_totale": df["Incasso"].sum(),
+        "incasso_medio_negozio": df.groupby("Negozio")["Incasso"].mean(),
+        "top3_quantita": df.groupby("Prodotto")["Quantità"].sum().sort_values(ascending=False).head(3),
+        "incasso_medio_negozio_prodotto": df.groupby(["Negozio", "Prodotto"])["Incasso"].mean(),
+        "incasso_per_negozio": df.groupby("Negozio")["Incasso"].sum(),
+        "incasso_per_prodotto": df.groupby("Prodotto")["Incasso"].sum(),
+        "incasso_giornaliero": df.groupby("Data")["Incasso"].sum().sort_index(),
+        "incasso_per_categoria": df.groupby("Categoria")["Incasso"].sum(),
+        "quantita_media_categoria": df.groupby("Categoria")["Quantità"].mean(),
+        "incasso_medio_categoria": df.groupby("Categoria")["Incasso"].mean(),
+        "top3_incasso": df.groupby("Prodotto")["Incasso"].sum().sort_values(ascending=False).head(3),
+    }
+
+
+def _kpi_con_motore(df):
+    kpi = calcola_kpi(df)
+
+    return {
+        "incasso_totale": kpi.incasso_totale(),
+        "incasso_medio_negozio": kpi.incasso_medio_per_negozio(),
+        "top3_quantita": kpi.top_prodotti(3, per="Quantità"),
+        "incasso_medio_negozio_prodotto": kpi.incasso_medio_negozio_prodotto(),
+        "incasso_per_negozio": kpi.incasso_per_negozio(),
+        "incasso_per_prodotto": kpi.incasso_per_prodotto(),
+        "incasso_giornaliero": kpi.incasso_giornaliero(),
+        "incasso_per_categoria": kpi.incasso_per_categoria(),
+        "quantita_media_categoria": kpi.quantita_media_per_categoria(),
+        "incasso_medio_categoria": kpi.incasso_medio_per_categoria(),
+        "top3_incasso": kpi.top_prodotti(3, per="Incasso"),
+    }
+
+
+def benchmark_kpi(df, ripetizioni=3):
+    """
+    Confronta la sequenza di groupby delle funzioni di report con il
+    motore a scansione singola e controlla che i risultati coincidano.
+    """
+    tempi = {}
+    risultati = {}
+
+    for nome, funzione in [("groupby", _kpi_con_groupby), ("motore", _kpi_con_motore)]:
+        migliore = float("inf")
+        for _ in range(ripetizioni):
+            inizio = time.perf_counter()
+            risultati[nome] = funzione(df)
+            migliore = min(migliore, time.perf_counter() - inizio)
+        tempi[nome] = migliore
+
+    for chiave, atteso in risultati["groupby"].items():
+        ottenuto = risultati["motore"][chiave]
+        if isinstance(atteso, pd.Series):
+            assert np.allclose(atteso.to_numpy(dtype=float), ottenuto.to_numpy(dtype=float)), chiave
+            assert list(atteso.index) == list(ottenuto.index), chiave
+        else:
+            assert np.isclose(atteso, ottenuto), chiave
+
+    print(f"\nBenchmark KPI su {len(df)} righe (miglior tempo su {ripetizioni} ripetizioni):")
+    print(f"- sequenza di groupby: {tempi['groupby']:.3f} s")
+    print(f"- motore a scansione singola: {tempi['motore']:.3f} s")
+    print(f"- speedup: {tempi['groupby'] / tempi['motore']:.1f}x")
+
+    return tempi
+
+
+if __name__ == "__main__":
+    from progetto_finale_analisi_di_vendite import genera_blocco_vendite
+
+    for num_righe in [100_000, 1_000_000, 5_000_000]:
+        df_prova = genera_blocco_vendite(num_righe, seed=42)
+
+        # Stessi tipi che si ottengono leggendo vendite.csv
+        df_prova["Data"] = df_prova["Data"].dt.strftime("%Y-%m-%d")
+        df_prova["Negozio"] = df_prova["Negozio"].astype(str)
+        df_prova["Prodotto"] = df_prova["Prodotto"].astype(str)
+
+        benchmark_kpi(df_prova)
+
+    # Colonne categoriche, così come escono dal generatore
+    benchmark_kpi(genera_blocco_vendite(100_000, seed=42))
+
+    # Nessuna riga (vendite.csv con la sola intestazione)
+    kpi_vuoti = calcola_kpi(genera_blocco_vendite(0, seed=42))
+    statistiche_vuote = kpi_vuoti.statistiche_quantita()
+    assert kpi_vuoti.numero_righe() == 0 and kpi_vuoti.incasso_totale() == 0.0
+    assert statistiche_vuote["minimo"] is None and np.isnan(statistiche_vuote["media"])
+    print("\nKPI senza righe: nessun errore, statistiche senza valori")
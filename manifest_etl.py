@@ -0,0 +1,271 @@
+# ============================================
+# ETL incrementale con manifest dei batch elaborati
+#
+# esercizio2_etl rilegge tutti i transactions_batch_*.parquet e riscrive
+# processed_sales con mode("overwrite") a ogni esecuzione: aggiungere un
+# batch costa un ricalcolo completo.
+#
+# Il manifest (data_local/etl_manifest.json) registra per ogni batch:
+# - percorso, dimensione, data di modifica e checksum SHA-256
+# - gli anni (partizioni year=) in cui sono finite le sue righe
+# - i file di output scritti (solo motore locale Arrow)
+# e per ogni partizione year= la versione dell'ultimo aggiornamento.
+#
+# A ogni esecuzione:
+# - batch nuovi -> elaborati e aggiunti alle loro partizioni
+# - batch modificati o rimossi -> i loro file di output vengono cancellati
+#   (e i modificati rielaborati)
+# - prodotti o regioni cambiati -> ricostruzione completa
+# - "versione" cresce solo se qualcosa è cambiato: i report la usano
+#   per sapere se i risultati in cache sono ancora validi
+# ============================================
+
+import os
+import glob
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from etl_locale import PARQUET_DIR, PROCESSED_DIR, BASE_DIR, carica_dimensioni, scrivi_transazioni
+
+
+MANIFEST_PATH = os.path.join(BASE_DIR, "etl_manifest.json")
+
+
+# =====================================================
+# MANIFEST SU DISCO
+# =====================================================
+
+def manifest_vuoto():
+    return {"versione": 0, "batch": {}, "dimensioni": {}, "partizioni": {}}
+
+
+def carica_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return manifest_vuoto()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salva_manifest(manifest, path=MANIFEST_PATH):
+    # Scrittura su file temporaneo e poi rename, per non lasciare file a metà
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def versione_dati(path=MANIFEST_PATH):
+    """
+    Versione dei dati elaborati (0 se non c'è ancora un manifest).
+    """
+    return carica_manifest(path)["versione"]
+
+
+def checksum_file(path, dimensione_blocco=1024 ** 2):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for blocco in iter(lambda: f.read(dimensione_blocco), b""):
+            sha.update(blocco)
+    return sha.hexdigest()
+
+
+def descrivi_file(path, precedente=None):
+    """
+    Dimensione, data di modifica e checksum di un file.
+    Se dimensione e data coincidono con la descrizione precedente,
+    il checksum non viene ricalcolato.
+    """
+    info = os.stat(path)
+    descrizione = {"dimensione": info.st_size, "mtime": info.st_mtime}
+
+    if precedente and precedente["dimensione"] == info.st_size and precedente["mtime"] == info.st_mtime:
+        descrizione["checksum"] = precedente["checksum"]
+    else:
+        descrizione["checksum"] = checksum_file(path)
+
+    return descrizione
+
+
+def anni_batch(path):
+    """
+    Anni presenti in un batch (solo la colonna year viene letta).
+    """
+    anni = pq.read_table(path, columns=["year"]).column("year").to_numpy()
+    return sorted(int(a) for a in np.unique(anni))
+
+
+# =====================================================
+# CONFRONTO CON LA CARTELLA DI INPUT
+# =====================================================
+
+def confronta_batch(manifest, parquet_dir=PARQUET_DIR):
+    """
+    Divide i batch presenti su disco rispetto al manifest.
+    Restituisce (nuovi, modificati, rimossi, descrizioni attuali).
+    """
+    paths = sorted(glob.glob(os.path.join(parquet_dir, "transactions_batch_*.parquet")))
+
+    nuovi, modificati = [], []
+    descrizioni = {}
+
+    for path in paths:
+        chiave = os.path.abspath(path)
+        precedente = manifest["batch"].get(chiave)
+        descrizioni[chiave] = descrivi_file(path, precedente)
+
+        if precedente is None:
+            nuovi.append(chiave)
+        elif precedente["checksum"] != descrizioni[chiave]["checksum"]:
+            modificati.append(chiave)
+
+    rimossi = sorted(set(manifest["batch"]) - set(descrizioni))
+    return nuovi, modificati, rimossi, descrizioni
+
+
+def dimensioni_cambiate(manifest, parquet_dir=PARQUET_DIR):
+    """
+    (cambiate, checksum attuali) per products.parquet e regions.parquet.
+    """
+    attuali = {
+        nome: checksum_file(os.path.join(parquet_dir, nome))
+        for nome in ("products.parquet", "regions.parquet")
+    }
+    return attuali != manifest["dimensioni"], attuali
+
+
+# =====================================================
+# AGGIORNAMENTO DEL MANIFEST
+# =====================================================
+
+def manifest_ricostruito(manifest, checksum_dimensioni):
+    """
+    Manifest vuoto per una ricostruzione completa dell'output.
+    La versione continua da quella precedente, così i report la vedono cambiare.
+    """
+    nuovo = manifest_vuoto()
+    nuovo["versione"] = manifest["versione"]
+    nuovo["dimensioni"] = checksum_dimensioni
+    return nuovo
+
+
+def registra_batch(manifest, chiave, descrizione, file_output=None):
+    """
+    Segna un batch come elaborato. Restituisce gli anni delle sue righe.
+    file_output è None se l'output non è riconducibile al batch (Spark).
+    """
+    anni = anni_batch(chiave)
+    manifest["batch"][chiave] = {**descrizione, "anni": anni, "file_output": file_output}
+    return anni
+
+
+def chiudi_esecuzione(manifest, descrizioni, anni_toccati, cambiato, path=MANIFEST_PATH):
+    """
+    Aggiorna le date di modifica, la versione (solo se qualcosa è cambiato)
+    e le partizioni toccate, poi salva il manifest.
+    """
+    for chiave, descrizione in descrizioni.items():
+        if chiave in manifest["batch"]:
+            manifest["batch"][chiave].update(descrizione)
+
+    if cambiato:
+        manifest["versione"] += 1
+        adesso = datetime.now().isoformat(timespec="seconds")
+        for anno in anni_toccati:
+            manifest["partizioni"][str(anno)] = {"versione": manifest["versione"], "aggiornato": adesso}
+
+    salva_manifest(manifest, path)
+
+
+def registra_ricostruzione(parquet_dir=PARQUET_DIR, path=MANIFEST_PATH):
+    """
+    Dopo una riscrittura completa dell'output (etl_locale): tutti i batch
+    attuali risultano elaborati, senza file di output per batch.
+    Restituisce la nuova versione dei dati.
+    """
+    manifest = carica_manifest(path)
+    _, checksum_dimensioni = dimensioni_cambiate(manifest, parquet_dir)
+    _, _, _, descrizioni = confronta_batch(manifest, parquet_dir)
+
+    manifest = manifest_ricostruito(manifest, checksum_dimensioni)
+    anni_toccati = set()
+    for chiave in sorted(descrizioni):
+        anni_toccati.update(registra_batch(manifest, chiave, descrizioni[chiave]))
+
+    chiudi_esecuzione(manifest, descrizioni, anni_toccati, True, path)
+    return manifest["versione"]
+
+
+# =====================================================
+# ETL INCREMENTALE (MOTORE LOCALE ARROW)
+# =====================================================
+
+def etl_incrementale(parquet_dir=PARQUET_DIR, output_dir=PROCESSED_DIR, manifest_path=MANIFEST_PATH):
+    """
+    Elabora solo i batch nuovi o modificati e aggiorna il manifest.
+    Restituisce un dizionario con i batch elaborati e le partizioni toccate.
+    """
+    manifest = carica_manifest(manifest_path)
+
+    cambiate, checksum_dimensioni = dimensioni_cambiate(manifest, parquet_dir)
+    nuovi, modificati, rimossi, descrizioni = confronta_batch(manifest, parquet_dir)
+
+    # Output scritto da Spark o da etl_locale: i file di un batch non sono noti
+    senza_file = any(manifest["batch"][k]["file_output"] is None for k in modificati + rimossi)
+
+    ricostruzione = cambiate or senza_file or not os.path.isdir(output_dir)
+    if ricostruzione:
+        # Join da rifare per tutti i batch: si riparte da zero
+        shutil.rmtree(output_dir, ignore_errors=True)
+        manifest = manifest_ricostruito(manifest, checksum_dimensioni)
+        nuovi, modificati, rimossi = sorted(descrizioni), [], []
+
+    # Output dei batch modificati o rimossi: cancellato
+    anni_toccati = set()
+    for chiave in modificati + rimossi:
+        vecchio = manifest["batch"].pop(chiave)
+        anni_toccati.update(vecchio["anni"])
+        for file_output in vecchio.get("file_output") or []:
+            if os.path.exists(file_output):
+                os.remove(file_output)
+
+    prodotti, regioni = (None, None)
+    if nuovi or modificati:
+        prodotti, regioni = carica_dimensioni(parquet_dir)
+
+    righe = 0
+    for chiave in nuovi + modificati:
+        # Nome dei file di output legato al batch: si possono cancellare dopo
+        nome_batch = os.path.splitext(os.path.basename(chiave))[0]
+        righe_batch, scritti = scrivi_transazioni(
+            [chiave], output_dir, prodotti, regioni, nome_file=f"{nome_batch}-{{i}}.parquet"
+        )
+        righe += righe_batch
+        anni_toccati.update(registra_batch(manifest, chiave, descrizioni[chiave], scritti))
+
+    chiudi_esecuzione(manifest, descrizioni, anni_toccati, bool(nuovi or modificati or rimossi or ricostruzione), manifest_path)
+
+    print(
+        f"[ETL incrementale] Nuovi: {len(nuovi)} | Modificati: {len(modificati)} | "
+        f"Rimossi: {len(rimossi)} | Righe scritte: {righe}"
+    )
+    print(f"[ETL incrementale] Partizioni toccate: {sorted(anni_toccati)} | Versione dati: {manifest['versione']}")
+
+    return {
+        "nuovi": nuovi,
+        "modificati": modificati,
+        "rimossi": rimossi,
+        "anni": sorted(anni_toccati),
+        "righe": righe,
+        "versione": manifest["versione"],
+    }
+
+
+if __name__ == "__main__":
+    etl_incrementale()
+    # Seconda esecuzione senza nuovi batch: nessun lavoro
+    etl_incrementale()
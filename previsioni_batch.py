@@ -0,0 +1,232 @@
+# ============================================
+# Motore di previsione a lotti per molte serie di vendite
+#
+# Progetto _1_Prevision_vendite.py si ferma alla pulizia e ai totali
+# giornalieri di tre prodotti. Qui le previsioni vengono fatte per
+# decine di migliaia di serie (prodotto/negozio) insieme:
+# - le serie sono le righe di un array 2D (serie × giorno)
+# - ogni modello aggiorna tutte le serie con operazioni NumPy vettoriali;
+#   l'unico ciclo Python è sui giorni, non sulle serie
+# - modelli: stagionale naive, exponential smoothing semplice,
+#   Holt-Winters additivo (parametri scelti per serie su una griglia)
+# - backtest rolling-origin suddiviso per serie su più processi,
+#   con il throughput in serie/secondo
+# ============================================
+
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# Griglie dei parametri provate per ogni serie
+ALPHA_GRID = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+HW_GRID = np.array(list(itertools.product([0.1, 0.3, 0.6], [0.01, 0.1], [0.05, 0.2])))
+
+
+# =====================================================
+# PREPARAZIONE DEI DATI
+# =====================================================
+
+def matrice_serie(df, colonna_serie="Prodotto", colonna_data="Data", colonna_valore="Vendite"):
+    """
+    Trasforma il formato lungo (una riga per data e prodotto)
+    in un array (serie × giorno). I giorni mancanti valgono 0.
+    """
+    tabella = df.pivot_table(
+        index=colonna_serie,
+        columns=colonna_data,
+        values=colonna_valore,
+        aggfunc="sum",
+        fill_value=0,
+    )
+    giorni = pd.date_range(tabella.columns.min(), tabella.columns.max(), freq="D")
+    tabella = tabella.reindex(columns=giorni, fill_value=0)
+
+    return tabella.to_numpy(dtype=np.float64), tabella.index, giorni
+
+
+# =====================================================
+# MODELLI VETTORIALI
+# =====================================================
+
+def previsione_stagionale_naive(y, orizzonte, stagione=7):
+    """
+    Ripete l'ultima stagione osservata: y[t + h] = y[t + h - stagione].
+    """
+    ultima_stagione = y[:, -stagione:]
+    indici = np.arange(orizzonte) % stagione
+    return ultima_stagione[:, indici]
+
+
+def previsione_ses(y, orizzonte, alpha_grid=ALPHA_GRID):
+    """
+    Exponential smoothing semplice con alpha scelto per ogni serie.
+    Tutte le combinazioni (alpha × serie) avanzano insieme nel tempo.
+    """
+    alpha = alpha_grid[:, None]
+    livello = np.repeat(y[None, :, 0], len(alpha_grid), axis=0)
+    sse = np.zeros_like(livello)
+
+    for t in range(1, y.shape[1]):
+        errore = y[:, t] - livello
+        sse += errore ** 2
+        livello = livello + alpha * errore
+
+    migliore = np.argmin(sse, axis=0)
+    serie = np.arange(y.shape[0])
+    livello_finale = livello[migliore, serie]
+
+    previsione = np.repeat(livello_finale[:, None], orizzonte, axis=1)
+    return previsione, alpha_grid[migliore]
+
+
+def previsione_holt_winters(y, orizzonte, stagione=7, griglia=HW_GRID):
+    """
+    Holt-Winters additivo (livello, trend, stagionalità).
+    I parametri (alpha, beta, gamma) vengono scelti per ogni serie
+    minimizzando l'errore a un passo sulla griglia indicata.
+    """
+    num_serie, num_giorni = y.shape
+
+    if num_giorni < 2 * stagione:
+        raise ValueError("Servono almeno due stagioni di dati per Holt-Winters")
+
+    alpha = griglia[:, 0][:, None]
+    beta = griglia[:, 1][:, None]
+    gamma = griglia[:, 2][:, None]
+    combinazioni = len(griglia)
+
+    # Inizializzazione con le prime due stagioni
+    prima = y[:, :stagione].mean(axis=1)
+    seconda = y[:, stagione:2 * stagione].mean(axis=1)
+
+    livello = np.repeat(prima[None, :], combinazioni, axis=0)
+    trend = np.repeat(((seconda - prima) / stagione)[None, :], combinazioni, axis=0)
+    stagionalita = np.repeat((y[:, :stagione] - prima[:, None])[None, :, :], combinazioni, axis=0)
+    sse = np.zeros((combinazioni, num_serie))
+
+    for t in range(stagione, num_giorni):
+        s = t % stagione
+        stagionale = stagionalita[:, :, s]
+
+        previsto = livello + trend + stagionale
+        sse += (y[:, t] - previsto) ** 2
+
+        livello_precedente = livello
+        livello = alpha * (y[:, t] - stagionale) + (1 - alpha) * (livello + trend)
+        trend = beta * (livello - livello_precedente) + (1 - beta) * trend
+        stagionalita[:, :, s] = (
+            gamma * (y[:, t] - livello) + (1 - gamma) * stagionale
+        )
+
+    migliore = np.argmin(sse, axis=0)
+    serie = np.arange(num_serie)
+
+    h = np.arange(1, orizzonte + 1)
+    indici_stagione = (num_giorni + h - 1) % stagione
+
+    previsione = (
+        livello[migliore, serie][:, None]
+        + trend[migliore, serie][:, None] * h[None, :]
+        + stagionalita[migliore, serie][:, indici_stagione]
+    )
+    return previsione, griglia[migliore]
+
+
+def prevedi(y, orizzonte, stagione=7):
+    """
+    Previsioni di tutti i modelli per tutte le serie.
+    Le vendite non possono essere negative.
+    """
+    previsione_ses_, _ = previsione_ses(y, orizzonte)
+    previsione_hw, _ = previsione_holt_winters(y, orizzonte, stagione)
+
+    return {
+        "stagionale_naive": previsione_stagionale_naive(y, orizzonte, stagione),
+        "ses": previsione_ses_,
+        "holt_winters": np.clip(previsione_hw, 0, None),
+    }
+
+
+# =====================================================
+# BACKTEST ROLLING-ORIGIN
+# =====================================================
+
+def _backtest_blocco(y, orizzonte, num_origini, stagione):
+    """
+    Somma degli errori assoluti per modello su tutte le origini,
+    per un blocco di serie. Restituisce anche il numero di valori.
+    """
+    num_giorni = y.shape[1]
+    errori = {}
+    valori = 0
+
+    for k in range(num_origini, 0, -1):
+        origine = num_giorni - k * orizzonte
+        reale = y[:, origine:origine + orizzonte]
+
+        for nome, previsione in prevedi(y[:, :origine], orizzonte, stagione).items():
+            errori[nome] = errori.get(nome, 0.0) + np.abs(previsione - reale).sum()
+
+        valori += reale.size
+
+    return errori, valori
+
+
+def backtest(y, orizzonte=7, num_origini=4, stagione=7, n_workers=None, serie_per_blocco=5_000):
+    """
+    Backtest rolling-origin: per ogni origine i modelli vengono stimati
+    sui dati precedenti e valutati sui successivi `orizzonte` giorni.
+    Le serie vengono divise in blocchi elaborati su un pool di processi.
+    Restituisce il MAE per modello e il throughput in serie/secondo.
+    """
+    inizio = time.perf_counter()
+    blocchi = [y[i:i + serie_per_blocco] for i in range(0, len(y), serie_per_blocco)]
+
+    if n_workers == 1 or len(blocchi) == 1:
+        risultati = [_backtest_blocco(b, orizzonte, num_origini, stagione) for b in blocchi]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(_backtest_blocco, b, orizzonte, num_origini, stagione)
+                for b in blocchi
+            ]
+            risultati = [f.result() for f in futures]
+
+    errori_totali = {}
+    valori_totali = 0
+
+    for errori, valori in risultati:
+        for nome, errore in errori.items():
+            errori_totali[nome] = errori_totali.get(nome, 0.0) + errore
+        valori_totali += valori
+
+    durata = time.perf_counter() - inizio
+    mae = pd.Series({nome: errore / valori_totali for nome, errore in errori_totali.items()}, name="MAE")
+
+    print(f"\n[Backtest] Serie: {len(y)} | Origini: {num_origini} | Orizzonte: {orizzonte} giorni")
+    print("[Backtest] MAE per modello:")
+    print(mae.sort_values())
+    print(f"[Backtest] Tempo: {durata:.2f} s | Throughput: {len(y) / durata:.0f} serie/s")
+
+    return mae, len(y) / durata
+
+
+if __name__ == "__main__":
+    # Esempio: 20.000 serie giornaliere di un anno con stagionalità settimanale
+    rng = np.random.default_rng(42)
+    num_serie, num_giorni = 20_000, 365
+
+    livello = rng.uniform(5, 50, size=(num_serie, 1))
+    settimana = rng.uniform(0.7, 1.3, size=(num_serie, 7))
+    y_prova = rng.poisson(livello * np.tile(settimana, num_giorni // 7 + 1)[:, :num_giorni]).astype(np.float64)
+
+    inizio = time.perf_counter()
+    previsioni = prevedi(y_prova, orizzonte=14)
+    durata = time.perf_counter() - inizio
+    print(f"Previsioni a 14 giorni per {num_serie} serie: {durata:.2f} s ({num_serie / durata:.0f} serie/s)")
+
+    backtest(y_prova, orizzonte=7, num_origini=4)
@@ -2,6 +2,7 @@
 # Progetto Finale – Analisi di Vendite in una Catena di Negozi
 # Un unico file Python che:
 # - genera un CSV di partenza (vendite.csv) con dati fittizi
+#   (anche in versione vettoriale a blocchi per i test di carico)
 # - importa i dati con Pandas
 # - usa NumPy per analisi numeriche
 # - usa Matplotlib per grafici
@@ -9,6 +10,8 @@
 # ============================================
 
 import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import random
 
@@ -16,23 +19,38 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from kpi_vendite import MAPPA_CATEGORIA, KPIVendite, calcola_kpi
+
 
 # =====================================================
 # PARTE 1 – CREAZIONE DATASET DI BASE (vendite.csv)
 # =====================================================
 
+# Negozi della catena
+NEGOZI = ["Milano", "Roma", "Napoli", "Torino", "Bologna"]
+
+# Prodotti venduti
+PRODOTTI = ["Smartphone", "Laptop", "TV", "Tablet", "Cuffie", "Console"]
+
+# Fascia di prezzo unitario (min, max) per ogni prodotto, nello stesso ordine di PRODOTTI
+FASCE_PREZZO = np.array([
+    [299.99, 999.99],    # Smartphone
+    [499.99, 1499.99],   # Laptop
+    [399.99, 1999.99],   # TV
+    [199.99, 799.99],    # Tablet
+    [29.99, 299.99],     # Cuffie
+    [249.99, 699.99],    # Console
+])
+
+COLONNE_VENDITE = ["Data", "Negozio", "Prodotto", "Quantità", "Prezzo_unitario"]
+
+
 def genera_vendite_csv(nome_file="vendite.csv", num_righe=30):
     """
     Crea un file CSV chiamato vendite.csv con almeno 30 righe e colonne:
     Data (YYYY-MM-DD), Negozio, Prodotto, Quantità, Prezzo_unitario.
     I dati sono inventati, ma coerenti con lo scenario.
     """
-    # Negozi della catena
-    negozi = ["Milano", "Roma", "Napoli", "Torino", "Bologna"]
-
-    # Prodotti venduti
-    prodotti = ["Smartphone", "Laptop", "TV", "Tablet", "Cuffie", "Console"]
-
     # Data di partenza per simulare vendite giornaliere
     data_inizio = datetime(2023, 9, 1)
 
@@ -41,25 +59,15 @@ def genera_vendite_csv(nome_file="vendite.csv", num_righe=30):
     for i in range(num_righe):
         # data casuale nei 30 giorni successivi
         data = data_inizio + timedelta(days=random.randint(0, 29))
-        negozio = random.choice(negozi)
-        prodotto = random.choice(prodotti)
+        negozio = random.choice(NEGOZI)
+        prodotto = random.choice(PRODOTTI)
 
         # quantità venduta tra 1 e 15 pezzi
         quantita = random.randint(1, 15)
 
         # prezzo unitario in base al tipo di prodotto
-        if prodotto == "Smartphone":
-            prezzo_unitario = round(random.uniform(299.99, 999.99), 2)
-        elif prodotto == "Laptop":
-            prezzo_unitario = round(random.uniform(499.99, 1499.99), 2)
-        elif prodotto == "TV":
-            prezzo_unitario = round(random.uniform(399.99, 1999.99), 2)
-        elif prodotto == "Tablet":
-            prezzo_unitario = round(random.uniform(199.99, 799.99), 2)
-        elif prodotto == "Cuffie":
-            prezzo_unitario = round(random.uniform(29.99, 299.99), 2)
-        else:  # Console
-            prezzo_unitario = round(random.uniform(249.99, 699.99), 2)
+        prezzo_min, prezzo_max = FASCE_PREZZO[PRODOTTI.index(prodotto)]
+        prezzo_unitario = round(random.uniform(prezzo_min, prezzo_max), 2)
 
         righe.append(
             [
@@ -72,14 +80,124 @@ def genera_vendite_csv(nome_file="vendite.csv", num_righe=30):
         )
 
     # Creazione DataFrame e salvataggio CSV
-    df = pd.DataFrame(
-        righe,
-        columns=["Data", "Negozio", "Prodotto", "Quantità", "Prezzo_unitario"],
-    )
+    df = pd.DataFrame(righe, columns=COLONNE_VENDITE)
     df.to_csv(nome_file, index=False)
     print(f"Creato il file CSV di base: {nome_file}")
 
 
+def genera_blocco_vendite(num_righe, seed, data_inizio="2023-09-01", num_giorni=30):
+    """
+    Genera un blocco di vendite estraendo intere colonne con NumPy.
+    Il prezzo unitario viene preso dalla tabella FASCE_PREZZO
+    indicizzata con il codice del prodotto, senza catene di if/elif.
+    """
+    rng = np.random.default_rng(seed)
+
+    giorni = rng.integers(0, num_giorni, size=num_righe)
+    codici_negozio = rng.integers(0, len(NEGOZI), size=num_righe)
+    codici_prodotto = rng.integers(0, len(PRODOTTI), size=num_righe)
+    quantita = rng.integers(1, 16, size=num_righe, dtype=np.int16)
+
+    fasce = FASCE_PREZZO[codici_prodotto]
+    prezzi = np.round(rng.uniform(fasce[:, 0], fasce[:, 1]), 2)
+
+    date = pd.date_range(data_inizio, periods=num_giorni, freq="D")
+
+    return pd.DataFrame({
+        "Data": date[giorni],
+        "Negozio": pd.Categorical.from_codes(codici_negozio, categories=NEGOZI),
+        "Prodotto": pd.Categorical.from_codes(codici_prodotto, categories=PRODOTTI),
+        "Quantità": quantita,
+        "Prezzo_unitario": prezzi,
+    })
+
+
+def _blocco_csv(num_righe, seed, intestazione):
+    df = genera_blocco_vendite(num_righe, seed)
+    return df.to_csv(index=False, header=intestazione, date_format="%Y-%m-%d")
+
+
+def _scrivi_blocco_parquet(num_righe, seed, cartella, indice, partizioni):
+    df = genera_blocco_vendite(num_righe, seed)
+    df.to_parquet(
+        cartella,
+        index=False,
+        partition_cols=partizioni,
+        basename_template=f"part-{indice:05d}-{{i}}.parquet",
+    )
+    return num_righe
+
+
+def genera_vendite_grandi(
+    nome_file="vendite_grandi.csv",
+    num_righe=10_000_000,
+    righe_per_blocco=1_000_000,
+    formato="csv",
+    partizioni=("Negozio",),
+    n_workers=1,
+    seed=42,
+):
+    """
+    Genera un dataset di vendite di grandi dimensioni (10M - 1B righe)
+    per i test di carico, con lo stesso schema di genera_vendite_csv.
+
+    - formato="csv": un unico file CSV scritto blocco per blocco
+    - formato="parquet": una cartella Parquet partizionata (default per Negozio)
+
+    La memoria usata dipende solo da righe_per_blocco. Ogni blocco ha un seed
+    derivato da quello principale, quindi il risultato non cambia con n_workers.
+    """
+    num_blocchi = -(-num_righe // righe_per_blocco)
+    seeds = np.random.SeedSequence(seed).spawn(num_blocchi)
+    dimensioni = [
+        min(righe_per_blocco, num_righe - i * righe_per_blocco)
+        for i in range(num_blocchi)
+    ]
+
+    if formato == "parquet":
+        # Si scrive in una cartella temporanea che poi sostituisce quella
+        # esistente: i file di un'esecuzione precedente non restano nel dataset
+        cartella_tmp = nome_file.rstrip("/\\") + ".tmp"
+        shutil.rmtree(cartella_tmp, ignore_errors=True)
+        os.makedirs(cartella_tmp)
+        argomenti = [
+            (dimensioni[i], seeds[i], cartella_tmp, i, list(partizioni))
+            for i in range(num_blocchi)
+        ]
+
+        if n_workers == 1:
+            for args in argomenti:
+                _scrivi_blocco_parquet(*args)
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                list(executor.map(_scrivi_blocco_parquet, *zip(*argomenti)))
+
+        shutil.rmtree(nome_file, ignore_errors=True)
+        os.replace(cartella_tmp, nome_file)
+
+    elif formato == "csv":
+        with open(nome_file, "w", encoding="utf-8", newline="") as f:
+            if n_workers == 1:
+                for i in range(num_blocchi):
+                    f.write(_blocco_csv(dimensioni[i], seeds[i], i == 0))
+            else:
+                # Il testo CSV viene prodotto dai worker; al massimo
+                # 2 * n_workers blocchi restano in memoria contemporaneamente
+                with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                    in_corso = []
+                    for i in range(num_blocchi):
+                        in_corso.append(executor.submit(_blocco_csv, dimensioni[i], seeds[i], i == 0))
+                        if len(in_corso) >= 2 * n_workers:
+                            f.write(in_corso.pop(0).result())
+                    for future in in_corso:
+                        f.write(future.result())
+
+    else:
+        raise ValueError("formato deve essere 'csv' oppure 'parquet'")
+
+    print(f"Creato dataset di vendite con {num_righe} righe in: {nome_file}")
+
+
 # =====================================================
 # PARTE 2 – IMPORTAZIONE CSV CON PANDAS
 # =====================================================
@@ -107,42 +225,137 @@ def importa_vendite_csv(nome_file="vendite.csv"):
     return df
 
 
+# Tipi espliciti per la lettura a blocchi: le colonne di testo diventano
+# categoriche e la data viene letta già come datetime
+TIPI_VENDITE = {
+    "Negozio": "category",
+    "Prodotto": "category",
+    "Quantità": "int32",
+    "Prezzo_unitario": "float64",
+}
+
+# Oltre questa dimensione il file viene elaborato a blocchi
+DIMENSIONE_MAX_IN_MEMORIA = 512 * 1024 ** 2
+
+
+def _elabora_blocco(chunk):
+    """
+    Aggiunge Incasso e Categoria a un blocco e ne calcola i KPI.
+    Restituisce i KPI del blocco e il testo CSV da accodare all'output.
+    """
+    chunk["Incasso"] = chunk["Quantità"] * chunk["Prezzo_unitario"]
+    chunk = aggiungi_categoria(chunk)
+
+    testo = chunk.to_csv(index=False, header=False, date_format="%Y-%m-%d")
+    return calcola_kpi(chunk), testo
+
+
+def importa_vendite_csv_a_blocchi(
+    nome_file="vendite.csv",
+    nome_output="vendite_analizzate.csv",
+    righe_per_blocco=1_000_000,
+    n_workers=1,
+):
+    """
+    Versione out-of-core di importa_vendite_csv + Parti 3 e 6:
+    - legge il file a blocchi con tipi espliciti
+    - calcola Incasso e Categoria su ogni blocco
+    - accoda ogni blocco a vendite_analizzate.csv
+    - unisce i KPI dei blocchi in un unico KPIVendite
+
+    La memoria usata dipende da righe_per_blocco e non dalla dimensione
+    del file. Con n_workers > 1 i blocchi vengono elaborati in parallelo
+    (al massimo 2 * n_workers blocchi in memoria contemporaneamente).
+    """
+    print("\n=== Parte 2 – Importazione CSV a blocchi ===")
+
+    blocchi = pd.read_csv(
+        nome_file,
+        dtype=TIPI_VENDITE,
+        parse_dates=["Data"],
+        chunksize=righe_per_blocco,
+    )
+
+    kpi = None
+    num_blocchi = 0
+
+    with open(nome_output, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(COLONNE_VENDITE + ["Incasso", "Categoria"]) + "\n")
+
+        def accoda(risultato):
+            nonlocal kpi, num_blocchi
+            kpi_blocco, testo = risultato
+            f.write(testo)
+            kpi = kpi_blocco if kpi is None else kpi.unisci(kpi_blocco)
+            num_blocchi += 1
+
+        if n_workers == 1:
+            for chunk in blocchi:
+                accoda(_elabora_blocco(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                in_corso = []
+                for chunk in blocchi:
+                    in_corso.append(executor.submit(_elabora_blocco, chunk))
+                    if len(in_corso) >= 2 * n_workers:
+                        accoda(in_corso.pop(0).result())
+                for future in in_corso:
+                    accoda(future.result())
+
+    # File con la sola intestazione: nessun blocco con righe
+    if kpi is None:
+        kpi = KPIVendite.vuoto()
+
+    print(f"Blocchi elaborati: {num_blocchi}")
+    print(f"Righe elaborate: {kpi.numero_righe()}")
+    if kpi.numero_righe() == 0:
+        print(f"Nessuna vendita in {nome_file}: i report non hanno dati")
+    print(f"\nDataFrame analizzato salvato in: {nome_output}")
+
+    return kpi
+
+
 # =====================================================
 # PARTE 3 – ELABORAZIONI CON PANDAS
 # =====================================================
 
-def elaborazioni_pandas(df):
+def elaborazioni_pandas(df, kpi=None):
     """
     Aggiunge la colonna 'Incasso' e calcola:
     - incasso totale catena
     - incasso medio per negozio
     - 3 prodotti più venduti per quantità totale
     - incasso medio raggruppato per (Negozio, Prodotto)
+
+    I valori vengono letti da kpi (risultato di calcola_kpi);
+    se non viene passato, viene calcolato qui con una sola scansione.
     """
     print("\n=== Parte 3 – Elaborazioni con Pandas ===")
 
     # Colonna Incasso = Quantità * Prezzo_unitario
-    df["Incasso"] = df["Quantità"] * df["Prezzo_unitario"]
+    # (con la lettura a blocchi df è None e si usano solo i KPI)
+    if df is not None:
+        df["Incasso"] = df["Quantità"] * df["Prezzo_unitario"]
+
+    if kpi is None:
+        kpi = calcola_kpi(df)
 
     # Incasso totale catena
-    incasso_totale = df["Incasso"].sum()
+    incasso_totale = kpi.incasso_totale()
     print(f"\nIncasso totale catena: {incasso_totale:.2f} €")
 
     # Incasso medio per negozio
-    incasso_medio_negozio = df.groupby("Negozio")["Incasso"].mean()
+    incasso_medio_negozio = kpi.incasso_medio_per_negozio()
     print("\nIncasso medio per negozio:")
     print(incasso_medio_negozio)
 
     # 3 prodotti più venduti (per quantità totale)
-    quantita_per_prodotto = df.groupby("Prodotto")["Quantità"].sum()
-    top3_prodotti = quantita_per_prodotto.sort_values(ascending=False).head(3)
+    top3_prodotti = kpi.top_prodotti(3, per="Quantità")
     print("\nTop 3 prodotti più venduti (per quantità totale):")
     print(top3_prodotti)
 
     # Incasso medio raggruppato per Negozio e Prodotto
-    incasso_medio_negozio_prodotto = (
-        df.groupby(["Negozio", "Prodotto"])["Incasso"].mean()
-    )
+    incasso_medio_negozio_prodotto = kpi.incasso_medio_negozio_prodotto()
     print("\nIncasso medio per (Negozio, Prodotto):")
     print(incasso_medio_negozio_prodotto)
 
@@ -195,11 +408,30 @@ def analisi_numpy(df):
     print(f"I valori di incasso calcolati con NumPy coincidono con la colonna Incasso? {coincidenza}")
 
 
+def analisi_numpy_da_kpi(kpi):
+    """
+    Stesse statistiche di analisi_numpy sulla colonna Quantità,
+    lette dall'istogramma delle quantità dei KPI (modalità a blocchi).
+    """
+    print("\n=== Parte 4 – Uso di NumPy ===")
+
+    stat = kpi.statistiche_quantita()
+    if stat["minimo"] is None:
+        print("Nessuna riga con Quantità: statistiche non disponibili")
+        return
+
+    print(
+        f"Quantità - media: {stat['media']:.2f}, min: {stat['minimo']}, "
+        f"max: {stat['massimo']}, dev.std: {stat['dev_std']:.2f}"
+    )
+    print(f"Percentuale di righe con Quantità sopra la media: {stat['percentuale_sopra_media']:.2f}%")
+
+
 # =====================================================
 # PARTE 5 – VISUALIZZAZIONI CON MATPLOTLIB
 # =====================================================
 
-def grafici_base(df):
+def grafici_base(df, kpi=None):
     """
     Crea:
     - grafico a barre: incasso totale per ogni negozio
@@ -209,11 +441,14 @@ def grafici_base(df):
     print("\n=== Parte 5 – Visualizzazioni con Matplotlib ===")
 
     # Assicuriamoci che la colonna Data sia di tipo datetime
-    if df["Data"].dtype == "object":
+    if df is not None and df["Data"].dtype == "object":
         df["Data"] = pd.to_datetime(df["Data"])
 
+    if kpi is None:
+        kpi = calcola_kpi(df)
+
     # Grafico a barre: incasso totale per negozio
-    incasso_per_negozio = df.groupby("Negozio")["Incasso"].sum()
+    incasso_per_negozio = kpi.incasso_per_negozio()
     plt.figure(figsize=(8, 5))
     incasso_per_negozio.plot(kind="bar", color="skyblue")
     plt.title("Incasso totale per negozio")
@@ -224,7 +459,7 @@ def grafici_base(df):
     plt.show()
 
     # Grafico a torta: percentuale incassi per prodotto
-    incasso_per_prodotto = df.groupby("Prodotto")["Incasso"].sum()
+    incasso_per_prodotto = kpi.incasso_per_prodotto()
     plt.figure(figsize=(6, 6))
     plt.pie(
         incasso_per_prodotto.values,
@@ -238,7 +473,7 @@ def grafici_base(df):
     plt.show()
 
     # Grafico a linee: andamento giornaliero incassi totali
-    incasso_giornaliero = df.groupby("Data")["Incasso"].sum().sort_index()
+    incasso_giornaliero = kpi.incasso_giornaliero()
     plt.figure(figsize=(8, 5))
     plt.plot(incasso_giornaliero.index, incasso_giornaliero.values, marker="o")
     plt.title("Andamento giornaliero incassi totali")
@@ -261,20 +496,16 @@ def aggiungi_categoria(df):
     - TV -> Elettrodomestici
     - Cuffie, Console -> Accessori / Gaming
     """
-    mappa_categoria = {
-        "Smartphone": "Informatica",
-        "Laptop": "Informatica",
-        "Tablet": "Informatica",
-        "TV": "Elettrodomestici",
-        "Cuffie": "Accessori",
-        "Console": "Gaming",
-    }
-
-    df["Categoria"] = df["Prodotto"].map(mappa_categoria).fillna("Altro")
+    if isinstance(df["Prodotto"].dtype, pd.CategoricalDtype):
+        # Prodotto categorico (lettura a blocchi): basta mappare le categorie
+        categorie = df["Prodotto"].cat.categories.map(lambda p: MAPPA_CATEGORIA.get(p, "Altro"))
+        df["Categoria"] = pd.Categorical(np.asarray(categorie)[df["Prodotto"].cat.codes])
+    else:
+        df["Categoria"] = df["Prodotto"].map(MAPPA_CATEGORIA).fillna("Altro")
     return df
 
 
-def analisi_per_categoria(df):
+def analisi_per_categoria(df, kpi=None):
     """
     Per ogni categoria calcola:
     - incasso totale
@@ -282,11 +513,14 @@ def analisi_per_categoria(df):
     """
     print("\n=== Parte 6 – Analisi avanzata per categoria ===")
 
-    incasso_per_categoria = df.groupby("Categoria")["Incasso"].sum()
+    if kpi is None:
+        kpi = calcola_kpi(df)
+
+    incasso_per_categoria = kpi.incasso_per_categoria()
     print("\nIncasso totale per categoria:")
     print(incasso_per_categoria)
 
-    quantita_media_categoria = df.groupby("Categoria")["Quantità"].mean()
+    quantita_media_categoria = kpi.quantita_media_per_categoria()
     print("\nQuantità media venduta per categoria:")
     print(quantita_media_categoria)
 
@@ -304,7 +538,7 @@ def salva_vendite_analizzate(df, nome_file="vendite_analizzate.csv"):
 # PARTE 7 – ESTENSIONI
 # =====================================================
 
-def grafico_combinato_categoria(df):
+def grafico_combinato_categoria(df, kpi=None):
     """
     Grafico combinato:
     - barre: incasso medio per categoria
@@ -312,8 +546,11 @@ def grafico_combinato_categoria(df):
     """
     print("\n=== Parte 7 – Grafico combinato per categoria ===")
 
-    incasso_medio_categoria = df.groupby("Categoria")["Incasso"].mean()
-    quantita_media_categoria = df.groupby("Categoria")["Quantità"].mean()
+    if kpi is None:
+        kpi = calcola_kpi(df)
+
+    incasso_medio_categoria = kpi.incasso_medio_per_categoria()
+    quantita_media_categoria = kpi.quantita_media_per_categoria()
 
     categorie = incasso_medio_categoria.index
     valori_incasso = incasso_medio_categoria.values
@@ -338,13 +575,14 @@ def grafico_combinato_categoria(df):
     plt.show()
 
 
-def top_n_prodotti(df, n=3):
+def top_n_prodotti(df, n=3, kpi=None):
     """
     Restituisce i n prodotti più venduti in termini di incasso totale.
     """
-    incasso_per_prodotto = df.groupby("Prodotto")["Incasso"].sum()
-    top = incasso_per_prodotto.sort_values(ascending=False).head(n)
-    return top
+    if kpi is None:
+        kpi = calcola_kpi(df)
+
+    return kpi.top_prodotti(n, per="Incasso")
 
 
 # =====================================================
@@ -356,25 +594,49 @@ if __name__ == "__main__":
     if not os.path.exists("vendite.csv"):
         genera_vendite_csv("vendite.csv", num_righe=30)
 
-    # Parte 2: importazione
-    df_vendite = importa_vendite_csv("vendite.csv")
+    # File troppo grandi per la memoria: elaborazione a blocchi,
+    # i report vengono prodotti solo a partire dai KPI
+    if os.path.getsize("vendite.csv") > DIMENSIONE_MAX_IN_MEMORIA:
+        kpi_vendite = importa_vendite_csv_a_blocchi("vendite.csv", "vendite_analizzate.csv")
+
+        # Con la sola intestazione non ci sono report da produrre
+        if kpi_vendite.numero_righe() > 0:
+            elaborazioni_pandas(None, kpi_vendite)
+            analisi_numpy_da_kpi(kpi_vendite)
+            grafici_base(None, kpi_vendite)
+            analisi_per_categoria(None, kpi_vendite)
+            grafico_combinato_categoria(None, kpi_vendite)
+
+            print("\nTop 3 prodotti per incasso totale:")
+            print(top_n_prodotti(None, n=3, kpi=kpi_vendite))
+
+    else:
+        # Parte 2: importazione
+        df_vendite = importa_vendite_csv("vendite.csv")
+
+        if df_vendite.empty:
+            print("\nNessuna vendita in vendite.csv: i report non hanno dati")
+
+        else:
+            # Tutti i KPI dei report in una sola scansione
+            kpi_vendite = calcola_kpi(df_vendite)
 
-    # Parte 3: elaborazioni con Pandas (aggiunge Incasso)
-    df_vendite = elaborazioni_pandas(df_vendite)
+            # Parte 3: elaborazioni con Pandas (aggiunge Incasso)
+            df_vendite = elaborazioni_pandas(df_vendite, kpi_vendite)
 
-    # Parte 4: analisi NumPy
-    analisi_numpy(df_vendite)
+            # Parte 4: analisi NumPy
+            analisi_numpy(df_vendite)
 
-    # Parte 5: grafici base con Matplotlib
-    grafici_base(df_vendite)
+            # Parte 5: grafici base con Matplotlib
+            grafici_base(df_vendite, kpi_vendite)
 
-    # Parte 6: categorie + analisi + salvataggio CSV finale
-    df_vendite = aggiungi_categoria(df_vendite)
-    analisi_per_categoria(df_vendite)
-    salva_vendite_analizzate(df_vendite, "vendite_analizzate.csv")
+            # Parte 6: categorie + analisi + salvataggio CSV finale
+            df_vendite = aggiungi_categoria(df_vendite)
+            analisi_per_categoria(df_vendite, kpi_vendite)
+            salva_vendite_analizzate(df_vendite, "vendite_analizzate.csv")
 
-    # Parte 7: estensioni
-    grafico_combinato_categoria(df_vendite)
+            # Parte 7: estensioni
+            grafico_combinato_categoria(df_vendite, kpi_vendite)
 
-    print("\nTop 3 prodotti per incasso totale:")
-    print(top_n_prodotti(df_vendite, n=3))
+            print("\nTop 3 prodotti per incasso totale:")
+            print(top_n_prodotti(df_vendite, n=3, kpi=kpi_vendite))
@@ -1,16 +1,24 @@
 import os
-import json
 import time
-from collections import Counter
+import shutil
 
 import pandas as pd
-import dask.dataframe as dd
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 from pyspark.sql import SparkSession
 from pyspark.sql import functions as F
 
+from ingestione_jsonl import ingestione_parallela, medie_per_gruppo
+from etl_locale import etl_locale
+from cache_report import report_fatturato
+from compattazione_json import file_da_leggere, leggi_transazioni_dask
+from streaming_finestre import StreamingFinestre, carica_categorie
+from manifest_etl import (
+    carica_manifest, confronta_batch, dimensioni_cambiate, manifest_ricostruito,
+    registra_batch, registra_ricostruzione, chiudi_esecuzione, etl_incrementale,
+)
+
 # ============================================================================
 # CONFIGURAZIONE GENERALE
 # ============================================================================
@@ -18,6 +26,7 @@ BASE_DIR = "./data_local"
 PARQUET_DIR = os.path.join(BASE_DIR, "parquet")
 JSON_DIR = os.path.join(BASE_DIR, "json")
 PROCESSED_DIR = os.path.join(BASE_DIR, "processed_sales")
+COMPATTATI_DIR = os.path.join(BASE_DIR, "json_compattati")
 
 
 # ============================================================================
@@ -28,13 +37,17 @@ def esercizio1_pandas():
     """
     Legge tutti i file JSONL in ./data_local/json con Pandas
     e calcola la somma totale della colonna 'amount'.
+    I file già compattati (compattazione_json.py) vengono letti
+    dai Parquet in ./data_local/json_compattati.
     """
     total_amount = 0.0
+    parquet_files, jsonl_files = file_da_leggere(JSON_DIR, COMPATTATI_DIR)
+
+    for file_path in parquet_files:
+        print(f"[Pandas] Leggo: {file_path}")
+        total_amount += pd.read_parquet(file_path, columns=["amount"])["amount"].sum()
 
-    for filename in os.listdir(JSON_DIR):
-        if not filename.endswith(".jsonl"):
-            continue
-        file_path = os.path.join(JSON_DIR, filename)
+    for file_path in jsonl_files:
         print(f"[Pandas] Leggo: {file_path}")
 
         df = pd.read_json(file_path, lines=True)
@@ -48,11 +61,11 @@ def esercizio1_dask():
     Legge tutti i file JSONL in ./data_local/json con Dask
     e calcola la media di 'amount' per 'year'.
     (Se aggiungi payment_type nel generator, puoi cambiare il groupby.)
+    I Parquet compattati sostituiscono i JSONL da cui sono stati creati.
     """
-    pattern = os.path.join(JSON_DIR, "*.jsonl")
-    print(f"[Dask] Leggo pattern: {pattern}")
+    print(f"[Dask] Leggo: {COMPATTATI_DIR} (compattati) e {JSON_DIR} (non compattati)")
 
-    ddf = dd.read_json(pattern, lines=True)
+    ddf = leggi_transazioni_dask(["amount", "year"], JSON_DIR, COMPATTATI_DIR)
     grouped = ddf.groupby("year")["amount"].mean()
     result = grouped.compute()
 
@@ -60,6 +73,28 @@ def esercizio1_dask():
     print(result)
 
 
+def esercizio1_parallelo(n_workers=None):
+    """
+    Come esercizio1_pandas (e la media per year di esercizio1_dask),
+    ma i file vengono letti in parallelo estraendo solo
+    'amount' e 'year', senza costruire DataFrame.
+    Come negli altri esercizi, i Parquet compattati sostituiscono
+    i JSONL da cui sono stati creati.
+    """
+    parquet, jsonl = file_da_leggere(JSON_DIR, COMPATTATI_DIR)
+    risultato = ingestione_parallela(parquet + jsonl, "amount", ("year",), n_workers)
+
+    mb = risultato["byte"] / 1024 ** 2
+    secondi = risultato.get("secondi", 0.0) or 1e-9
+    print(f"[Parallelo] File letti: {risultato['file']} | {mb:.1f} MB | {risultato['righe']} righe")
+    print(f"[Parallelo] {risultato['file'] / secondi:.1f} file/s | {mb / secondi:.1f} MB/s")
+    print(f"[Parallelo] Totale generale amount: {risultato['somma']:.2f}")
+
+    if risultato["righe"]:
+        print("[Parallelo] Media amount per year:")
+        print(medie_per_gruppo(risultato, "year"))
+
+
 # ============================================================================
 # ESERCIZIO 2 - Pipeline ETL con PySpark
 # ============================================================================
@@ -76,24 +111,45 @@ def get_spark(app_name="MegaShop_App"):
     return spark
 
 
-def esercizio2_etl(spark=None):
+def esercizio2_etl(spark=None, incrementale=False):
     """
     Extract-Transform-Load:
     - Legge transactions_batch_*.parquet, products.parquet, regions.parquet
     - Join per ottenere (transaction_id, region_name, category, amount, year)
     - Salva in ./data_local/processed_sales partizionato per year
+
+    Con incrementale=True vengono letti solo i batch non ancora nel manifest
+    e aggiunti (mode "append") alle loro partizioni year=. Se un batch già
+    elaborato è stato modificato o rimosso, o sono cambiati prodotti o regioni,
+    l'output viene riscritto per intero come nella versione non incrementale.
     """
+    manifest = carica_manifest()
+    cambiate, checksum_dimensioni = dimensioni_cambiate(manifest, PARQUET_DIR)
+    nuovi, modificati, rimossi, descrizioni = confronta_batch(manifest, PARQUET_DIR)
+
+    completo = not incrementale or cambiate or modificati or rimossi or not os.path.isdir(PROCESSED_DIR)
+
+    if completo:
+        manifest = manifest_ricostruito(manifest, checksum_dimensioni)
+        da_elaborare = sorted(descrizioni)
+    else:
+        da_elaborare = nuovi
+
+    if not da_elaborare:
+        print("[Spark ETL] Nessun batch nuovo: output già aggiornato")
+        chiudi_esecuzione(manifest, descrizioni, set(), completo)
+        return
+
     close_spark = False
     if spark is None:
         spark = get_spark("MegaShop_ETL")
         close_spark = True
 
-    transactions_path = os.path.join(PARQUET_DIR, "transactions_batch_*.parquet")
     products_path = os.path.join(PARQUET_DIR, "products.parquet")
     regions_path = os.path.join(PARQUET_DIR, "regions.parquet")
 
-    print(f"[Spark ETL] Leggo transazioni da: {transactions_path}")
-    df_trans = spark.read.parquet(transactions_path)
+    print(f"[Spark ETL] Leggo {len(da_elaborare)} batch di transazioni da: {PARQUET_DIR}")
+    df_trans = spark.read.parquet(*da_elaborare)
 
     print(f"[Spark ETL] Leggo prodotti da: {products_path}")
     df_prod = spark.read.parquet(products_path)
@@ -113,65 +169,105 @@ def esercizio2_etl(spark=None):
         "year"
     )
 
-    print(f"[Spark ETL] Scrivo risultato in: {PROCESSED_DIR}")
+    modo = "overwrite" if completo else "append"
+    print(f"[Spark ETL] Scrivo risultato in: {PROCESSED_DIR} (mode {modo})")
     (
         df_final
         .write
-        .mode("overwrite")
+        .mode(modo)
         .partitionBy("year")
         .parquet(PROCESSED_DIR)
     )
 
+    # Il manifest viene aggiornato solo dopo una scrittura riuscita
+    anni_toccati = set()
+    for chiave in da_elaborare:
+        anni_toccati.update(registra_batch(manifest, chiave, descrizioni[chiave]))
+    chiudi_esecuzione(manifest, descrizioni, anni_toccati, True)
+    print(f"[Spark ETL] Partizioni aggiornate: {sorted(anni_toccati)} | Versione dati: {manifest['versione']}")
+
     if close_spark:
         spark.stop()
 
 
+def esercizio2_etl_locale():
+    """
+    Stessa pipeline di esercizio2_etl (stesso output in PROCESSED_DIR)
+    eseguita con Arrow in locale, senza SparkSession.
+    """
+    etl_locale(PARQUET_DIR, PROCESSED_DIR)
+    registra_ricostruzione(PARQUET_DIR)
+
+
+def esercizio2_etl_incrementale():
+    """
+    Versione incrementale con Arrow: elabora solo i batch nuovi o modificati
+    e riscrive solo le partizioni year= toccate (vedi manifest_etl.py).
+    """
+    etl_incrementale(PARQUET_DIR, PROCESSED_DIR)
+
+
 # ============================================================================
 # ESERCIZIO 3 - Data Visualization (Reporting)
 # ============================================================================
 
-def esercizio3_report(spark=None):
+def esercizio3_report(spark=None, forza=False):
     """
     Dal DataFrame Spark pulito (processed_sales):
     - Calcola fatturato totale per categoria
     - Porta il risultato in Pandas
     - Crea un grafico a barre e lo salva come fatturato_per_categoria.png
+
+    Il fatturato è la somma di aggregati parziali per partizione year=,
+    tenuti in data_local/report_cache (vedi cache_report.py): Spark viene
+    avviato solo per le partizioni nuove o cambiate dall'ultimo report e il
+    grafico viene ridisegnato solo se i dati sono cambiati (forza=True per
+    ricalcolare tutto).
     """
     import seaborn as sns
     import matplotlib.pyplot as plt
 
     close_spark = False
-    if spark is None:
-        spark = get_spark("MegaShop_Reporting")
-        close_spark = True
 
-    print(f"[Reporting] Leggo dati da: {PROCESSED_DIR}")
-    df_final = spark.read.parquet(PROCESSED_DIR)
+    def fatturato_spark(path_partizione):
+        nonlocal spark, close_spark
+        if spark is None:
+            spark = get_spark("MegaShop_Reporting")
+            close_spark = True
+
+        return (
+            spark.read.parquet(path_partizione)
+            .groupBy("category")
+            .agg(F.sum("amount").alias("total_revenue"), F.count("amount").alias("transazioni"))
+            .toPandas()
+        )
+
+    def disegna(pdf_cat, path):
+        plt.figure(figsize=(8, 5))
+        sns.barplot(data=pdf_cat, x="category", y="total_revenue")
+        plt.xticks(rotation=45, ha="right")
+        plt.xlabel("Categoria")
+        plt.ylabel("Fatturato totale")
+        plt.title("Fatturato per categoria")
+
+        plt.tight_layout()
+        plt.savefig(path, dpi=150)
+        plt.close()
 
-    df_cat = (
-        df_final
-        .groupBy("category")
-        .agg(F.sum("amount").alias("total_revenue"))
-        .orderBy("total_revenue", ascending=False)
+    print(f"[Reporting] Leggo dati da: {PROCESSED_DIR}")
+    pdf_cat, _, path_grafico = report_fatturato(
+        PROCESSED_DIR, os.path.join(BASE_DIR, "report_cache"), fatturato_spark, disegna, forza
     )
 
-    pdf_cat = df_cat.toPandas()
-
-    plt.figure(figsize=(8, 5))
-    sns.barplot(data=pdf_cat, x="category", y="total_revenue")
-    plt.xticks(rotation=45, ha="right")
-    plt.xlabel("Categoria")
-    plt.ylabel("Fatturato totale")
-    plt.title("Fatturato per categoria")
-
-    plt.tight_layout()
     out_path = "fatturato_per_categoria.png"
-    plt.savefig(out_path, dpi=150)
+    shutil.copyfile(path_grafico, out_path)
     print(f"[Reporting] Grafico salvato come: {out_path}")
 
     if close_spark:
         spark.stop()
 
+    return pdf_cat
+
 
 # ============================================================================
 # ESERCIZIO 4 (Bonus) - Real-Time Streaming
@@ -180,46 +276,54 @@ def esercizio3_report(spark=None):
 class NewFileHandler(FileSystemEventHandler):
     """
     Handler per monitorare la cartella JSON_DIR.
-    Ogni nuovo file .jsonl viene letto e si aggiorna il conteggio
-    delle transazioni per region_id.
+    Ogni file .jsonl creato, modificato, chiuso o rinominato nella cartella
+    viene segnalato a StreamingFinestre, che ne legge le righe complete
+    non ancora lette e aggiorna le finestre per regione e categoria.
     """
-    def __init__(self):
+    def __init__(self, stream):
         super().__init__()
-        self.region_counts = Counter()
+        self.stream = stream
 
     def on_created(self, event):
-        if event.is_directory:
-            return
-        if not str(event.src_path).endswith(".jsonl"):
-            return
+        if not event.is_directory:
+            self.stream.notifica(event.src_path)
 
-        print(f"[Streaming] Nuovo file rilevato: {event.src_path}")
-        self.process_file(event.src_path)
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.stream.notifica(event.src_path)
 
-        print("[Streaming] Totale transazioni per region_id (aggiornato):")
-        for region_id, count in self.region_counts.items():
-            print(f"  region_id {region_id}: {count}")
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.stream.notifica(event.src_path)
 
-    def process_file(self, filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                record = json.loads(line)
-                region_id = record.get("region_id")
-                if region_id is None:
-                    continue
-                self.region_counts[region_id] += 1
+    def on_moved(self, event):
+        # File scritti altrove e poi rinominati nella cartella
+        if not event.is_directory:
+            self.stream.notifica(event.dest_path)
 
 
-def esercizio4_streaming():
+def esercizio4_streaming(intervallo_metriche=10):
     """
     Monitoraggio in tempo reale della cartella ./data_local/json/
     usando watchdog. Ctrl+C per interrompere.
+
+    Conteggio e somma di amount per regione e categoria su finestre
+    tumbling (1 minuto) e sliding (5 minuti, passo 1 minuto); le finestre
+    chiuse finiscono in data_local/finestre_chiuse.jsonl e lo stato in
+    data_local/streaming_checkpoint.json, da cui riparte l'esecuzione successiva.
     """
     os.makedirs(JSON_DIR, exist_ok=True)
 
-    event_handler = NewFileHandler()
+    products_path = os.path.join(PARQUET_DIR, "products.parquet")
+    stream = StreamingFinestre(
+        JSON_DIR,
+        path_checkpoint=os.path.join(BASE_DIR, "streaming_checkpoint.json"),
+        path_output=os.path.join(BASE_DIR, "finestre_chiuse.jsonl"),
+        categorie_prodotto=carica_categorie(products_path) if os.path.exists(products_path) else None,
+    )
+    stream.avvia()
+
+    event_handler = NewFileHandler(stream)
     observer = Observer()
     observer.schedule(event_handler, JSON_DIR, recursive=False)
     observer.start()
@@ -227,8 +331,12 @@ def esercizio4_streaming():
 
     try:
         while True:
-            time.sleep(1)
+            time.sleep(intervallo_metriche)
+            stream.stampa_metriche()
+            print("[Streaming] Totale transazioni per region_id (aggiornato):")
+            for region_id, count in stream.totali_per_regione().items():
+                print(f"  region_id {region_id}: {count}")
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
-
+    stream.ferma()
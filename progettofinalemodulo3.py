@@ -9,7 +9,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 
 from sklearn.datasets import load_diabetes
-from sklearn.model_selection import train_test_split, KFold, cross_val_score, GridSearchCV, learning_curve
+from sklearn.model_selection import train_test_split, KFold, learning_curve
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 
@@ -20,6 +20,9 @@ from sklearn.svm import SVR
 
 from sklearn.metrics import mean_squared_error, r2_score
 
+from confronto_modelli import confronta_modelli, riepilogo_tempi
+from ricerca_halving import ricerca_iperparametri, confronta_ricerche
+
 # --------------------------------------------
 # 1. Data Exploration & Preprocessing
 # --------------------------------------------
@@ -88,24 +91,21 @@ models = {
 
 kfold = KFold(n_splits=5, shuffle=True, random_state=42)
 
-cv_results = []
+# Tutte le coppie (modello, fold) in parallelo, con i dati condivisi in
+# memory-mapping e i fold calcolati una volta (vedi confronto_modelli.py).
+# scoring='neg_mean_squared_error' restituisce NMSE (Negative MSE)
+cv_df, cv_tempi = confronta_modelli(
+    models,
+    X_train_scaled,
+    y_train,
+    kfold,
+    scoring="neg_mean_squared_error",
+    n_jobs=-1
+)
 
-for name, model in models.items():
-    # scoring='neg_mean_squared_error' restituisce NMSE (Negative MSE)
-    scores = cross_val_score(
-        model,
-        X_train_scaled,
-        y_train,
-        cv=kfold,
-        scoring="neg_mean_squared_error"
-    )
-    cv_results.append({
-        "Model": name,
-        "NMSE_mean": scores.mean(),
-        "NMSE_std": scores.std()
-    })
+print("Tempi di fit e score per modello (secondi):")
+print(riepilogo_tempi(cv_tempi), "\n")
 
-cv_df = pd.DataFrame(cv_results)
 print("Risultati K-Fold CV (scoring = neg_mean_squared_error):")
 print(cv_df.sort_values("NMSE_mean", ascending=False), "\n")
 
@@ -114,7 +114,7 @@ best_model_name = cv_df.sort_values("NMSE_mean", ascending=False).iloc[0]["Model
 print(f"Modello selezionato per il tuning: {best_model_name}\n")
 
 # --------------------------------------------
-# 3. Hyperparameters Tuning (Grid Search)
+# 3. Hyperparameters Tuning (Grid Search / Successive Halving)
 #    + Valutazione finale su Test (MSE, R2)
 # --------------------------------------------
 
@@ -146,17 +146,40 @@ else:  # LinearRegression (pochi iperparametri utili, usiamo fit_intercept)
     base_model = LinearRegression()
     param_grid = {"fit_intercept": [True, False]}
 
-grid_search = GridSearchCV(
-    estimator=base_model,
-    param_grid=param_grid,
-    cv=kfold,
-    scoring="neg_mean_squared_error",
-    n_jobs=-1
-)
-
-grid_search.fit(X_train_scaled, y_train)
+# Modalità di ricerca (vedi ricerca_halving.py):
+# "halving" = successive halving, le combinazioni peggiori vengono scartate
+#             dopo fit su poche righe; "griglia" = GridSearchCV esaustiva.
+# Il halving conviene con griglie grandi e molti dati: con poche combinazioni
+# (es. Lasso, 5 valori di alpha) e poche righe può fare più fit della griglia.
+MODALITA_RICERCA = "halving"
+
+# True solo per misurare: esegue anche la ricerca esaustiva (costa più della
+# sola griglia) e stampa fit e tempo risparmiati
+CONFRONTA_RICERCHE = False
+
+if MODALITA_RICERCA == "halving" and CONFRONTA_RICERCHE:
+    grid_search, _ = confronta_ricerche(
+        base_model,
+        param_grid,
+        X_train_scaled,
+        y_train,
+        kfold,
+        scoring="neg_mean_squared_error",
+        n_jobs=-1
+    )
+else:
+    grid_search = ricerca_iperparametri(
+        base_model,
+        param_grid,
+        X_train_scaled,
+        y_train,
+        kfold,
+        scoring="neg_mean_squared_error",
+        modalita=MODALITA_RICERCA,
+        n_jobs=-1
+    )
 
-print("Migliori iperparametri trovati dalla Grid Search:")
+print(f"Migliori iperparametri trovati dalla ricerca ({MODALITA_RICERCA}):")
 print(grid_search.best_params_, "\n")
 
 best_model = grid_search.best_estimator_
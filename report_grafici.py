@@ -0,0 +1,277 @@
+# ============================================
+# Rendering headless dei grafici per i report vendite
+#
+# grafici_base e grafico_combinato_categoria mostrano i grafici con
+# plt.show() uno alla volta. Per i report notturni servono invece
+# pacchetti di grafici per ogni negozio e per ogni categoria.
+#
+# Qui i grafici vengono:
+# - descritti a partire dai KPI già calcolati (KPIVendite), senza groupby
+# - disegnati senza interfaccia grafica (backend Agg) su un pool di processi
+# - salvati in PNG o SVG
+# - saltati se i dati in ingresso non sono cambiati: ogni grafico ha un
+#   hash dei suoi dati, salvato in cache.json nella cartella di output
+#
+# Alla fine vengono stampati il tempo di rendering per grafico
+# e la percentuale di grafici trovati in cache.
+# ============================================
+
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from kpi_vendite import MAPPA_CATEGORIA, calcola_kpi
+
+
+# =====================================================
+# DESCRIZIONE DEI GRAFICI
+# =====================================================
+
+def _grafico(nome, tipo, titolo, etichette, valori, xlabel="", ylabel="", valori2=None):
+    """
+    Descrizione di un grafico: solo dati già aggregati, niente DataFrame.
+    """
+    return {
+        "nome": nome,
+        "tipo": tipo,
+        "titolo": titolo,
+        "xlabel": xlabel,
+        "ylabel": ylabel,
+        "etichette": [str(e) for e in etichette],
+        "valori": np.asarray(valori, dtype=np.float64).tolist(),
+        "valori2": None if valori2 is None else np.asarray(valori2, dtype=np.float64).tolist(),
+    }
+
+
+def grafici_generali(kpi):
+    """
+    Gli stessi grafici di grafici_base e grafico_combinato_categoria.
+    """
+    incasso_per_negozio = kpi.incasso_per_negozio()
+    incasso_per_prodotto = kpi.incasso_per_prodotto()
+    incasso_giornaliero = kpi.incasso_giornaliero()
+    incasso_medio_categoria = kpi.incasso_medio_per_categoria()
+    quantita_media_categoria = kpi.quantita_media_per_categoria()
+
+    return [
+        _grafico(
+            "incasso_per_negozio", "barre", "Incasso totale per negozio",
+            incasso_per_negozio.index, incasso_per_negozio.values,
+            xlabel="Negozio", ylabel="Incasso (€)"
+        ),
+        _grafico(
+            "percentuale_incassi_prodotto", "torta", "Percentuale incassi per prodotto",
+            incasso_per_prodotto.index, incasso_per_prodotto.values
+        ),
+        _grafico(
+            "andamento_giornaliero", "linee", "Andamento giornaliero incassi totali",
+            incasso_giornaliero.index.strftime("%Y-%m-%d"), incasso_giornaliero.values,
+            xlabel="Data", ylabel="Incasso giornaliero (€)"
+        ),
+        _grafico(
+            "combinato_categoria", "combinato", "Incasso medio e quantità media per categoria",
+            incasso_medio_categoria.index, incasso_medio_categoria.values,
+            xlabel="Categoria", ylabel="Incasso medio (€)",
+            valori2=quantita_media_categoria.values
+        ),
+    ]
+
+
+def grafici_per_negozio(kpi):
+    """
+    Per ogni negozio: incasso per prodotto e andamento giornaliero.
+    I valori sono fette del cubo (negozio, prodotto, giorno).
+    """
+    grafici = []
+    date = kpi.giorni.strftime("%Y-%m-%d")
+
+    for i, negozio in enumerate(kpi.negozi):
+        righe_prodotto = kpi.conteggi[i].sum(axis=1) > 0
+        righe_giorno = kpi.conteggi[i].sum(axis=0) > 0
+
+        grafici.append(_grafico(
+            f"negozio_{negozio}_incasso_prodotti", "barre", f"{negozio} - Incasso per prodotto",
+            kpi.prodotti[righe_prodotto], kpi.incasso[i].sum(axis=1)[righe_prodotto],
+            xlabel="Prodotto", ylabel="Incasso (€)"
+        ))
+        grafici.append(_grafico(
+            f"negozio_{negozio}_andamento", "linee", f"{negozio} - Andamento giornaliero incassi",
+            date[righe_giorno], kpi.incasso[i].sum(axis=0)[righe_giorno],
+            xlabel="Data", ylabel="Incasso giornaliero (€)"
+        ))
+
+    return grafici
+
+
+def grafici_per_categoria(kpi):
+    """
+    Per ogni categoria: incasso per negozio e andamento giornaliero.
+    """
+    grafici = []
+    date = kpi.giorni.strftime("%Y-%m-%d")
+    categorie = np.array([MAPPA_CATEGORIA.get(p, "Altro") for p in kpi.prodotti])
+
+    for categoria in sorted(set(categorie)):
+        colonne = categorie == categoria
+        incasso = kpi.incasso[:, colonne, :]
+        conteggi = kpi.conteggi[:, colonne, :]
+
+        righe_negozio = conteggi.sum(axis=(1, 2)) > 0
+        righe_giorno = conteggi.sum(axis=(0, 1)) > 0
+
+        grafici.append(_grafico(
+            f"categoria_{categoria}_incasso_negozi", "barre", f"{categoria} - Incasso per negozio",
+            kpi.negozi[righe_negozio], incasso.sum(axis=(1, 2))[righe_negozio],
+            xlabel="Negozio", ylabel="Incasso (€)"
+        ))
+        grafici.append(_grafico(
+            f"categoria_{categoria}_andamento", "linee", f"{categoria} - Andamento giornaliero incassi",
+            date[righe_giorno], incasso.sum(axis=(0, 1))[righe_giorno],
+            xlabel="Data", ylabel="Incasso giornaliero (€)"
+        ))
+
+    return grafici
+
+
+# =====================================================
+# RENDERING
+# =====================================================
+
+def hash_grafico(grafico, formato):
+    """
+    Hash dei dati in ingresso: se non cambia, il file esistente è ancora valido.
+    """
+    testo = json.dumps([grafico, formato], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(testo.encode("utf-8")).hexdigest()
+
+
+def disegna_grafico(grafico, path):
+    """
+    Disegna un grafico e lo salva su file. Restituisce il tempo impiegato.
+    """
+    inizio = time.perf_counter()
+
+    etichette = grafico["etichette"]
+    valori = grafico["valori"]
+
+    if grafico["tipo"] == "torta":
+        fig, ax = plt.subplots(figsize=(6, 6))
+        ax.pie(valori, labels=etichette, autopct="%1.1f%%", startangle=90)
+        ax.axis("equal")
+
+    elif grafico["tipo"] == "combinato":
+        fig, ax = plt.subplots(figsize=(8, 5))
+        ax.bar(etichette, valori, color="lightgreen", label="Incasso medio (€)")
+        ax.set_ylabel(grafico["ylabel"], color="green")
+        ax.tick_params(axis="y", labelcolor="green")
+
+        ax2 = ax.twinx()
+        ax2.plot(etichette, grafico["valori2"], color="blue", marker="o", label="Quantità media")
+        ax2.set_ylabel("Quantità media", color="blue")
+        ax2.tick_params(axis="y", labelcolor="blue")
+
+    else:
+        fig, ax = plt.subplots(figsize=(8, 5))
+
+        if grafico["tipo"] == "barre":
+            ax.bar(etichette, valori, color="skyblue")
+        else:
+            ax.plot(etichette, valori, marker="o")
+
+        ax.set_ylabel(grafico["ylabel"])
+        ax.tick_params(axis="x", rotation=45)
+
+    ax.set_xlabel(grafico["xlabel"])
+    ax.set_title(grafico["titolo"])
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+    return time.perf_counter() - inizio
+
+
+def renderizza_report(grafici, output_dir="report_grafici", formato="png", n_workers=None):
+    """
+    Disegna i grafici su un pool di processi, saltando quelli
+    il cui hash coincide con quello salvato in cache.json.
+    Restituisce un dizionario con tempi e statistiche della cache.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path_cache = os.path.join(output_dir, "cache.json")
+
+    cache = {}
+    if os.path.exists(path_cache):
+        with open(path_cache, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+
+    inizio = time.perf_counter()
+    da_disegnare = []
+    nuova_cache = {}
+    hit = 0
+
+    for grafico in grafici:
+        path = os.path.join(output_dir, f"{grafico['nome']}.{formato}")
+        chiave = hash_grafico(grafico, formato)
+        nuova_cache[grafico["nome"]] = chiave
+
+        if cache.get(grafico["nome"]) == chiave and os.path.exists(path):
+            hit += 1
+        else:
+            da_disegnare.append((grafico, path))
+
+    tempi = {}
+
+    if da_disegnare:
+        if n_workers == 1 or len(da_disegnare) == 1:
+            durate = [disegna_grafico(g, p) for g, p in da_disegnare]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                durate = list(executor.map(disegna_grafico, *zip(*da_disegnare)))
+
+        for (grafico, _), durata in zip(da_disegnare, durate):
+            tempi[grafico["nome"]] = durata
+
+    with open(path_cache, "w", encoding="utf-8") as f:
+        json.dump(nuova_cache, f, indent=2, ensure_ascii=False)
+
+    totale = time.perf_counter() - inizio
+    hit_rate = hit / len(grafici) * 100 if grafici else 0.0
+
+    print(f"\n[Report] Grafici totali: {len(grafici)}")
+    print(f"[Report] Disegnati: {len(da_disegnare)} | In cache: {hit} | Hit rate: {hit_rate:.1f}%")
+    if tempi:
+        print(f"[Report] Tempo medio per grafico: {np.mean(list(tempi.values())):.3f} s")
+        print(f"[Report] Grafico più lento: {max(tempi, key=tempi.get)} ({max(tempi.values()):.3f} s)")
+    print(f"[Report] Tempo totale: {totale:.2f} s")
+
+    return {
+        "grafici": len(grafici),
+        "disegnati": len(da_disegnare),
+        "hit": hit,
+        "hit_rate": hit_rate,
+        "tempi": tempi,
+        "tempo_totale": totale,
+    }
+
+
+def report_completo(kpi, output_dir="report_grafici", formato="png", n_workers=None):
+    """
+    Pacchetto completo: grafici generali, per negozio e per categoria.
+    """
+    grafici = grafici_generali(kpi) + grafici_per_negozio(kpi) + grafici_per_categoria(kpi)
+    return renderizza_report(grafici, output_dir, formato, n_workers)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    kpi_vendite = calcola_kpi(pd.read_csv("vendite.csv"))
+    report_completo(kpi_vendite)
@@ -0,0 +1,159 @@
+# ============================================
+# Ricerca degli iperparametri con successive halving (progettofinalemodulo3)
+#
+# GridSearchCV prova ogni combinazione della griglia su tutti i fold con
+# tutti i dati: per SVR 16 combinazioni x 5 fold = 80 fit completi, e il
+# costo cresce con il prodotto dei valori della griglia.
+#
+# Con il successive halving (HalvingGridSearchCV di scikit-learn):
+# - al primo turno tutte le combinazioni vengono valutate con poche risorse
+#   (poche righe di training, oppure poche iterazioni per i modelli
+#   iterativi come Lasso con max_iter)
+# - a ogni turno resta solo la frazione migliore (1 / factor) delle
+#   combinazioni e le risorse vengono moltiplicate per factor
+# - solo le ultime combinazioni rimaste usano tutti i dati
+#
+# ricerca_iperparametri restituisce un oggetto con la stessa interfaccia di
+# GridSearchCV (best_params_, best_estimator_), più numero di fit e tempo;
+# confronta_ricerche esegue anche la ricerca esaustiva e riporta i fit e
+# il tempo risparmiati.
+# ============================================
+
+import time
+
+from joblib import Parallel, delayed
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (abilita HalvingGridSearchCV)
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, ParameterGrid
+
+
+def _num_fold(cv, X, y):
+    return cv.get_n_splits(X, y) if hasattr(cv, "get_n_splits") else int(cv)
+
+
+def conta_fit(search, X, y):
+    """
+    (fit eseguiti, fit equivalenti con tutte le risorse) di una ricerca:
+    candidati valutati x fold, più il refit finale. Nel halving un fit con
+    un terzo delle righe conta come un terzo di fit completo.
+    """
+    fold = _num_fold(search.cv, X, y)
+    refit = 1 if search.refit else 0
+
+    if isinstance(search, HalvingGridSearchCV):
+        fit = sum(search.n_candidates_) * fold + refit
+        risorse = sum(c * r for c, r in zip(search.n_candidates_, search.n_resources_))
+        return fit, risorse / search.max_resources_ * fold + refit
+
+    fit = len(ParameterGrid(search.param_grid)) * fold + refit
+    return fit, float(fit)
+
+
+def ricerca_iperparametri(
+    base_model,
+    param_grid,
+    X,
+    y,
+    cv,
+    scoring="neg_mean_squared_error",
+    modalita="halving",
+    factor=3,
+    risorsa="n_samples",
+    max_risorse="auto",
+    min_risorse="exhaust",
+    n_jobs=-1,
+):
+    """
+    modalita="griglia": GridSearchCV esaustiva, come nel progetto.
+    modalita="halving": HalvingGridSearchCV; risorsa è "n_samples" (righe di
+    training) oppure il nome di un parametro intero del modello (es. "max_iter").
+    Restituisce la ricerca addestrata; in search.fit_totali_,
+    search.fit_equivalenti_ e search.secondi_ ci sono il numero di fit,
+    i fit equivalenti con tutte le risorse e il tempo impiegato.
+    """
+    if modalita == "griglia":
+        search = GridSearchCV(
+            estimator=base_model,
+            param_grid=param_grid,
+            cv=cv,
+            scoring=scoring,
+            n_jobs=n_jobs,
+        )
+    elif modalita == "halving":
+        search = HalvingGridSearchCV(
+            estimator=base_model,
+            param_grid=param_grid,
+            cv=cv,
+            scoring=scoring,
+            factor=factor,
+            resource=risorsa,
+            max_resources=max_risorse,
+            min_resources=min_risorse,
+            random_state=42,
+            n_jobs=n_jobs,
+        )
+    else:
+        raise ValueError(f"Modalità di ricerca sconosciuta: {modalita} (usare 'griglia' o 'halving')")
+
+    inizio = time.perf_counter()
+    search.fit(X, y)
+    search.secondi_ = time.perf_counter() - inizio
+    search.fit_totali_, search.fit_equivalenti_ = conta_fit(search, X, y)
+
+    print(
+        f"[Ricerca {modalita}] Combinazioni: {len(ParameterGrid(param_grid))} | Fit: {search.fit_totali_} "
+        f"(equivalenti a {search.fit_equivalenti_:.1f} fit con tutte le risorse) | {search.secondi_:.2f} s"
+    )
+    if modalita == "halving":
+        for turno, (candidati, risorse) in enumerate(zip(search.n_candidates_, search.n_resources_)):
+            print(f"[Ricerca halving]   turno {turno}: {candidati} combinazioni con {risorsa} = {risorse}")
+
+    return search
+
+
+def confronta_ricerche(base_model, param_grid, X, y, cv, **opzioni):
+    """
+    Esegue halving ed esaustiva sulla stessa griglia e riporta
+    fit e tempo risparmiati. Restituisce (ricerca halving, ricerca esaustiva).
+    """
+    # Avvio dei processi del pool prima delle misure: altrimenti lo paga
+    # solo la prima ricerca
+    n_jobs = opzioni.get("n_jobs", -1)
+    Parallel(n_jobs=n_jobs)(delayed(abs)(i) for i in range(16))
+
+    halving = ricerca_iperparametri(base_model, param_grid, X, y, cv, modalita="halving", **opzioni)
+
+    opzioni_griglia = {k: v for k, v in opzioni.items() if k in ("scoring", "n_jobs")}
+    griglia = ricerca_iperparametri(base_model, param_grid, X, y, cv, modalita="griglia", **opzioni_griglia)
+
+    risparmio = 1 - halving.fit_equivalenti_ / griglia.fit_equivalenti_
+    tempo_risparmiato = griglia.secondi_ - halving.secondi_
+
+    print(
+        f"[Ricerca] Fit: halving {halving.fit_totali_} ({halving.fit_equivalenti_:.1f} equivalenti) | "
+        f"esaustiva {griglia.fit_totali_} | Lavoro risparmiato: {risparmio * 100:.0f}%"
+    )
+    print(f"[Ricerca] Tempo risparmiato: {tempo_risparmiato:.2f} s su {griglia.secondi_:.2f} s")
+    print(f"[Ricerca] Migliori parametri: halving {halving.best_params_} | esaustiva {griglia.best_params_}")
+
+    return halving, griglia
+
+
+if __name__ == "__main__":
+    from sklearn.datasets import load_diabetes
+    from sklearn.model_selection import KFold, train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.metrics import mean_squared_error
+    from sklearn.svm import SVR
+
+    X_demo, y_demo = load_diabetes(return_X_y=True)
+    X_train, X_test, y_train, y_test = train_test_split(X_demo, y_demo, test_size=0.2, random_state=42)
+    scaler = StandardScaler().fit(X_train)
+
+    griglia_svr = {"C": [0.1, 1, 10, 100], "gamma": ["scale", 0.01, 0.1, 1.0]}
+    ricerca_h, ricerca_g = confronta_ricerche(
+        SVR(), griglia_svr, scaler.transform(X_train), y_train, KFold(n_splits=5, shuffle=True, random_state=42)
+    )
+
+    for nome, ricerca in [("halving", ricerca_h), ("esaustiva", ricerca_g)]:
+        mse = mean_squared_error(y_test, ricerca.best_estimator_.predict(scaler.transform(X_test)))
+        print(f"MSE sul Test set ({nome}): {mse:.4f}")
@@ -0,0 +1,278 @@
+# ============================================
+# Rollup incrementali negozio × prodotto × giorno
+#
+# Ogni esecuzione di progetto_finale_analisi_di_vendite.py ricalcola
+# tutto dalle righe grezze, anche se a vendite.csv sono state aggiunte
+# solo le vendite di ieri.
+#
+# Qui viene mantenuto un archivio di aggregati (rollup):
+# - somma di Incasso e Quantità e numero di righe per (Data, Negozio, Prodotto)
+# - la Categoria viene ricavata dal prodotto (MAPPA_CATEGORIA)
+# - salvato in formato colonnare (Parquet), rollup_vendite.parquet
+# - aggiornato solo con le righe nuove: nei metadati del Parquet viene
+#   salvata la posizione (byte) fino a cui vendite.csv è già stato letto,
+#   con un'impronta (hash del primo e dell'ultimo KB già letti): se il file
+#   è stato riscritto invece che esteso, il rollup viene ricostruito.
+#   Gruppi e posizione stanno nello stesso file, quindi vengono sostituiti
+#   insieme da un solo os.replace: un'interruzione non fa contare due
+#   volte le stesse righe
+#
+# I report si ottengono dal rollup con kpi_da_rollup: il costo dipende
+# dal numero di gruppi e non dal numero di righe.
+# ============================================
+
+import io
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from kpi_vendite import MAPPA_CATEGORIA, KPIVendite
+
+
+CHIAVI_ROLLUP = ["Data", "Negozio", "Prodotto"]
+COLONNE_CSV = ["Data", "Negozio", "Prodotto", "Quantità", "Prezzo_unitario"]
+
+
+# =====================================================
+# CALCOLO E UNIONE DEI ROLLUP
+# =====================================================
+
+def calcola_rollup(df):
+    """
+    Aggrega un blocco di righe per (Data, Negozio, Prodotto).
+    """
+    df = df.assign(
+        Data=pd.to_datetime(df["Data"]),
+        Incasso=df["Quantità"] * df["Prezzo_unitario"],
+    )
+
+    rollup = (
+        df.groupby(CHIAVI_ROLLUP, observed=True)
+        .agg(
+            Incasso=("Incasso", "sum"),
+            Quantità=("Quantità", "sum"),
+            Righe=("Quantità", "size"),
+        )
+        .reset_index()
+    )
+    return aggiungi_livelli(rollup)
+
+
+def aggiungi_livelli(rollup):
+    """
+    Livello derivato: categoria del prodotto.
+    """
+    rollup["Negozio"] = rollup["Negozio"].astype(str)
+    rollup["Prodotto"] = rollup["Prodotto"].astype(str)
+    rollup["Categoria"] = rollup["Prodotto"].map(MAPPA_CATEGORIA).fillna("Altro")
+    return rollup
+
+
+def unisci_rollup(base, nuovo):
+    """
+    Somma due rollup gruppo per gruppo. Lavora sui gruppi, non sulle righe.
+    """
+    if base is None or base.empty:
+        return nuovo
+
+    unito = (
+        pd.concat([base, nuovo], ignore_index=True)
+        .groupby(CHIAVI_ROLLUP)
+        .agg(Incasso=("Incasso", "sum"), Quantità=("Quantità", "sum"), Righe=("Righe", "sum"))
+        .reset_index()
+    )
+    return aggiungi_livelli(unito)
+
+
+# =====================================================
+# ARCHIVIO SU DISCO
+# =====================================================
+
+# Chiave dei metadati Parquet con lo stato dell'aggiornamento
+CHIAVE_STATO = b"rollup_vendite.stato"
+
+
+def _path_stato(path_rollup):
+    # Archivi salvati prima che lo stato passasse nei metadati del Parquet
+    return os.path.splitext(path_rollup)[0] + ".json"
+
+
+def carica_rollup(path_rollup="rollup_vendite.parquet"):
+    """
+    Restituisce (rollup, stato). Se l'archivio non esiste, rollup è None.
+    """
+    stato = {"sorgente": None, "offset": 0, "righe": 0}
+
+    if not os.path.exists(path_rollup):
+        return None, stato
+
+    tabella = pq.read_table(path_rollup)
+    metadati = tabella.schema.metadata or {}
+
+    if CHIAVE_STATO in metadati:
+        stato = json.loads(metadati[CHIAVE_STATO])
+    elif os.path.exists(_path_stato(path_rollup)):
+        with open(_path_stato(path_rollup), "r", encoding="utf-8") as f:
+            stato = json.load(f)
+
+    return tabella.to_pandas(), stato
+
+
+def salva_rollup(rollup, stato, path_rollup="rollup_vendite.parquet"):
+    """
+    Gruppi e stato nello stesso file: lo stato va nei metadati del Parquet.
+    """
+    tabella = pa.Table.from_pandas(rollup, preserve_index=False)
+    metadati = {**(tabella.schema.metadata or {}), CHIAVE_STATO: json.dumps(stato).encode("utf-8")}
+
+    # Scrittura su file temporaneo e poi rename, per non lasciare file a metà
+    tmp = path_rollup + ".tmp"
+    pq.write_table(tabella.replace_schema_metadata(metadati), tmp)
+    os.replace(tmp, path_rollup)
+
+    # Lo stato nel vecchio file JSON non serve più
+    if os.path.exists(_path_stato(path_rollup)):
+        os.remove(_path_stato(path_rollup))
+
+
+# Byte letti all'inizio e alla fine della parte già consumata per l'impronta
+BYTE_IMPRONTA = 1024
+
+
+def impronta_prefisso(path, offset):
+    """
+    Hash dei primi e degli ultimi BYTE_IMPRONTA byte di path prima di offset.
+    Se cambia, il file non è stato solo esteso.
+    """
+    digest = hashlib.sha256(str(offset).encode("utf-8"))
+
+    with open(path, "rb") as f:
+        digest.update(f.read(min(offset, BYTE_IMPRONTA)))
+        inizio_coda = max(0, offset - BYTE_IMPRONTA)
+        f.seek(inizio_coda)
+        digest.update(f.read(offset - inizio_coda))
+
+    return digest.hexdigest()
+
+
+def aggiorna_rollup(nome_file="vendite.csv", path_rollup="rollup_vendite.parquet"):
+    """
+    Legge da nome_file solo le righe aggiunte dopo l'ultimo aggiornamento
+    e le somma al rollup salvato. Alla prima esecuzione legge tutto il file.
+    Se il file è stato riscritto (più corto, oppure con la parte già letta
+    diversa) il rollup viene ricostruito da zero.
+    """
+    rollup, stato = carica_rollup(path_rollup)
+    dimensione = os.path.getsize(nome_file)
+
+    riscritto = False
+    if stato["sorgente"] == os.path.abspath(nome_file) and stato["offset"] > 0:
+        # Gli stati salvati prima dell'impronta controllano solo la dimensione
+        precedente = stato.get("impronta")
+        riscritto = dimensione < stato["offset"] or (
+            precedente is not None and precedente != impronta_prefisso(nome_file, stato["offset"])
+        )
+        if riscritto:
+            print(f"[Rollup] {nome_file} è stato riscritto, non solo esteso: ricostruzione del rollup")
+
+    if stato["sorgente"] != os.path.abspath(nome_file) or riscritto:
+        # Sorgente diversa o riscritta: si riparte da zero
+        rollup = None
+        stato = {"sorgente": os.path.abspath(nome_file), "offset": 0, "righe": 0}
+
+    with open(nome_file, "rb") as f:
+        f.seek(stato["offset"])
+        nuovi_byte = f.read(dimensione - stato["offset"])
+
+    # Consideriamo solo righe complete: un'eventuale riga a metà
+    # verrà letta al prossimo aggiornamento
+    fine = nuovi_byte.rfind(b"\n") + 1
+    nuovi_byte = nuovi_byte[:fine]
+
+    if stato["offset"] == 0:
+        # Prima lettura: saltiamo l'intestazione
+        inizio_dati = nuovi_byte.find(b"\n") + 1
+    else:
+        inizio_dati = 0
+
+    dati = nuovi_byte[inizio_dati:]
+    num_nuove = 0
+
+    if dati.strip():
+        nuove_righe = pd.read_csv(io.BytesIO(dati), header=None, names=COLONNE_CSV)
+        num_nuove = len(nuove_righe)
+        rollup = unisci_rollup(rollup, calcola_rollup(nuove_righe))
+
+    stato["offset"] += fine
+    stato["righe"] += num_nuove
+    stato["impronta"] = impronta_prefisso(nome_file, stato["offset"])
+
+    if rollup is not None:
+        salva_rollup(rollup, stato, path_rollup)
+
+    print(f"[Rollup] Nuove righe lette: {num_nuove}")
+    print(f"[Rollup] Righe totali: {stato['righe']} | Gruppi nel rollup: {0 if rollup is None else len(rollup)}")
+
+    return rollup
+
+
+# =====================================================
+# REPORT DAL ROLLUP
+# =====================================================
+
+def kpi_da_rollup(rollup):
+    """
+    Ricostruisce il cubo KPIVendite dai gruppi del rollup, così tutte
+    le funzioni di report esistenti (incasso per negozio, andamento
+    giornaliero, top prodotti, categorie) funzionano senza le righe.
+    Fanno eccezione le statistiche per riga sulla Quantità (Parte 4),
+    che il rollup non conserva.
+    """
+    codici_negozio, negozi = pd.factorize(rollup["Negozio"], sort=True)
+    codici_prodotto, prodotti = pd.factorize(rollup["Prodotto"], sort=True)
+
+    date = pd.to_datetime(rollup["Data"]).to_numpy(dtype="datetime64[D]")
+    giorno_min = date.min()
+    codici_giorno = (date - giorno_min).astype(np.int64)
+    num_giorni = int(codici_giorno.max()) + 1
+
+    forma = (len(negozi), len(prodotti), num_giorni)
+    chiave = np.ravel_multi_index((codici_negozio, codici_prodotto, codici_giorno), forma)
+    celle = int(np.prod(forma))
+
+    def cubo(colonna):
+        return np.bincount(chiave, weights=rollup[colonna].to_numpy(dtype=np.float64), minlength=celle).reshape(forma)
+
+    return KPIVendite(
+        negozi,
+        prodotti,
+        pd.date_range(pd.Timestamp(giorno_min), periods=num_giorni, freq="D"),
+        cubo("Incasso"),
+        cubo("Quantità").astype(np.int64),
+        cubo("Righe").astype(np.int64),
+    )
+
+
+if __name__ == "__main__":
+    rollup_vendite = aggiorna_rollup("vendite.csv")
+
+    # vendite.csv con la sola intestazione: nessun gruppo da mostrare
+    if rollup_vendite is None:
+        print("\nNessuna vendita in vendite.csv: i report non hanno dati")
+
+    else:
+        kpi = kpi_da_rollup(rollup_vendite)
+
+        print("\nIncasso totale per negozio:")
+        print(kpi.incasso_per_negozio())
+
+        print("\nAndamento giornaliero incassi (prime righe):")
+        print(kpi.incasso_giornaliero().head())
+
+        print("\nTop 3 prodotti per incasso totale:")
+        print(kpi.top_prodotti(3))
@@ -0,0 +1,158 @@
+# ============================================
+# Caricamento tipizzato di ordini, prodotti e clienti
+#
+# In Progetto#2 — Analisi vendite realistica.py i tipi compatti
+# (int32/int16/int8/category) vengono applicati solo dopo i due merge:
+# il picco di memoria è il DataFrame unito con i tipi di default
+# (int64, float64, stringhe) più le copie fatte da astype.
+#
+# Qui lo schema di ogni file è dichiarato una volta sola e applicato
+# durante la lettura, poi l'arricchimento avviene con le tabelle di
+# lookup di arricchimento_ordini: nessun DataFrame "largo" viene creato.
+# Gli ordini vengono letti a blocchi, così anche la conversione delle
+# date da testo riguarda un blocco alla volta.
+#
+# report_memoria confronta i due percorsi: picco di memoria del processo
+# (RSS) e byte per colonna del DataFrame finale.
+# ============================================
+
+import resource
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from arricchimento_ordini import arricchisci
+
+
+# =====================================================
+# SCHEMI
+# =====================================================
+
+SCHEMA_ORDINI = {
+    "ClienteID": "int32",
+    "ProdottoID": "int16",
+    "Quantita": "int8",
+}
+DATE_ORDINI = ["DataOrdine"]
+
+SCHEMA_PRODOTTI = {
+    "ProdottoID": "int16",
+    "Categoria": "category",
+    "Fornitore": "category",
+    "Prezzo": "float32",
+}
+
+SCHEMA_CLIENTI = {
+    "ClienteID": "int32",
+    "Regione": "category",
+    "Segmento": "category",
+}
+
+
+# =====================================================
+# CARICAMENTO
+# =====================================================
+
+def carica_ordini(path="ordini.csv", righe_per_blocco=500_000):
+    """
+    Lettura a blocchi già tipizzati: il picco non è più la conversione
+    delle date come stringhe su tutto il file, ma un solo blocco.
+    """
+    blocchi = pd.read_csv(path, dtype=SCHEMA_ORDINI, parse_dates=DATE_ORDINI, chunksize=righe_per_blocco)
+    return pd.concat(blocchi, ignore_index=True)
+
+
+def carica_prodotti(path="prodotti.json"):
+    # read_json non accetta "category": le colonne di testo
+    # sono solo 20 righe, la conversione qui non costa nulla
+    prodotti = pd.read_json(path, dtype=False)
+    return prodotti.astype(SCHEMA_PRODOTTI)
+
+
+def carica_clienti(path="clienti.csv"):
+    return pd.read_csv(path, dtype=SCHEMA_CLIENTI)
+
+
+def carica_unificato(path_ordini="ordini.csv", path_prodotti="prodotti.json", path_clienti="clienti.csv"):
+    """
+    DataFrame unificato (ordini + prodotti + clienti) con i tipi
+    compatti già dalla lettura.
+    """
+    df = arricchisci(carica_ordini(path_ordini), carica_prodotti(path_prodotti), "ProdottoID")
+    return arricchisci(df, carica_clienti(path_clienti), "ClienteID")
+
+
+def carica_unificato_originale(path_ordini="ordini.csv", path_prodotti="prodotti.json", path_clienti="clienti.csv"):
+    """
+    Percorso di Progetto#2: lettura con i tipi di default,
+    due merge e ottimizzazione dei tipi alla fine.
+    """
+    df = pd.read_csv(path_ordini, parse_dates=DATE_ORDINI)
+    df = df.merge(pd.read_json(path_prodotti), on="ProdottoID", how="left")
+    df = df.merge(pd.read_csv(path_clienti), on="ClienteID", how="left")
+
+    df["ClienteID"] = df["ClienteID"].astype("int32")
+    df["ProdottoID"] = df["ProdottoID"].astype("int16")
+    df["Quantita"] = df["Quantita"].astype("int8")
+    df["Prezzo"] = df["Prezzo"].astype("float32")
+    for col in ["Categoria", "Fornitore", "Regione", "Segmento"]:
+        df[col] = df[col].astype("category")
+
+    return df
+
+
+# =====================================================
+# REPORT DI MEMORIA
+# =====================================================
+
+PERCORSI = {
+    "prima (merge + astype)": carica_unificato_originale,
+    "dopo (schema in lettura)": carica_unificato,
+}
+
+
+def _esegui_percorso(nome, *path):
+    # Eseguito in un processo nuovo: il picco RSS riguarda solo questo percorso
+    df = PERCORSI[nome](*path)
+    colonne = df.memory_usage(deep=True, index=False)
+
+    # ru_maxrss è in kilobyte su Linux
+    picco_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return picco_mb, colonne
+
+
+def report_memoria(path_ordini="ordini.csv", path_prodotti="prodotti.json", path_clienti="clienti.csv"):
+    """
+    Picco di memoria del processo e byte per colonna dei due percorsi.
+    Ogni percorso gira in un processo separato.
+    """
+    picchi = {}
+    colonne = {}
+
+    for nome in PERCORSI:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            picco, byte_colonne = executor.submit(
+                _esegui_percorso, nome, path_ordini, path_prodotti, path_clienti
+            ).result()
+
+        picchi[nome] = picco
+        colonne[nome] = byte_colonne
+
+    tabella = pd.DataFrame(colonne)
+    tabella.loc["TOTALE"] = tabella.sum()
+
+    print("\n[Memoria] Byte per colonna del DataFrame finale:")
+    print(tabella)
+
+    print("\n[Memoria] Picco RSS del processo:")
+    for nome, picco in picchi.items():
+        print(f"  {nome}: {picco:.1f} MB")
+
+    return tabella, picchi
+
+
+if __name__ == "__main__":
+    df_unificato = carica_unificato()
+    print(df_unificato.dtypes)
+
+    report_memoria()
@@ -0,0 +1,301 @@
+# ============================================
+# Synthetic Data Sandbox - VAE Edition
+# Generatore sintetico "seekable" e riproducibile
+#
+# Lo Step 6 del notebook genera tutte le righe in una volta con
+# torch.randn(num_synthetic_samples, latent_dim). Per leggere la pagina
+# 5000 bisognerebbe quindi generare tutte le righe precedenti.
+#
+# Qui i punti dello spazio latente sono generati a blocchi di dimensione
+# fissa con un generatore "counter-based" (Philox): il blocco b usa
+# sempre lo stesso contatore, quindi qualsiasi intervallo di righe può
+# essere prodotto direttamente a partire da (versione dataset, seed, offset).
+# Richieste uguali restituiscono pagine identiche byte per byte, quindi
+# si possono fare paginazione ad accesso casuale, generazione parallela
+# a frammenti (shard) e richieste HTTP per intervalli di righe.
+# ============================================
+
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+# Numero di righe generate per ogni blocco del contatore.
+# Cambiarlo cambia il dataset, per questo entra nella versione.
+BLOCK_SIZE = 1024
+
+# Colonne che nel dataset originale sono intere (come nello Step 6)
+INTEGER_COLUMNS = ["Pregnancies", "Age", "Outcome"]
+
+
+# -------------------------------------------------
+# Modello VAE (stessa architettura dello Step 4)
+# -------------------------------------------------
+
+class TabularVAE(nn.Module):
+    def __init__(self, input_dim, hidden_dim=64, latent_dim=4):
+        super(TabularVAE, self).__init__()
+
+        # Encoder
+        self.encoder_fc1 = nn.Linear(input_dim, hidden_dim)
+        self.encoder_fc2 = nn.Linear(hidden_dim, 32)
+
+        # Lo spazio latente viene descritto da media e log-varianza
+        self.fc_mu = nn.Linear(32, latent_dim)
+        self.fc_logvar = nn.Linear(32, latent_dim)
+
+        # Decoder
+        self.decoder_fc1 = nn.Linear(latent_dim, 32)
+        self.decoder_fc2 = nn.Linear(32, hidden_dim)
+        self.decoder_output = nn.Linear(hidden_dim, input_dim)
+
+    def encode(self, x):
+        x = F.relu(self.encoder_fc1(x))
+        x = F.relu(self.encoder_fc2(x))
+
+        mu = self.fc_mu(x)
+        logvar = self.fc_logvar(x)
+
+        return mu, logvar
+
+    def reparameterize(self, mu, logvar):
+        # Reparameterization Trick
+        std = torch.exp(0.5 * logvar)
+        epsilon = torch.randn_like(std)
+
+        z = mu + epsilon * std
+
+        return z
+
+    def decode(self, z):
+        z = F.relu(self.decoder_fc1(z))
+        z = F.relu(self.decoder_fc2(z))
+
+        # Sigmoid perché i dati sono normalizzati tra 0 e 1
+        reconstructed = torch.sigmoid(self.decoder_output(z))
+
+        return reconstructed
+
+    def forward(self, x):
+        mu, logvar = self.encode(x)
+        z = self.reparameterize(mu, logvar)
+        reconstructed = self.decode(z)
+
+        return reconstructed, mu, logvar
+
+
+# -------------------------------------------------
+# Generatore seekable
+# -------------------------------------------------
+
+class SeekableGenerator:
+    """
+    Genera righe sintetiche ad accesso casuale.
+
+    La riga i dipende solo da (versione, seed, i): il blocco i // BLOCK_SIZE
+    viene sempre generato e decodificato per intero con lo stesso contatore,
+    poi viene tagliata la parte richiesta.
+    """
+
+    def __init__(self, model, data_min, data_max, columns, latent_dim, version):
+        self.model = model.eval()
+        self.data_min = np.asarray(data_min, dtype=np.float64)
+        self.data_max = np.asarray(data_max, dtype=np.float64)
+        self.columns = list(columns)
+        self.latent_dim = latent_dim
+        self.version = version
+
+    def _chiave(self, seed):
+        # Chiave Philox a 128 bit ricavata da versione e seed
+        digest = hashlib.sha256(f"{self.version}:{seed}".encode("utf-8")).digest()
+        return np.frombuffer(digest[:16], dtype=np.uint64).copy()
+
+    def latent_block(self, seed, block):
+        """
+        Punti latenti del blocco indicato. La parola alta del contatore
+        Philox è il numero del blocco, quindi i blocchi non si sovrappongono.
+        """
+        bit_generator = np.random.Philox(
+            key=self._chiave(seed),
+            counter=np.array([0, 0, block, 0], dtype=np.uint64)
+        )
+        rng = np.random.Generator(bit_generator)
+
+        return rng.standard_normal((BLOCK_SIZE, self.latent_dim), dtype=np.float32)
+
+    def _decodifica_blocco(self, seed, block):
+        z = torch.from_numpy(self.latent_block(seed, block))
+
+        with torch.no_grad():
+            synthetic_scaled = self.model.decode(z).cpu().numpy()
+
+        return synthetic_scaled
+
+    def rows(self, seed, offset, limit):
+        """
+        Restituisce le righe [offset, offset + limit) come DataFrame,
+        con gli stessi passaggi di post-processing dello Step 6.
+        """
+        if offset < 0 or limit < 0:
+            raise ValueError("offset e limit devono essere non negativi")
+
+        primo_blocco = offset // BLOCK_SIZE
+        ultimo_blocco = (offset + limit - 1) // BLOCK_SIZE if limit > 0 else primo_blocco - 1
+
+        blocchi = [
+            self._decodifica_blocco(seed, b)
+            for b in range(primo_blocco, ultimo_blocco + 1)
+        ]
+
+        if blocchi:
+            inizio = offset - primo_blocco * BLOCK_SIZE
+            synthetic_scaled = np.concatenate(blocchi)[inizio:inizio + limit]
+        else:
+            synthetic_scaled = np.empty((0, len(self.columns)), dtype=np.float32)
+
+        return self._post_processing(synthetic_scaled)
+
+    def _post_processing(self, synthetic_scaled):
+        # Sicurezza: limitiamo i valori tra 0 e 1
+        synthetic_scaled = np.clip(synthetic_scaled.astype(np.float64), 0, 1)
+
+        # Stessa formula di MinMaxScaler.inverse_transform
+        synthetic_original_scale = synthetic_scaled * (self.data_max - self.data_min) + self.data_min
+
+        df_synthetic = pd.DataFrame(synthetic_original_scale, columns=self.columns)
+
+        for col in INTEGER_COLUMNS:
+            if col in df_synthetic.columns:
+                df_synthetic[col] = df_synthetic[col].round().astype(int)
+
+        if "Outcome" in df_synthetic.columns:
+            df_synthetic["Outcome"] = df_synthetic["Outcome"].clip(0, 1)
+
+        for col in df_synthetic.columns:
+            df_synthetic[col] = df_synthetic[col].clip(lower=0)
+
+        return df_synthetic
+
+    def page_csv(self, seed, offset, limit, header=True):
+        """
+        Pagina in formato CSV. Il formato dei numeri è fisso,
+        così due richieste uguali producono gli stessi byte.
+        """
+        df_page = self.rows(seed, offset, limit)
+        return df_page.to_csv(index=False, header=header, float_format="%.6f")
+
+    def etag(self, seed, offset, limit):
+        chiave = f"{self.version}:{seed}:{offset}:{limit}"
+        return hashlib.sha256(chiave.encode("utf-8")).hexdigest()[:32]
+
+
+def dataset_version(model_path="vae_model.pth", real_path="real_clean_data.csv", latent_dim=4):
+    """
+    Versione del dataset: hash del modello, dei parametri di scala
+    (colonne, min e max di real_clean_data.csv) e della dimensione dei blocchi.
+    Se cambia uno di questi cambiano i byte generati, quindi anche versione ed ETag.
+    """
+    digest = hashlib.sha256()
+
+    with open(model_path, "rb") as f:
+        for pezzo in iter(lambda: f.read(1 << 20), b""):
+            digest.update(pezzo)
+
+    real_data = pd.read_csv(real_path)
+    digest.update(",".join(real_data.columns).encode("utf-8"))
+    digest.update(real_data.min().to_numpy(dtype=np.float64).tobytes())
+    digest.update(real_data.max().to_numpy(dtype=np.float64).tobytes())
+    digest.update(f"{latent_dim}:{BLOCK_SIZE}".encode("utf-8"))
+
+    return digest.hexdigest()[:16]
+
+
+def carica_generatore(model_path="vae_model.pth", real_path="real_clean_data.csv", latent_dim=4):
+    """
+    Ricostruisce modello e scaler a partire dai file salvati dal notebook.
+    MinMaxScaler era addestrato su df_clean, quindi min e max di
+    real_clean_data.csv sono esattamente i suoi parametri.
+    """
+    real_data = pd.read_csv(real_path)
+
+    model = TabularVAE(input_dim=real_data.shape[1], hidden_dim=64, latent_dim=latent_dim)
+    model.load_state_dict(torch.load(model_path, map_location="cpu"))
+
+    return SeekableGenerator(
+        model=model,
+        data_min=real_data.min().values,
+        data_max=real_data.max().values,
+        columns=real_data.columns,
+        latent_dim=latent_dim,
+        version=dataset_version(model_path, real_path, latent_dim)
+    )
+
+
+# -------------------------------------------------
+# Generazione parallela a frammenti
+# -------------------------------------------------
+
+def _scrivi_shard(model_path, real_path, seed, offset, limit, out_path):
+    generator = carica_generatore(model_path, real_path)
+
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+        # Scriviamo blocco per blocco per tenere la memoria costante
+        for start in range(offset, offset + limit, BLOCK_SIZE * 16):
+            stop = min(start + BLOCK_SIZE * 16, offset + limit)
+            f.write(generator.page_csv(seed, start, stop - start, header=(start == offset)))
+
+    return out_path
+
+
+def genera_parallelo(
+    num_rows,
+    num_shards=4,
+    seed=42,
+    output_dir="synthetic_shards",
+    model_path="vae_model.pth",
+    real_path="real_clean_data.csv",
+    n_workers=None
+):
+    """
+    Divide le righe [0, num_rows) in frammenti contigui e li genera
+    su un pool di processi. La concatenazione dei frammenti è identica
+    al dataset generato in un solo processo.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    righe_per_shard = -(-num_rows // num_shards)
+    paths = []
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = []
+
+        for shard in range(num_shards):
+            offset = shard * righe_per_shard
+            limit = min(righe_per_shard, num_rows - offset)
+
+            if limit <= 0:
+                break
+
+            out_path = os.path.join(output_dir, f"synthetic_part_{shard:05d}.csv")
+            futures.append(
+                executor.submit(_scrivi_shard, model_path, real_path, seed, offset, limit, out_path)
+            )
+
+        for future in futures:
+            paths.append(future.result())
+
+    print(f"Generati {num_rows} record sintetici in {len(paths)} file in: {output_dir}")
+    return paths
+
+
+if __name__ == "__main__":
+    generator = carica_generatore()
+
+    print("Versione dataset:", generator.version)
+    print(generator.rows(seed=42, offset=0, limit=5))
@@ -0,0 +1,603 @@
+# ============================================
+# Aggregazione in streaming a finestre, con checkpoint
+#
+# NewFileHandler (progetto_finale_modulo2.py) legge ogni nuovo .jsonl nel
+# thread di watchdog con json.loads riga per riga, reagisce solo a
+# on_created (il file può essere ancora a metà) e tiene un Counter in
+# memoria che si perde a ogni riavvio.
+#
+# Qui:
+# - gli eventi sui file finiscono in una coda limitata: se i parser sono
+#   indietro, chi notifica resta in attesa (backpressure) invece di
+#   accumulare lavoro in memoria
+# - i parser leggono di ogni file solo le righe complete dopo l'ultima
+#   posizione letta (offset in byte): un file scritto a metà viene letto
+#   a pezzi, man mano che cresce
+# - conteggio e somma di amount per (regione, categoria) su finestre
+#   tumbling (fisse) e sliding (sovrapposte), per tempo dell'evento
+#   (campo "timestamp" oppure data di modifica del file)
+# - una finestra si chiude quando il watermark (tempo massimo visto meno
+#   il ritardo ammesso) supera la sua fine; i record più vecchi del
+#   watermark restano fuori dalle finestre come "in ritardo", ma entrano
+#   nel conteggio totale per region_id (totali_per_regione)
+# - checkpoint periodico: offset dei file, finestre aperte e lunghezza del
+#   file di output sono salvati insieme. Al riavvio l'output viene troncato
+#   alla lunghezza salvata e la lettura riprende dagli offset: ogni record
+#   entra nei risultati esattamente una volta
+# - metriche: eventi al secondo e ritardo tra arrivo del file e
+#   aggiornamento degli aggregati (lag)
+# ============================================
+
+import os
+import json
+import math
+import time
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+TIPI_FINESTRA = ("tumbling", "sliding")
+
+
+# =====================================================
+# FINESTRE
+# =====================================================
+
+class AggregatoFinestre:
+    """
+    Conteggio e somma di amount per (inizio finestra, regione, categoria).
+    Con passo == durata le finestre sono tumbling, con passo < durata
+    sliding (ogni evento cade in durata / passo finestre).
+    """
+
+    def __init__(self, durata, passo=None):
+        passo = passo or durata
+        if durata % passo:
+            raise ValueError("La durata della finestra deve essere un multiplo del passo")
+
+        self.durata = durata
+        self.passo = passo
+        self.finestre = {}
+
+    def aggiorna(self, tempi, regioni, categorie, importi):
+        """
+        Aggiunge un blocco di eventi (array della stessa lunghezza).
+        Il blocco viene prima aggregato per chiave, quindi il dizionario
+        viene toccato una volta per gruppo e non per evento.
+        """
+        if len(tempi) == 0:
+            return
+
+        primo_inizio = np.floor(np.asarray(tempi, dtype=np.float64) / self.passo) * self.passo
+        pezzi = []
+
+        for k in range(self.durata // self.passo):
+            pezzi.append(pd.DataFrame({
+                "inizio": primo_inizio - k * self.passo,
+                "regione": regioni,
+                "categoria": categorie,
+                "amount": importi,
+            }))
+
+        gruppi = pd.concat(pezzi, ignore_index=True).groupby(["inizio", "regione", "categoria"], sort=False)["amount"]
+        aggregati = gruppi.agg(["count", "sum"])
+
+        for (inizio, regione, categoria), (conteggio, somma) in zip(aggregati.index, aggregati.to_numpy()):
+            attuale = self.finestre.setdefault((float(inizio), regione, categoria), [0, 0.0])
+            attuale[0] += int(conteggio)
+            attuale[1] += float(somma)
+
+    def chiudi(self, watermark):
+        """
+        Toglie e restituisce (ordinate) le finestre finite prima del watermark.
+        """
+        chiuse = sorted(k for k in self.finestre if k[0] + self.durata <= watermark)
+        risultati = []
+
+        for chiave in chiuse:
+            conteggio, somma = self.finestre.pop(chiave)
+            inizio, regione, categoria = chiave
+            risultati.append({
+                "inizio": inizio,
+                "fine": inizio + self.durata,
+                "region_id": regione,
+                "category": categoria,
+                "conteggio": conteggio,
+                "somma_amount": somma,
+            })
+
+        return risultati
+
+    def stato(self):
+        return {
+            "durata": self.durata,
+            "passo": self.passo,
+            "finestre": [[*chiave, *valori] for chiave, valori in self.finestre.items()],
+        }
+
+    @classmethod
+    def da_stato(cls, stato):
+        aggregato = cls(stato["durata"], stato["passo"])
+        aggregato.finestre = {(i, r, c): [n, s] for i, r, c, n, s in stato["finestre"]}
+        return aggregato
+
+
+# =====================================================
+# LETTURA INCREMENTALE DI UN FILE
+# =====================================================
+
+def _tempi_evento(grezzi, tempo_file):
+    """
+    Tempo dell'evento in secondi: epoch numerico o data ISO.
+    I record senza tempo ricevono la data di modifica del file.
+    """
+    tempi = pd.Series(grezzi, dtype=object)
+    numerici = pd.to_numeric(tempi, errors="coerce")
+
+    testi = tempi[numerici.isna() & tempi.notna()]
+    if len(testi):
+        date = pd.to_datetime(testi, errors="coerce", utc=True)
+        numerici[testi.index] = (date - pd.Timestamp(0, tz="UTC")).dt.total_seconds()
+
+    return numerici.fillna(tempo_file).to_numpy(dtype=np.float64)
+
+
+def leggi_righe_nuove(path, offset, categorie_prodotto=None):
+    """
+    Legge le righe complete di path dopo offset.
+    Restituisce (eventi, nuovo offset, righe scartate, tempo di arrivo),
+    con eventi = (tempi, regioni, categorie, importi) oppure None.
+    """
+    info = os.stat(path)
+    if info.st_size < offset:
+        raise ValueError(f"{path} è più corto dell'ultima posizione letta: il file non è stato solo esteso")
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        nuovi_byte = f.read(info.st_size - offset)
+
+    # Solo righe complete: una riga a metà verrà letta al prossimo evento
+    fine = nuovi_byte.rfind(b"\n") + 1
+    tempi, regioni, categorie, importi = [], [], [], []
+    scartate = 0
+
+    for riga in nuovi_byte[:fine].splitlines():
+        if not riga.strip():
+            continue
+        try:
+            record = json.loads(riga)
+            importo = float(record["amount"])
+        except (ValueError, KeyError, TypeError):
+            scartate += 1
+            continue
+
+        categoria = record.get("category")
+        if categoria is None and categorie_prodotto is not None:
+            categoria = categorie_prodotto.get(record.get("product_id"))
+
+        tempi.append(record.get("timestamp"))
+        regioni.append(str(record.get("region_id")))
+        categorie.append(str(categoria))
+        importi.append(importo)
+
+    eventi = None
+    if importi:
+        eventi = (
+            _tempi_evento(tempi, info.st_mtime),
+            np.array(regioni, dtype=object),
+            np.array(categorie, dtype=object),
+            np.array(importi, dtype=np.float64),
+        )
+
+    return eventi, offset + fine, scartate, info.st_mtime
+
+
+def carica_categorie(path_prodotti):
+    """
+    product_id -> category da products.parquet, per i record senza "category".
+    """
+    prodotti = pd.read_parquet(path_prodotti, columns=["product_id", "category"])
+    return dict(zip(prodotti["product_id"].tolist(), prodotti["category"].tolist()))
+
+
+# =====================================================
+# PIPELINE
+# =====================================================
+
+class StreamingFinestre:
+    """
+    Coda limitata di file da leggere, parser in thread separati,
+    finestre tumbling e sliding, checkpoint periodico.
+    """
+
+    def __init__(
+        self,
+        cartella,
+        path_checkpoint="streaming_checkpoint.json",
+        path_output="finestre_chiuse.jsonl",
+        durata_tumbling=60,
+        durata_sliding=300,
+        passo_sliding=60,
+        ritardo_massimo=30,
+        n_parser=2,
+        dimensione_coda=64,
+        intervallo_checkpoint=5.0,
+        categorie_prodotto=None,
+    ):
+        self.cartella = cartella
+        self.path_checkpoint = path_checkpoint
+        self.path_output = path_output
+        self.ritardo_massimo = ritardo_massimo
+        self.n_parser = n_parser
+        self.intervallo_checkpoint = intervallo_checkpoint
+        self.categorie_prodotto = categorie_prodotto
+
+        self.finestre = {
+            "tumbling": AggregatoFinestre(durata_tumbling),
+            "sliding": AggregatoFinestre(durata_sliding, passo_sliding),
+        }
+        self.offset = {}
+        self.tempo_massimo = -math.inf
+        self.contatori = {"eventi": 0, "scartati": 0, "in_ritardo": 0, "finestre_emesse": 0}
+        # Tutti i record letti per region_id, anche quelli in ritardo
+        self.regioni = {}
+        self.lunghezza_output = 0
+
+        self.coda = queue.Queue(maxsize=dimensione_coda)
+        self._lock = threading.Lock()
+        self._lock_checkpoint = threading.Lock()
+        self._pendenti = set()
+        self._da_rileggere = set()
+        self._da_emettere = []
+        self._thread = []
+        self._stop = threading.Event()
+
+        self._metriche = {"inizio": time.time(), "eventi": 0, "lag_somma": 0.0, "lag_massimo": 0.0, "attese_coda": 0}
+
+    # -------------------------------------------------
+    # Checkpoint
+    # -------------------------------------------------
+
+    def _carica_checkpoint(self):
+        if not os.path.exists(self.path_checkpoint):
+            # Nessun checkpoint: l'output di esecuzioni precedenti non vale più
+            open(self.path_output, "wb").close()
+            return
+
+        with open(self.path_checkpoint, "r", encoding="utf-8") as f:
+            stato = json.load(f)
+
+        self.offset = stato["offset"]
+        self.tempo_massimo = stato["tempo_massimo"]
+        self.contatori = stato["contatori"]
+        self.regioni = stato.get("regioni", {})
+        self.lunghezza_output = stato["lunghezza_output"]
+        self.finestre = {tipo: AggregatoFinestre.da_stato(stato["finestre"][tipo]) for tipo in TIPI_FINESTRA}
+
+        # Finestre scritte dopo l'ultimo checkpoint: verranno emesse di nuovo
+        with open(self.path_output, "ab") as f:
+            f.truncate(self.lunghezza_output)
+
+    def checkpoint(self):
+        """
+        Scrive le finestre chiuse nel file di output e poi, in modo atomico,
+        lo stato (offset, finestre aperte, lunghezza dell'output).
+        """
+        with self._lock_checkpoint:
+            with self._lock:
+                da_emettere, self._da_emettere = self._da_emettere, []
+                stato = {
+                    "offset": dict(self.offset),
+                    "tempo_massimo": self.tempo_massimo,
+                    "contatori": dict(self.contatori),
+                    "regioni": dict(self.regioni),
+                    "finestre": {tipo: self.finestre[tipo].stato() for tipo in TIPI_FINESTRA},
+                }
+
+            with open(self.path_output, "ab") as f:
+                for riga in da_emettere:
+                    f.write((json.dumps(riga) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                self.lunghezza_output = f.tell()
+
+            stato["lunghezza_output"] = self.lunghezza_output
+
+            # Scrittura su file temporaneo e poi rename, per non lasciare file a metà
+            tmp = self.path_checkpoint + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(stato, f)
+            os.replace(tmp, self.path_checkpoint)
+
+    # -------------------------------------------------
+    # Eventi sui file
+    # -------------------------------------------------
+
+    def notifica(self, path):
+        """
+        Segnala che path è nuovo o cresciuto. Un file già in coda o in
+        lettura non viene accodato di nuovo: viene riletto dallo stesso
+        parser appena finisce. Con la coda piena la chiamata attende.
+        """
+        if not str(path).endswith(".jsonl"):
+            return
+
+        # Solo file direttamente nella cartella (non l'archivio della compattazione)
+        path = os.path.abspath(path)
+        if os.path.dirname(path) != os.path.abspath(self.cartella):
+            return
+
+        with self._lock:
+            if path in self._pendenti:
+                self._da_rileggere.add(path)
+                return
+            self._pendenti.add(path)
+
+        if self.coda.full():
+            self._metriche["attese_coda"] += 1
+        self.coda.put(path)
+
+    def scansiona(self):
+        """
+        Accoda i file della cartella con byte non ancora letti
+        (all'avvio e come controllo periodico se un evento va perso).
+        """
+        for nome in sorted(os.listdir(self.cartella)):
+            path = os.path.abspath(os.path.join(self.cartella, nome))
+            if nome.endswith(".jsonl") and os.path.getsize(path) > self.offset.get(path, 0):
+                self.notifica(path)
+
+    # -------------------------------------------------
+    # Parser
+    # -------------------------------------------------
+
+    def _parser(self):
+        while True:
+            path = self.coda.get()
+            if path is None:
+                return
+
+            while True:
+                try:
+                    self._elabora_file(path)
+                except (OSError, ValueError) as errore:
+                    print(f"[Streaming] File saltato: {errore}")
+
+                with self._lock:
+                    if path not in self._da_rileggere:
+                        self._pendenti.discard(path)
+                        break
+                    self._da_rileggere.discard(path)
+
+    def _elabora_file(self, path):
+        # Un file è letto da un solo parser alla volta (vedi notifica)
+        with self._lock:
+            offset = self.offset.get(path, 0)
+
+        eventi, nuovo_offset, scartate, arrivo = leggi_righe_nuove(path, offset, self.categorie_prodotto)
+        if nuovo_offset == offset:
+            return
+
+        # Aggregati e offset cambiano insieme: il checkpoint li vede coerenti
+        with self._lock:
+            self.contatori["scartati"] += scartate
+
+            if eventi is not None:
+                tempi = eventi[0]
+                regioni, conteggi = np.unique(eventi[1], return_counts=True)
+                for regione, conteggio in zip(regioni, conteggi):
+                    self.regioni[regione] = self.regioni.get(regione, 0) + int(conteggio)
+
+                in_tempo = tempi >= self.tempo_massimo - self.ritardo_massimo
+                self.contatori["in_ritardo"] += int((~in_tempo).sum())
+                self.contatori["eventi"] += int(in_tempo.sum())
+
+                if in_tempo.any():
+                    selezionati = [colonna[in_tempo] for colonna in eventi]
+                    for aggregato in self.finestre.values():
+                        aggregato.aggiorna(*selezionati)
+                    self.tempo_massimo = max(self.tempo_massimo, float(tempi.max()))
+
+                watermark = self.tempo_massimo - self.ritardo_massimo
+                for tipo, aggregato in self.finestre.items():
+                    for risultato in aggregato.chiudi(watermark):
+                        self._da_emettere.append({"finestra": tipo, **risultato})
+                        self.contatori["finestre_emesse"] += 1
+
+                lag = max(0.0, time.time() - arrivo)
+                self._metriche["eventi"] += len(tempi)
+                self._metriche["lag_somma"] += lag * len(tempi)
+                self._metriche["lag_massimo"] = max(self._metriche["lag_massimo"], lag)
+
+            self.offset[path] = nuovo_offset
+
+    # -------------------------------------------------
+    # Avvio e arresto
+    # -------------------------------------------------
+
+    def _checkpoint_periodico(self):
+        while not self._stop.wait(self.intervallo_checkpoint):
+            self.checkpoint()
+
+    def avvia(self):
+        os.makedirs(self.cartella, exist_ok=True)
+        self._carica_checkpoint()
+
+        for _ in range(self.n_parser):
+            self._thread.append(threading.Thread(target=self._parser, daemon=True))
+        self._thread.append(threading.Thread(target=self._checkpoint_periodico, daemon=True))
+        for t in self._thread:
+            t.start()
+
+        # File arrivati mentre il processo era fermo
+        self.scansiona()
+
+    def ferma(self):
+        """
+        Svuota la coda, ferma i thread e salva l'ultimo checkpoint.
+        """
+        for _ in range(self.n_parser):
+            self.coda.put(None)
+        self._stop.set()
+        for t in self._thread:
+            t.join()
+        self._thread = []
+        self.checkpoint()
+
+    def chiudi_tutte(self):
+        """
+        Chiude anche le finestre ancora aperte (fine del flusso).
+        """
+        with self._lock:
+            for tipo, aggregato in self.finestre.items():
+                for risultato in aggregato.chiudi(math.inf):
+                    self._da_emettere.append({"finestra": tipo, **risultato})
+                    self.contatori["finestre_emesse"] += 1
+        self.checkpoint()
+
+    # -------------------------------------------------
+    # Metriche e risultati
+    # -------------------------------------------------
+
+    def metriche(self):
+        with self._lock:
+            secondi = max(time.time() - self._metriche["inizio"], 1e-9)
+            eventi = self._metriche["eventi"]
+            return {
+                "eventi_al_s": eventi / secondi,
+                "lag_medio_s": self._metriche["lag_somma"] / eventi if eventi else 0.0,
+                "lag_massimo_s": self._metriche["lag_massimo"],
+                "file_in_coda": self.coda.qsize(),
+                "attese_coda": self._metriche["attese_coda"],
+                **self.contatori,
+            }
+
+    def stampa_metriche(self):
+        m = self.metriche()
+        print(
+            f"[Streaming] {m['eventi']} eventi | {m['eventi_al_s']:.0f} eventi/s | "
+            f"lag medio {m['lag_medio_s']:.2f} s (max {m['lag_massimo_s']:.2f} s) | "
+            f"in coda {m['file_in_coda']} | in ritardo {m['in_ritardo']} | scartati {m['scartati']} | "
+            f"finestre emesse {m['finestre_emesse']}"
+        )
+
+    def totali_per_regione(self):
+        """
+        Conteggio per region_id di tutti i record letti, compresi quelli
+        in ritardo rispetto al watermark (lo stesso dato del Counter di
+        NewFileHandler). Fa parte del checkpoint, come gli offset.
+        """
+        with self._lock:
+            return dict(sorted(self.regioni.items()))
+
+    def totali_per_regione_in_finestre(self):
+        """
+        Conteggio per region_id dei soli record entrati nelle finestre:
+        tumbling già emesse più quelle aperte.
+        """
+        totali = {}
+        if os.path.exists(self.path_output):
+            emesse = pd.read_json(self.path_output, lines=True, dtype={"region_id": str})
+            if len(emesse):
+                emesse = emesse[emesse["finestra"] == "tumbling"]
+                totali = emesse.groupby("region_id")["conteggio"].sum().to_dict()
+
+        with self._lock:
+            aperte = list(self.finestre["tumbling"].finestre.items()) + [
+                ((r["inizio"], r["region_id"], r["category"]), [r["conteggio"], r["somma_amount"]])
+                for r in self._da_emettere if r["finestra"] == "tumbling"
+            ]
+
+        for (_, regione, _), (conteggio, _) in aperte:
+            totali[regione] = totali.get(regione, 0) + conteggio
+
+        return dict(sorted(totali.items()))
+
+
+def monitora(stream, intervallo_scansione=1.0, intervallo_metriche=10.0, durata=None):
+    """
+    Sorveglianza senza watchdog: scansione periodica della cartella.
+    Ctrl+C (o la durata in secondi) per fermare.
+    """
+    stream.avvia()
+    inizio = ultimo_report = time.time()
+
+    try:
+        while durata is None or time.time() - inizio < durata:
+            time.sleep(intervallo_scansione)
+            stream.scansiona()
+            if time.time() - ultimo_report >= intervallo_metriche:
+                stream.stampa_metriche()
+                ultimo_report = time.time()
+    except KeyboardInterrupt:
+        pass
+
+    stream.ferma()
+    stream.stampa_metriche()
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    cartella = tempfile.mkdtemp()
+    checkpoint = os.path.join(cartella, "checkpoint.json")
+    output = os.path.join(cartella, "finestre.jsonl")
+    arrivi = os.path.join(cartella, "json")
+    os.makedirs(arrivi)
+
+    rng = np.random.default_rng(0)
+    n = 20_000
+    eventi = pd.DataFrame({
+        "transaction_id": np.arange(n),
+        "timestamp": 1_700_000_000 + np.sort(rng.uniform(0, 3_600, n)),
+        "amount": rng.uniform(1, 100, n).round(2),
+        "region_id": rng.integers(1, 6, n),
+        "category": rng.choice(["Casa", "Tech", "Sport"], n),
+    })
+    righe = [r + "\n" for r in eventi.to_json(orient="records", lines=True).splitlines()]
+
+    def opzioni():
+        return dict(
+            path_checkpoint=checkpoint, path_output=output, ritardo_massimo=600,
+            intervallo_checkpoint=0.2, n_parser=2, dimensione_coda=4,
+        )
+
+    # Prima esecuzione: 10 file, l'ultimo lasciato a metà riga
+    stream = StreamingFinestre(arrivi, **opzioni())
+    stream.avvia()
+    for i, blocco in enumerate(np.array_split(np.arange(n // 2), 10)):
+        testo = "".join(righe[j] for j in blocco)
+        if i == 9:
+            testo = testo[:-20]
+        with open(os.path.join(arrivi, f"batch_{i:03d}.jsonl"), "w", encoding="utf-8") as f:
+            f.write(testo)
+        stream.notifica(os.path.join(arrivi, f"batch_{i:03d}.jsonl"))
+    stream.ferma()
+    stream.stampa_metriche()
+
+    # Il file a metà viene completato e arrivano altri file: nuovo processo
+    with open(os.path.join(arrivi, "batch_009.jsonl"), "a", encoding="utf-8") as f:
+        f.write(righe[n // 2 - 1][-20:])
+    for i, blocco in enumerate(np.array_split(np.arange(n // 2, n), 10), start=10):
+        with open(os.path.join(arrivi, f"batch_{i:03d}.jsonl"), "w", encoding="utf-8") as f:
+            f.write("".join(righe[j] for j in blocco))
+
+    stream = StreamingFinestre(arrivi, **opzioni())
+    monitora(stream, intervallo_scansione=0.1, durata=1.0)
+    stream.chiudi_tutte()
+
+    # Controllo: ogni evento contato una volta sola
+    risultati = pd.read_json(output, lines=True)
+    tumbling = risultati[risultati["finestra"] == "tumbling"]
+    sliding = risultati[risultati["finestra"] == "sliding"]
+    print("\nEventi nelle finestre tumbling:", tumbling["conteggio"].sum(), "su", n)
+    print("Somma amount corretta:", np.isclose(tumbling["somma_amount"].sum(), eventi["amount"].sum()))
+    print("Ogni evento in 5 finestre sliding:", sliding["conteggio"].sum() == 5 * n)
+    print("Conteggio per region_id:", stream.totali_per_regione())
+    print("Tutti i record nei totali per region_id:", sum(stream.totali_per_regione().values()) == n)
+
+    shutil.rmtree(cartella)
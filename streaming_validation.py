@@ -0,0 +1,486 @@
+# ============================================
+# Synthetic Data Sandbox - VAE Edition
+# Validazione in streaming (Step 7 a memoria costante)
+#
+# Lo Step 7 del notebook carica df_clean e df_synthetic per intero
+# e usa describe() e corr(). Qui gli stessi risultati vengono calcolati
+# leggendo i file CSV a blocchi (chunk) e accumulando statistiche
+# "unibili" (mergeable): ogni accumulatore può essere combinato con un
+# altro calcolato su un altro blocco o in un altro processo.
+#
+# Statistiche accumulate per ogni file:
+# - momenti di Welford (count, media, M2, min, max) per colonna
+# - matrice dei co-momenti per la correlazione
+# - sketch dei quantili (centroidi compressi)
+# - istogrammi con larghezza dei bin che si adatta raddoppiando
+#
+# Output (stessi nomi dello Step 7):
+# - statistics_comparison.csv
+# - real_correlation_matrix.csv
+# - synthetic_correlation_matrix.csv
+# - correlation_difference_matrix.csv
+# più quantile_comparison.csv con i quantili approssimati
+# ============================================
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------------------------
+# Momenti di Welford
+# -------------------------------------------------
+
+class MomentiWelford:
+    """
+    Media, varianza, minimo e massimo per colonna.
+    I blocchi vengono combinati con la formula parallela di Chan,
+    quindi il risultato non dipende da come è stato diviso il file.
+    """
+
+    def __init__(self, num_colonne):
+        self.count = np.zeros(num_colonne, dtype=np.int64)
+        self.mean = np.zeros(num_colonne)
+        self.m2 = np.zeros(num_colonne)
+        self.min = np.full(num_colonne, np.inf)
+        self.max = np.full(num_colonne, -np.inf)
+
+    def aggiorna(self, valori):
+        # I NaN vengono ignorati colonna per colonna, come fa describe()
+        valido = ~np.isnan(valori)
+        count = valido.sum(axis=0)
+        somma = np.where(valido, valori, 0.0).sum(axis=0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, somma / np.maximum(count, 1), 0.0)
+
+        scarti = np.where(valido, valori - mean, 0.0)
+
+        blocco = MomentiWelford(len(count))
+        blocco.count = count
+        blocco.mean = mean
+        blocco.m2 = (scarti ** 2).sum(axis=0)
+        blocco.min = np.where(valido, valori, np.inf).min(axis=0)
+        blocco.max = np.where(valido, valori, -np.inf).max(axis=0)
+
+        self.unisci(blocco)
+
+    def unisci(self, altro):
+        n = self.count + altro.count
+        delta = altro.mean - self.mean
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            peso = np.where(n > 0, altro.count / np.maximum(n, 1), 0.0)
+
+        self.mean = self.mean + delta * peso
+        self.m2 = self.m2 + altro.m2 + delta ** 2 * self.count * peso
+        self.count = n
+        self.min = np.minimum(self.min, altro.min)
+        self.max = np.maximum(self.max, altro.max)
+
+    def std(self):
+        # ddof=1 come pandas.describe()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(np.where(self.count > 1, self.m2 / (self.count - 1), np.nan))
+
+
+# -------------------------------------------------
+# Co-momenti per la correlazione
+# -------------------------------------------------
+
+class CoMomenti:
+    """
+    Vettore delle medie e matrice dei co-momenti
+    C = somma((x - media)(x - media)^T), calcolata sulle righe complete.
+    """
+
+    def __init__(self, num_colonne):
+        self.count = 0
+        self.mean = np.zeros(num_colonne)
+        self.c = np.zeros((num_colonne, num_colonne))
+
+    def aggiorna(self, valori):
+        valori = valori[~np.isnan(valori).any(axis=1)]
+
+        if len(valori) == 0:
+            return
+
+        blocco = CoMomenti(valori.shape[1])
+        blocco.count = len(valori)
+        blocco.mean = valori.mean(axis=0)
+        scarti = valori - blocco.mean
+        blocco.c = scarti.T @ scarti
+
+        self.unisci(blocco)
+
+    def unisci(self, altro):
+        if altro.count == 0:
+            return
+
+        n = self.count + altro.count
+        delta = altro.mean - self.mean
+
+        self.c = self.c + altro.c + np.outer(delta, delta) * self.count * altro.count / n
+        self.mean = self.mean + delta * altro.count / n
+        self.count = n
+
+    def correlazione(self):
+        diagonale = np.sqrt(np.diag(self.c))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.c / np.outer(diagonale, diagonale)
+
+
+# -------------------------------------------------
+# Sketch dei quantili
+# -------------------------------------------------
+
+class SketchQuantili:
+    """
+    Sketch dei quantili a dimensione fissa.
+
+    Ogni colonna è rappresentata da al massimo `max_centroidi` coppie
+    (valore, peso). Quando i centroidi superano il limite, i vicini
+    vengono fusi in gruppi di peso simile. Due sketch si uniscono
+    concatenando i centroidi e comprimendo di nuovo.
+    """
+
+    def __init__(self, max_centroidi=200):
+        self.max_centroidi = max_centroidi
+        self.valori = np.empty(0)
+        self.pesi = np.empty(0)
+
+    def aggiorna(self, valori):
+        valori = valori[~np.isnan(valori)]
+        self._aggiungi(valori, np.ones(len(valori)))
+
+    def unisci(self, altro):
+        self._aggiungi(altro.valori, altro.pesi)
+
+    def _aggiungi(self, valori, pesi):
+        valori = np.concatenate([self.valori, valori])
+        pesi = np.concatenate([self.pesi, pesi])
+
+        ordine = np.argsort(valori, kind="stable")
+        valori = valori[ordine]
+        pesi = pesi[ordine]
+
+        if len(valori) > self.max_centroidi:
+            # Ogni centroide finisce nel gruppo che corrisponde al suo peso cumulato
+            cumulato = np.cumsum(pesi) - pesi / 2
+            gruppi = np.minimum(
+                (cumulato / pesi.sum() * self.max_centroidi).astype(np.int64),
+                self.max_centroidi - 1
+            )
+            confini = np.flatnonzero(np.diff(gruppi)) + 1
+            inizi = np.concatenate([[0], confini])
+
+            pesi_gruppo = np.add.reduceat(pesi, inizi)
+            valori = np.add.reduceat(valori * pesi, inizi) / pesi_gruppo
+            pesi = pesi_gruppo
+
+        self.valori = valori
+        self.pesi = pesi
+
+    def quantile(self, q):
+        if len(self.valori) == 0:
+            return np.nan
+
+        cumulato = np.cumsum(self.pesi) - self.pesi / 2
+        return float(np.interp(q * self.pesi.sum(), cumulato, self.valori))
+
+
+# -------------------------------------------------
+# Istogramma adattivo
+# -------------------------------------------------
+
+class IstogrammaAdattivo:
+    """
+    Istogramma con un numero fisso di bin allineati a multipli della larghezza.
+
+    Se i valori non entrano più nei bin disponibili, la larghezza
+    raddoppia e i bin vicini vengono sommati a coppie. Dato che i bin
+    restano allineati, due istogrammi si uniscono senza approssimazioni.
+    """
+
+    def __init__(self, num_bin=64, larghezza_base=0.01):
+        self.num_bin = num_bin
+        self.larghezza = larghezza_base
+        self.inizio = 0
+        self.conteggi = np.zeros(num_bin, dtype=np.int64)
+
+    def aggiorna(self, valori):
+        valori = valori[~np.isnan(valori)]
+
+        if len(valori) == 0:
+            return
+
+        self._copri(valori.min(), valori.max())
+        indici = np.floor(valori / self.larghezza).astype(np.int64) - self.inizio
+        self.conteggi += np.bincount(indici, minlength=self.num_bin)
+
+    def unisci(self, altro):
+        usati = np.flatnonzero(altro.conteggi)
+
+        if len(usati) == 0:
+            return
+
+        # Valori rappresentativi (centro dei bin) dell'altro istogramma
+        centri = (usati + altro.inizio + 0.5) * altro.larghezza
+
+        while self.larghezza < altro.larghezza:
+            self._raddoppia()
+
+        self._copri(centri.min(), centri.max())
+        indici = np.floor(centri / self.larghezza).astype(np.int64) - self.inizio
+        np.add.at(self.conteggi, indici, altro.conteggi[usati])
+
+    def bordi(self):
+        return (self.inizio + np.arange(self.num_bin + 1)) * self.larghezza
+
+    def _copri(self, minimo, massimo):
+        while True:
+            usati = np.flatnonzero(self.conteggi) + self.inizio
+            primo = int(np.floor(minimo / self.larghezza))
+            ultimo = int(np.floor(massimo / self.larghezza))
+
+            if len(usati) > 0:
+                primo = min(primo, usati[0])
+                ultimo = max(ultimo, usati[-1])
+
+            if ultimo - primo < self.num_bin:
+                break
+
+            self._raddoppia()
+
+        # Spostiamo la finestra dei bin solo se serve
+        if primo < self.inizio or ultimo >= self.inizio + self.num_bin:
+            nuovi = np.zeros(self.num_bin, dtype=np.int64)
+            usati = np.flatnonzero(self.conteggi)
+            nuovi[usati + self.inizio - primo] = self.conteggi[usati]
+
+            self.conteggi = nuovi
+            self.inizio = primo
+
+    def _raddoppia(self):
+        # Con bin allineati il bin k finisce nel bin floor(k / 2)
+        indici = np.arange(self.num_bin) + self.inizio
+        nuovo_inizio = self.inizio // 2
+        nuovi = np.zeros(self.num_bin, dtype=np.int64)
+        np.add.at(nuovi, indici // 2 - nuovo_inizio, self.conteggi)
+
+        self.conteggi = nuovi
+        self.inizio = nuovo_inizio
+        self.larghezza *= 2
+
+
+# -------------------------------------------------
+# Accumulatore per un intero dataset
+# -------------------------------------------------
+
+class AccumulatoreDataset:
+    """
+    Raccoglie tutte le statistiche di un dataset tabellare numerico.
+    Può essere aggiornato blocco per blocco e unito ad altri accumulatori.
+    """
+
+    def __init__(self, colonne, max_centroidi=200, num_bin=64, larghezza_base=0.01):
+        self.colonne = list(colonne)
+        self.momenti = MomentiWelford(len(self.colonne))
+        self.comomenti = CoMomenti(len(self.colonne))
+        self.quantili = [SketchQuantili(max_centroidi) for _ in self.colonne]
+        self.istogrammi = [IstogrammaAdattivo(num_bin, larghezza_base) for _ in self.colonne]
+
+    def aggiorna(self, chunk):
+        valori = chunk[self.colonne].to_numpy(dtype=np.float64)
+
+        self.momenti.aggiorna(valori)
+        self.comomenti.aggiorna(valori)
+
+        for i in range(len(self.colonne)):
+            self.quantili[i].aggiorna(valori[:, i])
+            self.istogrammi[i].aggiorna(valori[:, i])
+
+    def unisci(self, altro):
+        self.momenti.unisci(altro.momenti)
+        self.comomenti.unisci(altro.comomenti)
+
+        for mio, suo in zip(self.quantili, altro.quantili):
+            mio.unisci(suo)
+
+        for mio, suo in zip(self.istogrammi, altro.istogrammi):
+            mio.unisci(suo)
+
+    def statistiche(self):
+        """
+        Tabella simile a describe().T: count, mean, std, min, quartili, max.
+        """
+        return pd.DataFrame({
+            "count": self.momenti.count,
+            "mean": self.momenti.mean,
+            "std": self.momenti.std(),
+            "min": self.momenti.min,
+            "25%": [s.quantile(0.25) for s in self.quantili],
+            "50%": [s.quantile(0.50) for s in self.quantili],
+            "75%": [s.quantile(0.75) for s in self.quantili],
+            "max": self.momenti.max
+        }, index=self.colonne)
+
+    def correlazione(self):
+        return pd.DataFrame(
+            self.comomenti.correlazione(),
+            index=self.colonne,
+            columns=self.colonne
+        )
+
+
+def accumula_csv(path, colonne=None, chunksize=100_000, **opzioni):
+    """
+    Legge un file CSV a blocchi e restituisce il suo AccumulatoreDataset.
+    Se le colonne non sono indicate vengono lette dall'intestazione del file.
+    """
+    if colonne is None:
+        colonne = pd.read_csv(path, nrows=0).columns.tolist()
+
+    accumulatore = AccumulatoreDataset(colonne, **opzioni)
+
+    for chunk in pd.read_csv(path, usecols=colonne, chunksize=chunksize):
+        accumulatore.aggiorna(chunk)
+
+    return accumulatore
+
+
+def accumula_csv_parallelo(paths, colonne=None, chunksize=100_000, n_workers=None, **opzioni):
+    """
+    Accumula più file (per esempio i frammenti di un dataset sintetico
+    generato in parallelo) su un pool di processi e unisce i risultati.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+
+    if colonne is None:
+        colonne = pd.read_csv(paths[0], nrows=0).columns.tolist()
+
+    if len(paths) == 1 or n_workers == 1:
+        parziali = [accumula_csv(p, colonne, chunksize, **opzioni) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(accumula_csv, p, colonne, chunksize, **opzioni)
+                for p in paths
+            ]
+            parziali = [f.result() for f in futures]
+
+    risultato = parziali[0]
+
+    for parziale in parziali[1:]:
+        risultato.unisci(parziale)
+
+    return risultato
+
+
+# -------------------------------------------------
+# Confronto reale vs sintetico
+# -------------------------------------------------
+
+def confronta_statistiche(real_acc, synthetic_acc):
+    """
+    Stessa tabella di statistics_comparison.csv nello Step 7.
+    """
+    real_stats = real_acc.statistiche()
+    synthetic_stats = synthetic_acc.statistiche()
+
+    return pd.DataFrame({
+        "real_mean": real_stats["mean"],
+        "synthetic_mean": synthetic_stats["mean"],
+        "mean_difference": abs(real_stats["mean"] - synthetic_stats["mean"]),
+        "real_std": real_stats["std"],
+        "synthetic_std": synthetic_stats["std"],
+        "std_difference": abs(real_stats["std"] - synthetic_stats["std"])
+    })
+
+
+def confronta_quantili(real_acc, synthetic_acc, livelli=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """
+    Quantili approssimati di ogni colonna nei due dataset.
+    """
+    righe = []
+
+    for i, col in enumerate(real_acc.colonne):
+        for q in livelli:
+            real_q = real_acc.quantili[i].quantile(q)
+            synthetic_q = synthetic_acc.quantili[i].quantile(q)
+
+            righe.append({
+                "column": col,
+                "quantile": q,
+                "real": real_q,
+                "synthetic": synthetic_q,
+                "difference": abs(real_q - synthetic_q)
+            })
+
+    return pd.DataFrame(righe)
+
+
+def valida_streaming(
+    real_paths="real_clean_data.csv",
+    synthetic_paths="synthetic_data.csv",
+    output_dir=".",
+    chunksize=100_000,
+    n_workers=None
+):
+    """
+    Versione a memoria costante dello Step 7.
+    Accetta un file o una lista di file per ciascun dataset
+    e salva gli stessi CSV del notebook.
+    """
+    print("Inizio validazione in streaming dati reali vs dati sintetici")
+
+    real_acc = accumula_csv_parallelo(real_paths, chunksize=chunksize, n_workers=n_workers)
+    synthetic_acc = accumula_csv_parallelo(
+        synthetic_paths,
+        colonne=real_acc.colonne,
+        chunksize=chunksize,
+        n_workers=n_workers
+    )
+
+    print("\nRighe dataset reale:", int(real_acc.momenti.count.max()))
+    print("Righe dataset sintetico:", int(synthetic_acc.momenti.count.max()))
+
+    comparison_stats = confronta_statistiche(real_acc, synthetic_acc)
+
+    real_corr = real_acc.correlazione()
+    synthetic_corr = synthetic_acc.correlazione()
+    correlation_difference = abs(real_corr - synthetic_corr)
+
+    print("\nConfronto statistiche principali:")
+    print(comparison_stats)
+
+    print("\nDifferenza media assoluta tra le correlazioni:")
+    print(round(np.nanmean(correlation_difference.values), 4))
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    comparison_stats.to_csv(os.path.join(output_dir, "statistics_comparison.csv"))
+    real_corr.to_csv(os.path.join(output_dir, "real_correlation_matrix.csv"))
+    synthetic_corr.to_csv(os.path.join(output_dir, "synthetic_correlation_matrix.csv"))
+    correlation_difference.to_csv(os.path.join(output_dir, "correlation_difference_matrix.csv"))
+    confronta_quantili(real_acc, synthetic_acc).to_csv(
+        os.path.join(output_dir, "quantile_comparison.csv"),
+        index=False
+    )
+
+    print("\nFile salvati:")
+    print("- statistics_comparison.csv")
+    print("- real_correlation_matrix.csv")
+    print("- synthetic_correlation_matrix.csv")
+    print("- correlation_difference_matrix.csv")
+    print("- quantile_comparison.csv")
+
+    return real_acc, synthetic_acc
+
+
+if __name__ == "__main__":
+    valida_streaming()